@@ -1,72 +1,751 @@
-from datetime import date
-from typing import Dict, List, Tuple
+import uuid
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
-from sqlalchemy import and_, case, func, select
+from sqlalchemy import (
+    Date,
+    and_,
+    case,
+    cast,
+    delete,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    union_all,
+    update,
+)
 from sqlalchemy.engine import Result
+from sqlalchemy.sql import FromClause
 from sqlalchemy.orm import Session
 
-from api.models import CostEntry, FxRate
+from api import cube as cost_cube
+from api import duckdb_backend
+from api.models import BackfillProgress, CostEntry, CostMonthly, FxRate, IngestionRun, IngestionState, WorkItem
+from core.batch import CostBatch, iter_cost_batches
+from core.ingestion import PHASES, RunStats, phase, timed
+from core.normalization import build_monthly_cost_id, serialize_tags
+from core.parallel import iter_keyed_batches
 
 
-def upsert_cost_entries(session: Session, entries: List[Dict]):
-    for entry in entries:
-        stmt = select(CostEntry).where(
-            CostEntry.id == entry["id"],
+DEFAULT_WRITE_BATCH_SIZE = 1000
+
+
+@dataclass
+class WriteStats:
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    @property
+    def changed(self) -> int:
+        return self.inserted + self.updated
+
+    @property
+    def total(self) -> int:
+        return self.inserted + self.updated + self.unchanged
+
+    def add(self, other: "WriteStats"):
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.unchanged += other.unchanged
+
+
+def upsert_cost_batch(session: Session, batch: CostBatch, keys: Optional[Tuple[bytes, bytes]] = None) -> WriteStats:
+    records = {record["id"]: record for record in batch.iter_records(keys)}
+    stmt = select(CostEntry.id, CostEntry.content_hash).where(CostEntry.id.in_(records.keys()))
+    existing = dict(session.execute(stmt).all())
+    inserts = [record for cost_id, record in records.items() if cost_id not in existing]
+    updates = [
+        record
+        for cost_id, record in records.items()
+        if cost_id in existing and existing[cost_id] != record["content_hash"]
+    ]
+    if inserts:
+        session.execute(insert(CostEntry), inserts)
+    if updates:
+        session.execute(update(CostEntry), updates)
+    session.commit()
+    return WriteStats(
+        inserted=len(inserts),
+        updated=len(updates),
+        unchanged=len(records) - len(inserts) - len(updates),
+    )
+
+
+def write_cost_entries(
+    session: Session,
+    entries: Iterable[Dict],
+    batch_size: int = DEFAULT_WRITE_BATCH_SIZE,
+    pool: Optional[Executor] = None,
+) -> WriteStats:
+    """Normalize and upsert ``entries`` in batches.
+
+    When ``pool`` is given, id and content hashing runs in it (see
+    ``core.parallel``) while this thread keeps writing earlier batches.
+    """
+    stats = WriteStats()
+    batches = iter_keyed_batches(iter_cost_batches(entries, batch_size), pool)
+    for batch, keys in timed(batches, "normalize"):
+        with phase("write"):
+            stats.add(upsert_cost_batch(session, batch, keys))
+    return stats
+
+
+def upsert_fx_rates(session: Session, entries: List[Dict]) -> int:
+    if not entries:
+        return 0
+    dates = {entry["date"] for entry in entries}
+    stmt = select(FxRate.date, FxRate.currency, FxRate.rate).where(FxRate.date.in_(dates))
+    existing = {(row[0], row[1]): row[2] for row in session.execute(stmt).all()}
+    inserts = [entry for entry in entries if (entry["date"], entry["currency"]) not in existing]
+    updates = [
+        entry
+        for entry in entries
+        if existing.get((entry["date"], entry["currency"]), entry["rate"]) != entry["rate"]
+    ]
+    if inserts:
+        session.execute(insert(FxRate), inserts)
+    if updates:
+        session.execute(update(FxRate), updates)
+    session.commit()
+    return len(inserts) + len(updates)
+
+
+def get_final_days(session: Session, provider: str, start: date, end: date) -> Dict[str, Set[date]]:
+    stmt = select(IngestionState.account_id, IngestionState.date).where(
+        IngestionState.provider == provider,
+        IngestionState.is_final.is_(True),
+        IngestionState.date.between(start, end),
+    )
+    final_days: Dict[str, Set[date]] = {}
+    for account_id, day in session.execute(stmt).all():
+        final_days.setdefault(account_id, set()).add(day)
+    return final_days
+
+
+def record_ingestion_state(
+    session: Session,
+    provider: str,
+    windows: Iterable[Tuple[str, date, date]],
+    finalize_after_days: int,
+):
+    final_cutoff = date.today() - timedelta(days=finalize_after_days)
+    for account_id, start, end in windows:
+        stmt = select(IngestionState).where(
+            IngestionState.provider == provider,
+            IngestionState.account_id == account_id,
+            IngestionState.date.between(start, end),
         )
-        existing = session.execute(stmt).scalar_one_or_none()
-        if existing:
-            for key, value in entry.items():
-                setattr(existing, key, value)
-        else:
-            session.add(CostEntry(**entry))
+        existing = {row.date: row for row in session.execute(stmt).scalars().all()}
+        day = start
+        while day <= end:
+            is_final = day <= final_cutoff
+            row = existing.get(day)
+            if row:
+                row.is_final = is_final
+                row.collected_at = func.now()
+            else:
+                session.add(
+                    IngestionState(
+                        id=f"{provider}|{account_id}|{day.isoformat()}",
+                        provider=provider,
+                        account_id=account_id,
+                        date=day,
+                        is_final=is_final,
+                    )
+                )
+            day += timedelta(days=1)
     session.commit()
 
 
-def upsert_fx_rates(session: Session, entries: List[Dict]):
-    for entry in entries:
-        stmt = select(FxRate).where(
-            FxRate.date == entry["date"],
-            FxRate.currency == entry["currency"],
+def get_completed_backfill_windows(session: Session, provider: str) -> Set[Tuple[str, date, date]]:
+    stmt = select(BackfillProgress.account_id, BackfillProgress.start_date, BackfillProgress.end_date).where(
+        BackfillProgress.provider == provider,
+        BackfillProgress.status == "completed",
+    )
+    return {(row[0], row[1], row[2]) for row in session.execute(stmt).all()}
+
+
+def record_backfill_window(
+    session: Session,
+    provider: str,
+    account_id: str,
+    start: date,
+    end: date,
+    status: str,
+    rows: int = 0,
+    error: Optional[str] = None,
+):
+    window_id = f"{provider}|{account_id}|{start.isoformat()}|{end.isoformat()}"
+    existing = session.get(BackfillProgress, window_id)
+    if existing:
+        existing.status = status
+        existing.rows = rows
+        existing.error = error
+    else:
+        session.add(
+            BackfillProgress(
+                id=window_id,
+                provider=provider,
+                account_id=account_id,
+                start_date=start,
+                end_date=end,
+                status=status,
+                rows=rows,
+                error=error,
+            )
         )
-        existing = session.execute(stmt).scalar_one_or_none()
+    session.commit()
+
+
+def reset_backfill_progress(session: Session, provider: str, start: date, end: date):
+    stmt = delete(BackfillProgress).where(
+        BackfillProgress.provider == provider,
+        BackfillProgress.start_date >= start,
+        BackfillProgress.end_date <= end,
+    )
+    session.execute(stmt)
+    session.commit()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def enqueue_work_items(session: Session, items: Iterable[Tuple[str, str, date, date]], max_attempts: int = 5) -> int:
+    now = _utcnow()
+    enqueued = 0
+    for provider, account_id, start, end in items:
+        item_id = f"{provider}|{account_id}|{start.isoformat()}|{end.isoformat()}"
+        existing = session.get(WorkItem, item_id)
+        if existing and existing.status in ("pending", "leased"):
+            continue
         if existing:
-            for key, value in entry.items():
-                setattr(existing, key, value)
+            existing.status = "pending"
+            existing.attempts = 0
+            existing.max_attempts = max_attempts
+            existing.available_at = now
+            existing.last_error = None
         else:
-            session.add(FxRate(**entry))
+            session.add(
+                WorkItem(
+                    id=item_id,
+                    provider=provider,
+                    account_id=account_id,
+                    start_date=start,
+                    end_date=end,
+                    status="pending",
+                    attempts=0,
+                    max_attempts=max_attempts,
+                    available_at=now,
+                )
+            )
+        enqueued += 1
     session.commit()
+    return enqueued
 
 
-def usd_cost_expr():
+CLAIM_ATTEMPTS = 5
+
+
+def claim_work_item(session: Session, owner: str, lease_seconds: int) -> Optional[WorkItem]:
+    """Lease the oldest available item to ``owner``.
+
+    ``SKIP LOCKED`` keeps PostgreSQL consumers off each other's candidates; the
+    lease itself is a conditional UPDATE that only succeeds while the item is
+    still claimable, so a consumer that lost the race (always possible on
+    SQLite, which ignores ``FOR UPDATE``) sees rowcount 0 and tries the next one.
+    """
+    for _ in range(CLAIM_ATTEMPTS):
+        now = _utcnow()
+        claimable = or_(
+            and_(WorkItem.status == "pending", WorkItem.available_at <= now),
+            and_(WorkItem.status == "leased", WorkItem.lease_expires_at < now),
+        )
+        stmt = (
+            select(WorkItem.id)
+            .where(claimable)
+            .order_by(WorkItem.available_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        item_id = session.execute(stmt).scalar_one_or_none()
+        if item_id is None:
+            session.rollback()
+            return None
+        claimed = session.execute(
+            update(WorkItem)
+            .where(WorkItem.id == item_id, claimable)
+            .values(
+                status="leased",
+                lease_owner=owner,
+                lease_expires_at=now + timedelta(seconds=lease_seconds),
+                attempts=WorkItem.attempts + 1,
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        session.commit()
+        if claimed == 1:
+            return session.get(WorkItem, item_id, populate_existing=True)
+    return None
+
+
+def extend_work_lease(session: Session, item_id: str, owner: str, lease_seconds: int) -> bool:
+    stmt = (
+        update(WorkItem)
+        .where(WorkItem.id == item_id, WorkItem.lease_owner == owner, WorkItem.status == "leased")
+        .values(lease_expires_at=_utcnow() + timedelta(seconds=lease_seconds))
+    )
+    updated = session.execute(stmt).rowcount
+    session.commit()
+    return updated == 1
+
+
+def complete_work_item(session: Session, item_id: str, owner: str):
+    stmt = (
+        update(WorkItem)
+        .where(WorkItem.id == item_id, WorkItem.lease_owner == owner)
+        .values(status="done", lease_owner=None, lease_expires_at=None, last_error=None)
+    )
+    session.execute(stmt)
+    session.commit()
+
+
+def fail_work_item(session: Session, item_id: str, owner: str, error: str, backoff_seconds: float):
+    item = session.get(WorkItem, item_id)
+    if item is None or item.lease_owner != owner:
+        session.rollback()
+        return
+    item.lease_owner = None
+    item.lease_expires_at = None
+    item.last_error = error
+    if item.attempts >= item.max_attempts:
+        item.status = "failed"
+    else:
+        item.status = "pending"
+        item.available_at = _utcnow() + timedelta(seconds=backoff_seconds)
+    session.commit()
+
+
+def purge_work_items(session: Session, older_than: datetime):
+    stmt = delete(WorkItem).where(WorkItem.status == "done", WorkItem.updated_at < older_than)
+    session.execute(stmt)
+    session.commit()
+
+
+def start_ingestion_run(session: Session, provider: str, trigger: str) -> str:
+    run_id = uuid.uuid4().hex
+    session.add(IngestionRun(id=run_id, provider=provider, trigger=trigger, status="running", started_at=_utcnow()))
+    session.commit()
+    return run_id
+
+
+def finish_ingestion_run(
+    session: Session,
+    run_id: str,
+    run: RunStats,
+    stats: Optional[WriteStats] = None,
+    error: Optional[str] = None,
+):
+    stats = stats or WriteStats()
+    stmt = (
+        update(IngestionRun)
+        .where(IngestionRun.id == run_id)
+        .values(
+            status="failed" if error else "succeeded",
+            finished_at=_utcnow(),
+            phases={name: round(run.phases[name], 3) for name in PHASES if name in run.phases},
+            api_calls=run.api_calls,
+            pages=run.pages,
+            rows_fetched=run.rows_fetched,
+            rows_written=stats.changed,
+            rows_unchanged=stats.unchanged,
+            error=error,
+        )
+    )
+    session.execute(stmt)
+    session.commit()
+
+
+def fail_abandoned_ingestion_runs(
+    session: Session, stale_before: datetime, triggers: Iterable[str] = ()
+) -> int:
+    """Mark runs whose process died as failed.
+
+    A run still ``running`` is abandoned if it started before ``stale_before``
+    or was started by one of ``triggers`` (whose owning process is known to
+    be gone).
+    """
+    stmt = (
+        update(IngestionRun)
+        .where(
+            IngestionRun.status == "running",
+            or_(IngestionRun.started_at < stale_before, IngestionRun.trigger.in_(list(triggers))),
+        )
+        .values(status="failed", finished_at=_utcnow(), error="abandoned: worker stopped before finishing")
+    )
+    failed = session.execute(stmt).rowcount
+    session.commit()
+    return failed
+
+
+def get_latest_ingestion_runs(session: Session) -> Dict[str, IngestionRun]:
+    latest = (
+        select(IngestionRun.provider, func.max(IngestionRun.started_at).label("started_at"))
+        .group_by(IngestionRun.provider)
+        .subquery()
+    )
+    stmt = select(IngestionRun).join(
+        latest,
+        and_(IngestionRun.provider == latest.c.provider, IngestionRun.started_at == latest.c.started_at),
+    )
+    return {run.provider: run for run in session.execute(stmt).scalars().all()}
+
+
+def get_ingestion_runs(
+    session: Session,
+    provider: Optional[str] = None,
+    since: Optional[datetime] = None,
+    limit: int = 100,
+) -> List[IngestionRun]:
+    stmt = select(IngestionRun)
+    if provider:
+        stmt = stmt.where(IngestionRun.provider == provider)
+    if since:
+        stmt = stmt.where(IngestionRun.started_at >= since)
+    stmt = stmt.order_by(IngestionRun.started_at.desc()).limit(limit)
+    return list(session.execute(stmt).scalars().all())
+
+
+COST_COLUMNS = ("id", "date", "provider", "account_id", "account_name", "service", "region", "cost", "currency", "tags")
+COMPACTION_INSERT_BATCH_SIZE = 5000
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _month_fraction(month: date, start: date, end: date) -> float:
+    month_end = next_month(month) - timedelta(days=1)
+    overlap = (min(end, month_end) - max(start, month)).days + 1
+    return max(overlap, 0) / month_end.day
+
+
+def _month_days(month: date) -> int:
+    return (next_month(month) - month).days
+
+
+def _next_day(session: Session, column):
+    if session.bind.dialect.name == "sqlite":
+        return func.date(column, "+1 day", type_=Date)
+    return column + 1
+
+
+def cost_source(session: Session, start: date, end: date, by_day: bool = False) -> FromClause:
+    """Return a selectable with the ``cost_entries`` columns covering ``[start, end]``.
+
+    Ranges that reach back into compacted months read the daily rows UNION ALL
+    the ``cost_monthly`` tier. A monthly row stands for the days of its month
+    that have no daily rows for its provider and account (daily rows reappear
+    when a backfill re-ingests part of a compacted month), so it is scaled by
+    the uncovered share of the month. Ranges newer than the last compacted
+    month use ``cost_entries`` alone.
+
+    By default monthly rows are dated at their month start (or ``start`` for
+    the first month) and months only partly inside the range are prorated by
+    day count. With ``by_day`` they are spread evenly over their uncovered days
+    instead, for callers that group or compare by day or week.
+    """
+    compacted_through = session.scalar(select(func.max(CostMonthly.date)))
+    if compacted_through is None or start >= next_month(compacted_through):
+        return CostEntry.__table__
+
+    first_month = month_start(start)
+    compacted_end = min(end, next_month(compacted_through) - timedelta(days=1))
+    months = []
+    month = first_month
+    while month <= compacted_end:
+        months.append(month)
+        month = next_month(month)
+    month_days = case(
+        *((CostMonthly.date == month, float(_month_days(month))) for month in months),
+        else_=1.0,
+    )
+    daily = select(*(CostEntry.__table__.c[name] for name in COST_COLUMNS)).where(CostEntry.date.between(start, end))
+    columns = (
+        CostMonthly.provider,
+        CostMonthly.account_id,
+        CostMonthly.account_name,
+        CostMonthly.service,
+        CostMonthly.region,
+    )
+
+    if by_day:
+        days = select(literal(start, Date).label("day")).cte("days", recursive=True)
+        days = days.union_all(select(_next_day(session, days.c.day)).where(days.c.day < compacted_end))
+        covered = (
+            select(CostEntry.provider, CostEntry.account_id, CostEntry.date)
+            .where(CostEntry.date.between(start, compacted_end))
+            .distinct()
+            .subquery("covered_days")
+        )
+        monthly = (
+            select(
+                CostMonthly.id,
+                days.c.day.label("date"),
+                *columns,
+                (CostMonthly.cost / month_days).label("cost"),
+                CostMonthly.currency,
+                CostMonthly.tags,
+            )
+            .select_from(CostMonthly)
+            .join(days, date_bucket(session, days.c.day, "month") == CostMonthly.date)
+            .outerjoin(
+                covered,
+                and_(
+                    covered.c.provider == CostMonthly.provider,
+                    covered.c.account_id == CostMonthly.account_id,
+                    covered.c.date == days.c.day,
+                ),
+            )
+            .where(CostMonthly.date.between(first_month, compacted_end), covered.c.date.is_(None))
+        )
+        return union_all(daily, monthly).subquery("costs")
+
+    coverage_month = date_bucket(session, CostEntry.date, "month")
+    coverage = (
+        select(
+            CostEntry.provider,
+            CostEntry.account_id,
+            coverage_month.label("month"),
+            func.count(func.distinct(CostEntry.date)).label("days"),
+        )
+        .where(CostEntry.date.between(first_month, next_month(months[-1]) - timedelta(days=1)))
+        .group_by(CostEntry.provider, CostEntry.account_id, coverage_month)
+        .subquery("covered_months")
+    )
+    monthly_cost = CostMonthly.cost * (month_days - func.coalesce(coverage.c.days, 0)) / month_days
+    partial = [
+        (CostMonthly.date == month, fraction)
+        for month in {first_month, month_start(end)}
+        if (fraction := _month_fraction(month, start, end)) != 1.0
+    ]
+    if partial:
+        monthly_cost = monthly_cost * case(*partial, else_=1.0)
+    monthly = (
+        select(
+            CostMonthly.id,
+            case((CostMonthly.date < start, start), else_=CostMonthly.date).label("date"),
+            *columns,
+            monthly_cost.label("cost"),
+            CostMonthly.currency,
+            CostMonthly.tags,
+        )
+        .select_from(CostMonthly)
+        .outerjoin(
+            coverage,
+            and_(
+                coverage.c.provider == CostMonthly.provider,
+                coverage.c.account_id == CostMonthly.account_id,
+                coverage.c.month == CostMonthly.date,
+            ),
+        )
+        .where(CostMonthly.date.between(first_month, end))
+    )
+    return union_all(daily, monthly).subquery("costs")
+
+
+def source_column(source: FromClause, column):
+    """Map a ``CostEntry`` column (e.g. ``CostEntry.service``) onto ``source``."""
+    return source.c[column.key]
+
+
+def build_tag_expr(session: Session, tag: str, tags=CostEntry.tags):
+    dialect = session.bind.dialect.name
+    if dialect == "sqlite":
+        return func.json_extract(tags, f"$.{tag}")
+    return tags[tag].as_string()
+
+
+DATE_BUCKETS = ("day", "week", "month")
+
+
+def date_bucket(session: Session, column, bucket: str):
+    """Truncate a date column to the Monday of its week or the first of its month."""
+    if bucket not in DATE_BUCKETS:
+        raise ValueError(f"unknown date bucket: {bucket}")
+    if bucket == "day":
+        return column
+    if session.bind.dialect.name == "sqlite":
+        if bucket == "week":
+            return func.date(column, "weekday 0", "-6 days", type_=Date)
+        return func.date(column, "start of month", type_=Date)
+    return cast(func.date_trunc(bucket, column), Date)
+
+
+def compaction_cutoff(today: date, after_days: int) -> date:
+    """First day of the oldest month kept at daily grain."""
+    return month_start(today - timedelta(days=after_days))
+
+
+def compact_cost_month(session: Session, month: date) -> Tuple[int, int]:
+    """Fold the daily rows of ``month`` into ``cost_monthly`` and delete them.
+
+    When a (provider, account) already has monthly rows, e.g. after a backfill
+    re-ingested part of a compacted month, those rows keep the share of the
+    month its daily rows do not cover (as ``cost_source`` reads them) and the
+    daily rows are added on top. Returns ``(daily rows removed, monthly rows
+    written)``.
+    """
+    month_end = next_month(month) - timedelta(days=1)
+    stmt = select(
+        CostEntry.date,
+        CostEntry.provider,
+        CostEntry.account_id,
+        CostEntry.account_name,
+        CostEntry.service,
+        CostEntry.region,
+        CostEntry.currency,
+        CostEntry.tags,
+        CostEntry.cost,
+    ).where(CostEntry.date.between(month, month_end))
+    aggregates: Dict[Tuple, Dict] = {}
+    covered: Dict[Tuple[str, str], Set[date]] = {}
+    removed = 0
+
+    def add(key, account_name, tags, cost, source_rows):
+        item = aggregates.get(key)
+        if item is None:
+            provider, account_id, service, region, currency, _ = key
+            item = aggregates[key] = {
+                "id": build_monthly_cost_id(month, *key),
+                "date": month,
+                "provider": provider,
+                "account_id": account_id,
+                "account_name": account_name,
+                "service": service,
+                "region": region,
+                "cost": 0.0,
+                "currency": currency,
+                "tags": tags,
+                "source_rows": 0,
+            }
+        item["cost"] += cost
+        item["source_rows"] += source_rows
+
+    for day, provider, account_id, account_name, service, region, currency, tags, cost in session.execute(
+        stmt.execution_options(yield_per=10000)
+    ):
+        key = (provider, account_id, service, region, currency, serialize_tags(tags))
+        add(key, account_name, tags, cost, 1)
+        covered.setdefault((provider, account_id), set()).add(day)
+        removed += 1
+    if not removed:
+        return 0, 0
+
+    accounts: Dict[str, Set[str]] = {}
+    for provider, account_id in covered:
+        accounts.setdefault(provider, set()).add(account_id)
+    days = _month_days(month)
+    for provider, account_ids in accounts.items():
+        existing = (
+            CostMonthly.date == month,
+            CostMonthly.provider == provider,
+            CostMonthly.account_id.in_(account_ids),
+        )
+        monthly = select(
+            CostMonthly.account_id,
+            CostMonthly.account_name,
+            CostMonthly.service,
+            CostMonthly.region,
+            CostMonthly.currency,
+            CostMonthly.tags,
+            CostMonthly.cost,
+            CostMonthly.source_rows,
+        ).where(*existing)
+        for row in session.execute(monthly):
+            account_id, account_name, service, region, currency, tags, cost, source_rows = row
+            uncovered = days - len(covered[(provider, account_id)])
+            if uncovered > 0:
+                key = (provider, account_id, service, region, currency, serialize_tags(tags))
+                add(key, account_name, tags, cost * uncovered / days, source_rows)
+        session.execute(delete(CostMonthly).where(*existing))
+    records = list(aggregates.values())
+    for idx in range(0, len(records), COMPACTION_INSERT_BATCH_SIZE):
+        session.execute(insert(CostMonthly), records[idx : idx + COMPACTION_INSERT_BATCH_SIZE])
+    session.execute(delete(CostEntry).where(CostEntry.date.between(month, month_end)))
+    session.commit()
+    return removed, len(records)
+
+
+def compact_cost_entries(session: Session, cutoff: date) -> Tuple[List[date], int, int]:
+    """Compact every month before ``cutoff``, one transaction per month.
+
+    Returns ``(months compacted, daily rows removed, monthly rows written)``.
+    """
+    oldest = session.scalar(select(func.min(CostEntry.date)).where(CostEntry.date < cutoff))
+    months: List[date] = []
+    removed = written = 0
+    month = month_start(oldest) if oldest else cutoff
+    while month < cutoff:
+        month_removed, month_written = compact_cost_month(session, month)
+        if month_removed:
+            months.append(month)
+            removed += month_removed
+            written += month_written
+        month = next_month(month)
+    return months, removed, written
+
+
+def cost_expr(currency: str = "USD", source: Optional[FromClause] = None):
+    costs = (CostEntry.__table__ if source is None else source).c
     rate_currency = (
         select(FxRate.rate)
         .where(
-            FxRate.currency == CostEntry.currency,
-            FxRate.date <= CostEntry.date,
+            FxRate.currency == costs.currency,
+            FxRate.date <= costs.date,
         )
         .order_by(FxRate.date.desc())
         .limit(1)
         .scalar_subquery()
     )
-    rate_usd = (
+    rate_target = (
         select(FxRate.rate)
         .where(
-            FxRate.currency == "USD",
-            FxRate.date <= CostEntry.date,
+            FxRate.currency == currency,
+            FxRate.date <= costs.date,
         )
         .order_by(FxRate.date.desc())
         .limit(1)
         .scalar_subquery()
     )
     return case(
-        (CostEntry.currency == "USD", CostEntry.cost),
-        (and_(rate_currency.isnot(None), rate_usd.isnot(None)), CostEntry.cost / rate_currency * rate_usd),
-        else_=CostEntry.cost,
+        (costs.currency == currency, costs.cost),
+        (and_(rate_currency.isnot(None), rate_target.isnot(None)), costs.cost / rate_currency * rate_target),
+        else_=costs.cost,
     )
 
 
-def get_total_cost(session: Session, start: date, end: date):
-    stmt = select(func.sum(usd_cost_expr())).where(CostEntry.date.between(start, end))
+def usd_cost_expr():
+    return cost_expr("USD")
+
+
+def get_total_cost(session: Session, start: date, end: date, currency: str = "USD"):
+    cube = cost_cube.current_cube(start)
+    if cube is not None:
+        return cube.total(start, end, currency)
+    if duckdb_backend.active(start, end):
+        return duckdb_backend.total_cost(start, end, currency)
+    source = cost_source(session, start, end)
+    stmt = select(func.sum(cost_expr(currency, source))).where(source.c.date.between(start, end))
     return session.execute(stmt).scalar() or 0.0
 
 
@@ -79,14 +758,22 @@ def get_grouped_cost(
     search_term: str | None = None,
     limit: int | None = None,
     offset: int | None = None,
+    currency: str = "USD",
 ) -> List[Tuple[str, float]]:
-    stmt = select(group_by, func.sum(usd_cost_expr())).where(CostEntry.date.between(start, end))
+    cube = cost_cube.current_cube(start)
+    if cube is not None:
+        return cube.grouped(start, end, group_by.key, provider, search_term, limit, offset, currency)
+    if duckdb_backend.active(start, end):
+        return duckdb_backend.grouped_cost(start, end, group_by.key, provider, search_term, limit, offset, currency)
+    source = cost_source(session, start, end)
+    group_by = source_column(source, group_by)
+    stmt = select(group_by, func.sum(cost_expr(currency, source))).where(source.c.date.between(start, end))
     if provider:
-        stmt = stmt.where(CostEntry.provider == provider)
+        stmt = stmt.where(source.c.provider == provider)
     if search_term:
         pattern = f"%{search_term.strip().lower()}%"
         stmt = stmt.where(func.lower(group_by).like(pattern))
-    stmt = stmt.group_by(group_by).order_by(func.sum(usd_cost_expr()).desc())
+    stmt = stmt.group_by(group_by).order_by(func.sum(cost_expr(currency, source)).desc(), group_by)
     if limit is not None:
         stmt = stmt.limit(limit)
     if offset is not None:
@@ -95,40 +782,126 @@ def get_grouped_cost(
     return result.all()
 
 
-def get_daily_totals(session: Session, start: date, end: date):
+OTHER_KEY = "(other)"
+
+
+@dataclass
+class TopGroups:
+    rows: List[Tuple[str, float]]
+    other: float
+    other_groups: int
+    grand_total: float
+
+
+def get_top_grouped_cost(
+    session: Session,
+    start: date,
+    end: date,
+    group_by: CostEntry,
+    provider: str | None = None,
+    search_term: str | None = None,
+    limit: int = 10,
+    offset: int = 0,
+    currency: str = "USD",
+) -> TopGroups:
+    """A page of groups plus the remainder and grand total under the same filters.
+
+    On SQL this is one statement: ``row_number()``, ``sum() OVER ()`` and
+    ``count() OVER ()`` over the grouped costs, cut at ``offset + limit``.
+    """
+    if cost_cube.current_cube(start) is not None or duckdb_backend.active(start, end):
+        groups = get_grouped_cost(session, start, end, group_by, provider, search_term, currency=currency)
+        grand_total = sum(row[1] or 0.0 for row in groups)
+        group_count = len(groups)
+        rows = groups[offset : offset + limit]
+    else:
+        source = cost_source(session, start, end)
+        column = source_column(source, group_by)
+        stmt = select(column.label("key"), func.sum(cost_expr(currency, source)).label("total")).where(
+            source.c.date.between(start, end)
+        )
+        if provider:
+            stmt = stmt.where(source.c.provider == provider)
+        if search_term:
+            stmt = stmt.where(func.lower(column).like(f"%{search_term.strip().lower()}%"))
+        grouped = stmt.group_by(column).subquery("grouped")
+        ranked = select(
+            grouped.c.key,
+            grouped.c.total,
+            func.row_number().over(order_by=[grouped.c.total.desc(), grouped.c.key]).label("position"),
+            func.sum(grouped.c.total).over().label("grand_total"),
+            func.count().over().label("group_count"),
+        ).subquery("ranked")
+        # Rows before the offset come along so the totals survive an empty page.
+        result = session.execute(
+            select(ranked.c.key, ranked.c.total, ranked.c.grand_total, ranked.c.group_count)
+            .where(ranked.c.position <= offset + limit)
+            .order_by(ranked.c.position)
+        ).all()
+        grand_total = (result[0].grand_total or 0.0) if result else 0.0
+        group_count = result[0].group_count if result else 0
+        rows = [(row.key, row.total or 0.0) for row in result[offset:]]
+    return TopGroups(
+        rows=rows,
+        other=grand_total - sum(row[1] or 0.0 for row in rows),
+        other_groups=group_count - len(rows),
+        grand_total=grand_total,
+    )
+
+
+def get_daily_totals(session: Session, start: date, end: date, currency: str = "USD"):
+    cube = cost_cube.current_cube(start)
+    if cube is not None:
+        return cube.daily_totals(start, end, currency)
+    source = cost_source(session, start, end, by_day=True)
     stmt = (
-        select(CostEntry.date, func.sum(usd_cost_expr()))
-        .where(CostEntry.date.between(start, end))
-        .group_by(CostEntry.date)
-        .order_by(CostEntry.date)
+        select(source.c.date, func.sum(cost_expr(currency, source)))
+        .where(source.c.date.between(start, end))
+        .group_by(source.c.date)
+        .order_by(source.c.date)
     )
     return session.execute(stmt).all()
 
 
-def get_daily_totals_by_provider(session: Session, start: date, end: date):
+def get_daily_totals_by_provider(session: Session, start: date, end: date, currency: str = "USD"):
+    cube = cost_cube.current_cube(start)
+    if cube is not None:
+        return cube.daily_totals_by_provider(start, end, currency)
+    source = cost_source(session, start, end, by_day=True)
     stmt = (
-        select(CostEntry.provider, CostEntry.date, func.sum(usd_cost_expr()))
-        .where(CostEntry.date.between(start, end))
-        .group_by(CostEntry.provider, CostEntry.date)
-        .order_by(CostEntry.provider, CostEntry.date)
+        select(source.c.provider, source.c.date, func.sum(cost_expr(currency, source)))
+        .where(source.c.date.between(start, end))
+        .group_by(source.c.provider, source.c.date)
+        .order_by(source.c.provider, source.c.date)
     )
     return session.execute(stmt).all()
 
 
-def get_top_services(session: Session, start: date, end: date, limit: int):
+def get_top_services(session: Session, start: date, end: date, limit: int, currency: str = "USD"):
+    cube = cost_cube.current_cube(start)
+    if cube is not None:
+        return cube.grouped(start, end, "service", limit=limit, currency=currency)
+    if duckdb_backend.active(start, end):
+        return duckdb_backend.grouped_cost(start, end, "service", limit=limit, currency=currency)
+    source = cost_source(session, start, end)
     stmt = (
-        select(CostEntry.service, func.sum(usd_cost_expr()))
-        .where(CostEntry.date.between(start, end))
-        .group_by(CostEntry.service)
-        .order_by(func.sum(usd_cost_expr()).desc())
+        select(source.c.service, func.sum(cost_expr(currency, source)))
+        .where(source.c.date.between(start, end))
+        .group_by(source.c.service)
+        .order_by(func.sum(cost_expr(currency, source)).desc())
         .limit(limit)
     )
     return session.execute(stmt).all()
 
 
 def get_entries_in_range(session: Session, start: date, end: date):
-    stmt = select(CostEntry).where(CostEntry.date.between(start, end))
-    return session.execute(stmt).scalars().all()
+    """Cost rows in range: ``CostEntry`` objects, or plain rows with the same
+    attributes when the range includes compacted months."""
+    source = cost_source(session, start, end)
+    if source is CostEntry.__table__:
+        stmt = select(CostEntry).where(CostEntry.date.between(start, end))
+        return session.execute(stmt).scalars().all()
+    return session.execute(select(source).where(source.c.date.between(start, end))).all()
 
 
 def get_freshness(session: Session):
@@ -149,11 +922,22 @@ def get_fx_last_updated(session: Session):
     return session.execute(stmt).scalar()
 
 
-def get_provider_totals_with_currency(session: Session, start: date, end: date):
+def get_fx_rate_rows(session: Session):
+    stmt = select(FxRate.date, FxRate.currency, FxRate.rate).order_by(FxRate.currency, FxRate.date)
+    return session.execute(stmt).all()
+
+
+def get_provider_totals_with_currency(session: Session, start: date, end: date, currency: str = "USD"):
+    cube = cost_cube.current_cube(start)
+    if cube is not None:
+        return cube.grouped(start, end, "provider", currency=currency, order_by_key=True)
+    if duckdb_backend.active(start, end):
+        return duckdb_backend.grouped_cost(start, end, "provider", currency=currency, order_by_key=True)
+    source = cost_source(session, start, end)
     stmt = (
-        select(CostEntry.provider, func.sum(usd_cost_expr()))
-        .where(CostEntry.date.between(start, end))
-        .group_by(CostEntry.provider)
-        .order_by(CostEntry.provider, func.sum(usd_cost_expr()).desc())
+        select(source.c.provider, func.sum(cost_expr(currency, source)))
+        .where(source.c.date.between(start, end))
+        .group_by(source.c.provider)
+        .order_by(source.c.provider, func.sum(cost_expr(currency, source)).desc())
     )
     return session.execute(stmt).all()
@@ -0,0 +1,388 @@
+"""Optional in-process cost cube for the aggregation routes.
+
+With ``COST_CUBE_ENABLED=1`` the API keeps the last ``COST_CUBE_MONTHS`` of
+daily cost rows in NumPy arrays: dimensions are dictionary-encoded to integer
+codes, rows are sorted by day, and costs are kept in native currency together
+with a precomputed USD column. Totals, grouped costs and daily series for
+ranges the cube covers are answered with ``bincount`` instead of SQL; the FX
+conversion follows ``crud.cost_expr`` (latest rate on or before the day).
+
+A background thread polls the ingestion watermark (last successful ingestion
+run, newest FX rate, newest compacted month) every
+``COST_CUBE_REFRESH_SECONDS``. A new ingestion reloads only the last
+``LOOKBACK_DAYS``; FX changes only recompute the conversion factors; compaction
+and ``COST_CUBE_FULL_RELOAD_SECONDS`` trigger a full reload, which also picks
+up backfills. Each API process holds its own cube.
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from fastapi import FastAPI
+from sqlalchemy import func, select
+
+from api.db import SessionLocal
+from api.models import CostEntry, CostMonthly, FxRate, IngestionRun
+
+DIMENSIONS = ("provider", "account_id", "service", "region")
+LOAD_BATCH_SIZE = 50000
+
+
+def cube_enabled() -> bool:
+    return os.getenv("COST_CUBE_ENABLED", "0") == "1"
+
+
+def _window_start(today: date, months: int) -> date:
+    index = today.year * 12 + today.month - 1 - (months - 1)
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class Dictionary:
+    """Maps dimension values to dense integer codes; codes are never reused."""
+
+    def __init__(self):
+        self.values: List[Optional[str]] = []
+        self.codes: Dict[Optional[str], int] = {}
+
+    def encode(self, values: Sequence[Optional[str]]) -> np.ndarray:
+        codes = self.codes
+        out = np.empty(len(values), dtype=np.int32)
+        for idx, value in enumerate(values):
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(self.values)
+                self.values.append(value)
+            out[idx] = code
+        return out
+
+    def matching(self, term: str) -> np.ndarray:
+        term = term.strip().lower()
+        return np.array([value is not None and term in value.lower() for value in self.values], dtype=bool)
+
+
+@dataclass
+class CostCube:
+    start: date
+    day: np.ndarray
+    cost: np.ndarray
+    currency: np.ndarray
+    codes: Dict[str, np.ndarray]
+    dictionaries: Dict[str, Dictionary]
+    currencies: Dictionary
+    fx: List[Tuple[date, str, float]]
+    _factors: Dict[str, np.ndarray] = field(default_factory=dict, repr=False)
+    _amounts: Dict[str, np.ndarray] = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self):
+        self.amount("USD")
+
+    @property
+    def rows(self) -> int:
+        return len(self.day)
+
+    def covers(self, start: date) -> bool:
+        return start >= self.start
+
+    def _conversion_factors(self, currency: str) -> np.ndarray:
+        """Factor per (row currency code, day offset) converting into ``currency``."""
+        days = int(self.day[-1]) + 1 if self.rows else 1
+        day_dates = np.array(
+            [self.start + timedelta(days=offset) for offset in range(days)], dtype="datetime64[D]"
+        )
+        series: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for fx_date, fx_currency, rate in self.fx:
+            dates, rates = series.setdefault(fx_currency, ([], []))
+            dates.append(fx_date)
+            rates.append(rate)
+
+        def as_of(code: str) -> np.ndarray:
+            if code not in series:
+                return np.full(days, np.nan)
+            dates = np.array(series[code][0], dtype="datetime64[D]")
+            rates = np.array(series[code][1], dtype=np.float64)
+            idx = np.searchsorted(dates, day_dates, side="right") - 1
+            return np.where(idx >= 0, rates[np.maximum(idx, 0)], np.nan)
+
+        target = as_of(currency)
+        factors = np.ones((max(len(self.currencies.values), 1), days), dtype=np.float64)
+        for code, value in enumerate(self.currencies.values):
+            if value == currency:
+                continue
+            source = as_of(value)
+            both = ~np.isnan(source) & ~np.isnan(target)
+            factors[code, both] = target[both] / source[both]
+        return factors
+
+    def amount(self, currency: str) -> np.ndarray:
+        with self._lock:
+            amounts = self._amounts.get(currency)
+            factors = self._factors.get(currency)
+        if amounts is not None:
+            return amounts
+        # Converting outside the lock keeps concurrent requests for cached
+        # currencies from waiting; two racing misses just compute it twice.
+        if factors is None:
+            factors = self._conversion_factors(currency)
+        amounts = self.cost * factors[self.currency, self.day] if self.rows else self.cost
+        with self._lock:
+            self._factors[currency] = factors
+            # Keep USD (the default) and the most recent other currency.
+            if currency != "USD":
+                for key in [key for key in self._amounts if key != "USD"]:
+                    self._amounts.pop(key, None)
+            self._amounts[currency] = amounts
+        return amounts
+
+    def _slice(self, start: date, end: date) -> slice:
+        lo = np.searchsorted(self.day, (start - self.start).days, side="left")
+        hi = np.searchsorted(self.day, (end - self.start).days, side="right")
+        return slice(int(lo), int(hi))
+
+    def _filtered(self, start: date, end: date, currency: str, provider: Optional[str]):
+        rows = self._slice(start, end)
+        amounts = self.amount(currency)[rows]
+        mask = None
+        if provider:
+            code = self.dictionaries["provider"].codes.get(provider, -1)
+            mask = self.codes["provider"][rows] == code
+            amounts = amounts[mask]
+        return rows, mask, amounts
+
+    def total(self, start: date, end: date, currency: str = "USD") -> float:
+        return float(self.amount(currency)[self._slice(start, end)].sum())
+
+    def grouped(
+        self,
+        start: date,
+        end: date,
+        dimension: str,
+        provider: Optional[str] = None,
+        search_term: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        currency: str = "USD",
+        order_by_key: bool = False,
+    ) -> List[Tuple[Optional[str], float]]:
+        rows, mask, amounts = self._filtered(start, end, currency, provider)
+        codes = self.codes[dimension][rows]
+        if mask is not None:
+            codes = codes[mask]
+        dictionary = self.dictionaries[dimension]
+        size = len(dictionary.values)
+        totals = np.bincount(codes, weights=amounts, minlength=size)
+        present = np.bincount(codes, minlength=size) > 0
+        if search_term:
+            # Tail reloads extend the shared dictionaries while older cubes serve.
+            present &= dictionary.matching(search_term)[:size]
+        keys = np.flatnonzero(present)
+        values = dictionary.values
+        keys = np.array(sorted(keys, key=lambda code: (values[code] is None, values[code] or "")), dtype=np.int64)
+        if not order_by_key:
+            # Stable over key order, so equal totals stay in key order like
+            # ``ORDER BY total DESC, key`` on SQL.
+            keys = keys[np.argsort(-totals[keys], kind="stable")]
+        keys = keys[offset or 0 :]
+        if limit is not None:
+            keys = keys[:limit]
+        return [(dictionary.values[code], float(totals[code])) for code in keys]
+
+    def daily_totals(self, start: date, end: date, currency: str = "USD") -> List[Tuple[date, float]]:
+        rows = self._slice(start, end)
+        days = self.day[rows] - (start - self.start).days
+        totals = np.bincount(days, weights=self.amount(currency)[rows])
+        present = np.bincount(days) > 0
+        offsets = np.flatnonzero(present)
+        return [(start + timedelta(days=int(offset)), float(totals[offset])) for offset in offsets]
+
+    def daily_totals_by_provider(
+        self, start: date, end: date, currency: str = "USD"
+    ) -> List[Tuple[str, date, float]]:
+        rows = self._slice(start, end)
+        span = (end - start).days + 1
+        providers = self.codes["provider"][rows]
+        cells = providers.astype(np.int64) * span + (self.day[rows] - (start - self.start).days)
+        size = len(self.dictionaries["provider"].values) * span
+        totals = np.bincount(cells, weights=self.amount(currency)[rows], minlength=size)
+        present = np.bincount(cells, minlength=size) > 0
+        values = self.dictionaries["provider"].values
+        result = [
+            (values[cell // span], start + timedelta(days=int(cell % span)), float(totals[cell]))
+            for cell in np.flatnonzero(present)
+        ]
+        return sorted(result, key=lambda row: (row[0], row[1]))
+
+
+def _load_rows(
+    session, start: date, dictionaries: Dict[str, Dictionary], currencies: Dictionary, cube_start: date
+):
+    """Read daily rows from ``start`` on, encoded against the given dictionaries."""
+    stmt = (
+        select(
+            CostEntry.date,
+            CostEntry.provider,
+            CostEntry.account_id,
+            CostEntry.service,
+            CostEntry.region,
+            CostEntry.cost,
+            CostEntry.currency,
+        )
+        .where(CostEntry.date >= start)
+        .order_by(CostEntry.date)
+        .execution_options(yield_per=LOAD_BATCH_SIZE)
+    )
+    parts = []
+    for batch in session.execute(stmt).partitions():
+        columns = list(zip(*batch))
+        parts.append(
+            (
+                np.array([(value - cube_start).days for value in columns[0]], dtype=np.int32),
+                np.array(columns[5], dtype=np.float64),
+                currencies.encode(columns[6]),
+                {name: dictionaries[name].encode(columns[idx + 1]) for idx, name in enumerate(DIMENSIONS)},
+            )
+        )
+    if not parts:
+        empty = np.array([], dtype=np.int32)
+        return empty, np.array([], dtype=np.float64), empty, {name: empty for name in DIMENSIONS}
+    return (
+        np.concatenate([part[0] for part in parts]),
+        np.concatenate([part[1] for part in parts]),
+        np.concatenate([part[2] for part in parts]),
+        {name: np.concatenate([part[3][name] for part in parts]) for name in DIMENSIONS},
+    )
+
+
+def _load_fx(session) -> List[Tuple[date, str, float]]:
+    stmt = select(FxRate.date, FxRate.currency, FxRate.rate).order_by(FxRate.currency, FxRate.date)
+    return [tuple(row) for row in session.execute(stmt).all()]
+
+
+def _watermark(session) -> Tuple:
+    return (
+        session.scalar(
+            select(func.max(IngestionRun.finished_at)).where(IngestionRun.status == "succeeded")
+        ),
+        session.scalar(select(func.max(FxRate.date))),
+        session.scalar(select(func.max(CostMonthly.date))),
+    )
+
+
+def _cube_start(session, today: date) -> date:
+    start = _window_start(today, int(os.getenv("COST_CUBE_MONTHS", "13")))
+    compacted_through = session.scalar(select(func.max(CostMonthly.date)))
+    if compacted_through is not None:
+        # Compacted months stay on the SQL path, which prorates them.
+        start = max(start, (compacted_through.replace(day=28) + timedelta(days=4)).replace(day=1))
+    return start
+
+
+def load_cube(session, today: Optional[date] = None) -> CostCube:
+    start = _cube_start(session, today or date.today())
+    dictionaries = {name: Dictionary() for name in DIMENSIONS}
+    currencies = Dictionary()
+    day, cost, currency, codes = _load_rows(session, start, dictionaries, currencies, start)
+    return CostCube(start, day, cost, currency, codes, dictionaries, currencies, _load_fx(session))
+
+
+def reload_tail(session, cube: CostCube, since: date, today: Optional[date] = None) -> CostCube:
+    """Replace rows from ``since`` on, keeping older rows and the dictionaries."""
+    start = _cube_start(session, today or date.today())
+    if start != cube.start:
+        return load_cube(session, today)
+    keep = slice(0, int(np.searchsorted(cube.day, (since - cube.start).days, side="left")))
+    day, cost, currency, codes = _load_rows(session, since, cube.dictionaries, cube.currencies, cube.start)
+    return CostCube(
+        cube.start,
+        np.concatenate([cube.day[keep], day]),
+        np.concatenate([cube.cost[keep], cost]),
+        np.concatenate([cube.currency[keep], currency]),
+        {name: np.concatenate([cube.codes[name][keep], codes[name]]) for name in DIMENSIONS},
+        cube.dictionaries,
+        cube.currencies,
+        _load_fx(session),
+    )
+
+
+_cube: Optional[CostCube] = None
+
+
+def current_cube(start: date) -> Optional[CostCube]:
+    """The loaded cube if it covers ranges starting at ``start``."""
+    cube = _cube
+    if cube is None or not cube.covers(start):
+        return None
+    return cube
+
+
+class CubeRefresher:
+    def __init__(self):
+        self.interval = float(os.getenv("COST_CUBE_REFRESH_SECONDS", "30"))
+        self.full_reload_seconds = float(os.getenv("COST_CUBE_FULL_RELOAD_SECONDS", str(6 * 3600)))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="cost-cube", daemon=True)
+        self._watermark = None
+        self._loaded_at = 0.0
+
+    def refresh(self):
+        global _cube
+        session = SessionLocal()
+        try:
+            watermark = _watermark(session)
+            stale = time.monotonic() - self._loaded_at >= self.full_reload_seconds
+            if _cube is not None and watermark == self._watermark and not stale:
+                return
+            started = time.perf_counter()
+            full = _cube is None or self._watermark is None or watermark[2] != self._watermark[2] or stale
+            if full:
+                cube = load_cube(session)
+                self._loaded_at = time.monotonic()
+                kind = "full"
+            elif watermark[0] != self._watermark[0]:
+                since = date.today() - timedelta(days=int(os.getenv("LOOKBACK_DAYS", "7")))
+                cube = reload_tail(session, _cube, max(since, _cube.start))
+                kind = f"tail from {since}"
+            else:
+                cube = CostCube(
+                    _cube.start,
+                    _cube.day,
+                    _cube.cost,
+                    _cube.currency,
+                    _cube.codes,
+                    _cube.dictionaries,
+                    _cube.currencies,
+                    _load_fx(session),
+                )
+                kind = "fx"
+        finally:
+            session.close()
+        _cube = cube
+        self._watermark = watermark
+        elapsed = time.perf_counter() - started
+        print(f"[cube] {kind} reload: {cube.rows} rows since {cube.start} in {elapsed:.2f}s")
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as exc:
+                print(f"[cube] refresh failed: {exc}")
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def install_cube(app: FastAPI):
+    refresher = CubeRefresher()
+    app.router.on_startup.append(refresher.start)
+    app.router.on_shutdown.append(refresher.stop)
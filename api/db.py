@@ -1,5 +1,6 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 
 
@@ -7,13 +8,27 @@ def get_database_url() -> str:
     return os.getenv("DATABASE_URL", "sqlite:///./costs.db")
 
 
-def build_engine():
+def is_memory_database(database_url: str) -> bool:
+    url = make_url(database_url)
+    return url.get_backend_name() == "sqlite" and (
+        url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+    )
+
+
+def build_engine(**options):
     database_url = get_database_url()
     connect_args = {}
     if database_url.startswith("sqlite:"):
         connect_args = {"check_same_thread": False}
-    return create_engine(database_url, connect_args=connect_args, future=True)
+    return create_engine(database_url, connect_args=connect_args, future=True, **options)
 
 
 ENGINE = build_engine()
 SessionLocal = sessionmaker(bind=ENGINE, autoflush=False, autocommit=False, future=True)
+
+
+def install_listeners(engine, listeners):
+    """Attach ``(event name, listener)`` pairs to ``engine``, each only once."""
+    for name, listener in listeners:
+        if not event.contains(engine, name, listener):
+            event.listen(engine, name, listener)
@@ -1,10 +1,11 @@
 from datetime import date, timedelta
 from typing import Optional, Tuple
 
-from fastapi import HTTPException
+from fastapi import Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from api.db import SessionLocal
+from api.services.fx import get_fx_converter
 
 
 def get_session():
@@ -23,3 +24,10 @@ def parse_date_range(start: Optional[date], end: Optional[date]) -> Tuple[date,
     if start > end:
         raise HTTPException(status_code=400, detail="from date must be <= to date")
     return start, end
+
+
+def get_display_currency(currency: str = "USD", session: Session = Depends(get_session)) -> str:
+    code = currency.strip().upper()
+    if code != "USD" and code not in get_fx_converter(session).currencies:
+        raise HTTPException(status_code=400, detail=f"Unsupported currency: {code}")
+    return code
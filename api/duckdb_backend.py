@@ -0,0 +1,157 @@
+"""Optional DuckDB backend that answers aggregate queries from the Parquet export.
+
+``DUCKDB_ROUTES`` lists the route templates to serve from Parquet (for example
+``/costs/by-tag,/costs/by-service``, or ``*`` for every route). On those
+routes the total, grouped, top-services, provider-total and by-tag queries in
+``api.crud`` and the by-tag router run in an embedded DuckDB over
+``PARQUET_DIR`` instead of the primary database, as long as the export's
+coverage manifest (see ``core.lake``) includes the queried range. Everything
+else, including ranges the export does not cover, stays on SQLAlchemy.
+
+Results match the SQL path: compacted months are prorated and dated like
+``crud.cost_source`` (using the exported ``span_days``), and FX conversion
+uses the latest rate on or before each entry's date, done with ``ASOF`` joins.
+"""
+
+import os
+import threading
+from contextvars import ContextVar
+from datetime import date
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from fastapi import FastAPI, Request
+
+from core.lake import cost_entries_glob, covers, fx_rates_path, lake_dir
+
+GROUP_COLUMNS = {"provider", "account_id", "service", "region"}
+
+current_backend: ContextVar[bool] = ContextVar("duckdb_backend", default=False)
+_connection = None
+_connection_lock = threading.Lock()
+
+
+def duckdb_routes() -> Set[str]:
+    return {item.strip() for item in os.getenv("DUCKDB_ROUTES", "").split(",") if item.strip()}
+
+
+def active(start: date, end: date) -> bool:
+    return current_backend.get() and covers(lake_dir(), start, end)
+
+
+def _cursor():
+    global _connection
+    with _connection_lock:
+        if _connection is None:
+            import duckdb
+
+            _connection = duckdb.connect()
+        # Cursors are independent connections to the same in-memory database
+        # and are safe to use from the request thread that created them; use
+        # them as context managers so they are closed after the query.
+        return _connection.cursor()
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _converted_costs(start: date, end: date) -> str:
+    """SQL for the cost rows in ``[start, end]`` with ``amount`` in ``$currency``."""
+    root = lake_dir()
+    return f"""
+        WITH costs AS (
+            SELECT
+                greatest(date, DATE '{start.isoformat()}') AS date,
+                provider, account_id, service, region, currency, tags,
+                cost * (least(date + (span_days - 1), DATE '{end.isoformat()}')
+                        - greatest(date, DATE '{start.isoformat()}') + 1) / span_days AS cost
+            FROM read_parquet(
+                {_quote(cost_entries_glob(root))}, hive_partitioning = true, hive_types = {{'month': VARCHAR}}
+            )
+            WHERE month BETWEEN '{start:%Y-%m}' AND '{end:%Y-%m}'
+              AND date <= DATE '{end.isoformat()}'
+              AND date + (span_days - 1) >= DATE '{start.isoformat()}'
+        ),
+        fx AS (SELECT date, currency, rate FROM read_parquet({_quote(str(fx_rates_path(root)))})),
+        target AS (SELECT date, rate FROM fx WHERE currency = $currency),
+        converted AS (
+            SELECT
+                costs.*,
+                CASE
+                    WHEN costs.currency = $currency THEN costs.cost
+                    WHEN source_fx.rate IS NOT NULL AND target.rate IS NOT NULL
+                        THEN costs.cost / source_fx.rate * target.rate
+                    ELSE costs.cost
+                END AS amount
+            FROM costs
+            ASOF LEFT JOIN fx AS source_fx ON source_fx.currency = costs.currency AND costs.date >= source_fx.date
+            ASOF LEFT JOIN target ON costs.date >= target.date
+        )
+    """
+
+
+def _execute(sql: str, params: Dict[str, Any]) -> List[Tuple]:
+    with _cursor() as cursor:
+        return cursor.execute(sql, params).fetchall()
+
+
+def total_cost(start: date, end: date, currency: str = "USD") -> float:
+    rows = _execute(f"{_converted_costs(start, end)} SELECT sum(amount) FROM converted", {"currency": currency})
+    return rows[0][0] or 0.0
+
+
+def grouped_cost(
+    start: date,
+    end: date,
+    column: str,
+    provider: Optional[str] = None,
+    search_term: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+    currency: str = "USD",
+    order_by_key: bool = False,
+) -> List[Tuple[str, float]]:
+    if column not in GROUP_COLUMNS:
+        raise ValueError(f"cannot group by {column}")
+    params: Dict[str, Any] = {"currency": currency}
+    filters = []
+    if provider:
+        filters.append("provider = $provider")
+        params["provider"] = provider
+    if search_term:
+        filters.append(f"lower({column}) LIKE $pattern")
+        params["pattern"] = f"%{search_term.strip().lower()}%"
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+    order = f"{column}, total DESC" if order_by_key else f"total DESC, {column}"
+    sql = (
+        f"{_converted_costs(start, end)} SELECT {column}, sum(amount) AS total "
+        f"FROM converted {where} GROUP BY {column} ORDER BY {order}"
+    )
+    if limit is not None:
+        sql += f" LIMIT {int(limit)}"
+    if offset is not None:
+        sql += f" OFFSET {int(offset)}"
+    return _execute(sql, params)
+
+
+def tag_cost(start: date, end: date, tag: str, currency: str = "USD") -> List[Tuple[Optional[str], float]]:
+    sql = (
+        f"{_converted_costs(start, end)} SELECT json_extract_string(tags, $path) AS tag_value, sum(amount) AS total "
+        "FROM converted GROUP BY tag_value ORDER BY total DESC"
+    )
+    return _execute(sql, {"currency": currency, "path": f"$.{tag}"})
+
+
+def install_duckdb_routing(app: FastAPI):
+    from api.metrics import route_template
+
+    routes = duckdb_routes()
+
+    @app.middleware("http")
+    async def duckdb_routing(request: Request, call_next):
+        use_duckdb = "*" in routes or route_template(app, request) in routes
+        token = current_backend.set(use_duckdb)
+        try:
+            return await call_next(request)
+        finally:
+            current_backend.reset(token)
@@ -4,6 +4,11 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
+from api.cube import cube_enabled, install_cube
+from api.duckdb_backend import duckdb_routes, install_duckdb_routing
+from api.metrics import install_metrics
+from api.profiling import install_profiling
+from api.query_log import install_query_accounting
 from api.routers import costs, exports, tags
 
 app = FastAPI(title="Unified Cost Center")
@@ -13,20 +18,34 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Cost"],
 )
 
 API_KEY = os.getenv("API_KEY")
 
+# Registered before api_key_guard so the guard wraps it: a profile header is
+# only honoured on requests that already passed the API key check.
+install_profiling(app)
+
 
 @app.middleware("http")
 async def api_key_guard(request: Request, call_next):
-    if not API_KEY or request.url.path == "/health":
+    if not API_KEY or request.url.path in ("/health", "/metrics"):
         return await call_next(request)
     if request.headers.get("x-api-key") != API_KEY:
         return JSONResponse(status_code=401, content={"detail": "Unauthorized"})
     return await call_next(request)
 
 
+if cube_enabled():
+    install_cube(app)
+if duckdb_routes():
+    install_duckdb_routing(app)
+if os.getenv("QUERY_ACCOUNTING_ENABLED", "1") == "1":
+    install_query_accounting(app)
+if os.getenv("METRICS_ENABLED", "1") == "1":
+    install_metrics(app)
+
 app.include_router(costs.router)
 app.include_router(tags.router)
 app.include_router(exports.router)
@@ -0,0 +1,104 @@
+import time
+from contextvars import ContextVar
+
+from fastapi import FastAPI, Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from starlette.routing import Match
+
+from api.db import ENGINE, install_listeners
+
+REQUEST_LATENCY = Histogram(
+    "uccc_http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+RESPONSE_SIZE = Histogram(
+    "uccc_http_response_size_bytes",
+    "HTTP response body size by route template.",
+    ["route"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+IN_FLIGHT = Gauge("uccc_http_requests_in_flight", "HTTP requests currently being served.", ["route"])
+SQL_STATEMENTS = Counter("uccc_db_statements_total", "SQL statements executed, by API route.", ["route"])
+SQL_DURATION = Histogram(
+    "uccc_db_statement_duration_seconds",
+    "SQL statement execution time, by API route.",
+    ["route"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 10),
+)
+
+# Route template of the request being served; sync endpoints run in a thread
+# pool, which copies the context, so cursor events see the right route.
+current_route: ContextVar[str] = ContextVar("current_route", default="none")
+
+
+def route_template(app: FastAPI, request: Request) -> str:
+    for route in app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", request.url.path)
+    return "unmatched"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    route = current_route.get()
+    SQL_STATEMENTS.labels(route).inc()
+    SQL_DURATION.labels(route).observe(elapsed)
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+
+async def _count_streamed(body_iterator, route: str):
+    size = 0
+    async for chunk in body_iterator:
+        size += len(chunk)
+        yield chunk
+    RESPONSE_SIZE.labels(route).observe(size)
+
+
+def install_metrics(app: FastAPI):
+    install_listeners(
+        ENGINE,
+        (
+            ("before_cursor_execute", _before_cursor_execute),
+            ("after_cursor_execute", _after_cursor_execute),
+            ("handle_error", _handle_error),
+        ),
+    )
+
+    @app.middleware("http")
+    async def metrics_middleware(request: Request, call_next):
+        route = route_template(app, request)
+        if route == "/metrics":
+            return await call_next(request)
+        token = current_route.set(route)
+        IN_FLIGHT.labels(route).inc()
+        started = time.perf_counter()
+        status = "500"
+        try:
+            response = await call_next(request)
+            status = str(response.status_code)
+            size = response.headers.get("content-length")
+            if size is not None:
+                RESPONSE_SIZE.labels(route).observe(int(size))
+            elif hasattr(response, "body_iterator"):
+                response.body_iterator = _count_streamed(response.body_iterator, route)
+            return response
+        finally:
+            REQUEST_LATENCY.labels(request.method, route, status).observe(time.perf_counter() - started)
+            IN_FLIGHT.labels(route).dec()
+            current_route.reset(token)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Date, DateTime, Float, Index, JSON, String, UniqueConstraint, func
+from sqlalchemy import Boolean, Column, Date, DateTime, Float, Index, Integer, JSON, String, UniqueConstraint, func
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
@@ -17,6 +17,7 @@ class CostEntry(Base):
     cost = Column(Float, nullable=False)
     currency = Column(String, nullable=False)
     tags = Column(JSON, nullable=True)
+    content_hash = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     __table_args__ = (
@@ -47,3 +48,96 @@ class FxRate(Base):
         UniqueConstraint("date", "currency", name="uq_fx_rate_date_currency"),
         Index("idx_fx_rates_date_currency", "date", "currency"),
     )
+
+
+class IngestionState(Base):
+    __tablename__ = "ingestion_state"
+
+    id = Column(String, primary_key=True)
+    provider = Column(String, nullable=False, index=True)
+    account_id = Column(String, nullable=False)
+    date = Column(Date, nullable=False)
+    is_final = Column(Boolean, nullable=False, default=False)
+    collected_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("provider", "account_id", "date", name="uq_ingestion_state_scope_date"),
+        Index("idx_ingestion_state_provider_date", "provider", "date"),
+    )
+
+
+class BackfillProgress(Base):
+    __tablename__ = "backfill_progress"
+
+    id = Column(String, primary_key=True)
+    provider = Column(String, nullable=False, index=True)
+    account_id = Column(String, nullable=False)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    status = Column(String, nullable=False)
+    rows = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("provider", "account_id", "start_date", "end_date", name="uq_backfill_progress_window"),
+    )
+
+
+class WorkItem(Base):
+    __tablename__ = "work_items"
+
+    id = Column(String, primary_key=True)
+    provider = Column(String, nullable=False)
+    account_id = Column(String, nullable=False)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    available_at = Column(DateTime(timezone=True), nullable=False)
+    lease_owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(String, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    __table_args__ = (Index("idx_work_items_status_available", "status", "available_at"),)
+
+
+class IngestionRun(Base):
+    __tablename__ = "ingestion_runs"
+
+    id = Column(String, primary_key=True)
+    provider = Column(String, nullable=False)
+    trigger = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="running")
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    phases = Column(JSON, nullable=True)
+    api_calls = Column(Integer, nullable=False, default=0)
+    pages = Column(Integer, nullable=False, default=0)
+    rows_fetched = Column(Integer, nullable=False, default=0)
+    rows_written = Column(Integer, nullable=False, default=0)
+    rows_unchanged = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+
+    __table_args__ = (Index("idx_ingestion_runs_provider_started", "provider", "started_at"),)
+
+
+class CostMonthly(Base):
+    # Compacted cost_entries: one row per month (``date`` is the 1st) and
+    # provider, account, service, region, currency and tag set.
+    __tablename__ = "cost_monthly"
+
+    id = Column(String, primary_key=True)
+    date = Column(Date, nullable=False, index=True)
+    provider = Column(String, nullable=False, index=True)
+    account_id = Column(String, nullable=False)
+    account_name = Column(String, nullable=True)
+    service = Column(String, nullable=False)
+    region = Column(String, nullable=True)
+    cost = Column(Float, nullable=False)
+    currency = Column(String, nullable=False)
+    tags = Column(JSON, nullable=True)
+    source_rows = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
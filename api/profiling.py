@@ -0,0 +1,172 @@
+"""On-demand sampling profiler for single API requests.
+
+A request carrying ``X-Profile: <PROFILE_TOKEN>`` (on top of the API key) is
+sampled while it is served, and the result is stored as a speedscope file
+(https://www.speedscope.app) whose download path is returned in the
+``X-Profile-Url`` response header. Without ``PROFILE_TOKEN`` the feature is
+off; requests without the header only pay a header lookup. Only one request is
+profiled at a time; others are served unprofiled with ``X-Profile-Skipped:
+busy``. Only the newest ``PROFILE_KEEP`` files are kept in ``PROFILE_DIR``.
+
+Sync endpoints run in the thread pool, so every thread is sampled and written
+as its own speedscope profile. Threads that never ran code from this repo (idle
+pool workers, the sampler) are dropped.
+"""
+
+import json
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+
+PROFILE_HEADER = "x-profile"
+REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+_profile_lock = threading.Lock()
+
+
+def _profile_dir() -> Path:
+    return Path(os.getenv("PROFILE_DIR", "/tmp/uccc-profiles"))
+
+
+def _save_profile(profile_id: str, document: Dict[str, object]):
+    directory = _profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / f"{profile_id}.speedscope.json").write_text(json.dumps(document))
+    keep = max(int(os.getenv("PROFILE_KEEP", "50")), 1)
+    profiles = sorted(directory.glob("*.speedscope.json"), key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in profiles[keep:]:
+        path.unlink(missing_ok=True)
+
+
+def profile_authorized(request: Request) -> bool:
+    token = os.getenv("PROFILE_TOKEN")
+    supplied = request.headers.get(PROFILE_HEADER)
+    return bool(token and supplied and secrets.compare_digest(supplied, token))
+
+
+class Sampler:
+    """Samples the stacks of all threads every ``interval`` seconds."""
+
+    def __init__(self, interval: float, max_seconds: float):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.frames: List[Dict[str, object]] = []
+        self._frame_index: Dict[Tuple[str, str, int], int] = {}
+        self.samples: Dict[int, List[Tuple[List[int], float]]] = {}
+        self.names: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def _frame_id(self, code) -> int:
+        key = (code.co_qualname, code.co_filename, code.co_firstlineno)
+        idx = self._frame_index.get(key)
+        if idx is None:
+            idx = len(self.frames)
+            self._frame_index[key] = idx
+            self.frames.append({"name": key[0], "file": key[1], "line": key[2]})
+        return idx
+
+    def _run(self):
+        own = threading.get_ident()
+        started = last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            weight = (now - last) * 1000
+            last = now
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_id(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples.setdefault(ident, []).append((stack, weight))
+            if now - started > self.max_seconds:
+                break
+        self.names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _runs_repo_code(self, samples: List[Tuple[List[int], float]]) -> bool:
+        return any(str(self.frames[idx]["file"]).startswith(REPO_ROOT) for stack, _ in samples for idx in stack)
+
+    def speedscope(self, name: str) -> Dict[str, object]:
+        profiles = []
+        for ident, samples in self.samples.items():
+            if not self._runs_repo_code(samples):
+                continue
+            total = sum(weight for _, weight in samples)
+            profiles.append(
+                {
+                    "type": "sampled",
+                    "name": f"{name} [{self.names.get(ident, ident)}]",
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": total,
+                    "samples": [stack for stack, _ in samples],
+                    "weights": [weight for _, weight in samples],
+                }
+            )
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "uccc",
+            "activeProfileIndex": 0,
+            "shared": {"frames": self.frames},
+            "profiles": profiles,
+        }
+
+
+def install_profiling(app: FastAPI):
+    @app.middleware("http")
+    async def profile_request(request: Request, call_next):
+        if PROFILE_HEADER not in request.headers or not profile_authorized(request):
+            return await call_next(request)
+        # One profile at a time: samples cover every thread in the process.
+        if not _profile_lock.acquire(blocking=False):
+            response = await call_next(request)
+            response.headers["X-Profile-Skipped"] = "busy"
+            return response
+        try:
+            sampler = Sampler(
+                float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000,
+                float(os.getenv("PROFILE_MAX_SECONDS", "60")),
+            )
+            sampler.start()
+            try:
+                response = await call_next(request)
+            finally:
+                sampler.stop()
+        finally:
+            _profile_lock.release()
+
+        profile_id = uuid.uuid4().hex
+        name = f"{request.method} {request.url.path}?{request.url.query}".rstrip("?")
+        await run_in_threadpool(_save_profile, profile_id, sampler.speedscope(name))
+        response.headers["X-Profile-Url"] = f"/debug/profiles/{profile_id}"
+        return response
+
+    @app.get("/debug/profiles/{profile_id}", include_in_schema=False)
+    def download_profile(profile_id: str, request: Request):
+        if not profile_authorized(request):
+            raise HTTPException(status_code=404, detail="Not found")
+        path = _profile_dir() / f"{profile_id}.speedscope.json"
+        if not PROFILE_ID.match(profile_id) or not path.exists():
+            raise HTTPException(status_code=404, detail="Profile not found")
+        return FileResponse(path, media_type="application/json", filename=path.name)
@@ -0,0 +1,237 @@
+"""Per-request SQL accounting and the slow-query log.
+
+Every request gets a ``Server-Timing`` header with its statement count and
+total DB time. Statements slower than ``SLOW_QUERY_MS`` are written to the slow
+query log with their bound parameters and, for SELECTs, a plan captured after
+the response: ``EXPLAIN (ANALYZE, BUFFERS)`` on PostgreSQL, ``EXPLAIN QUERY
+PLAN`` on SQLite. Plans run one at a time on a single background thread with
+its own one-connection engine, fed by a bounded queue that drops entries when
+full, so they never compete with requests for pool connections. Statements
+on an in-memory SQLite database are logged without a plan, since a second
+connection would see a different, empty database. Accounting hooks its own
+cursor events on ``ENGINE``, independent of ``api.metrics``.
+``SLOW_QUERY_SAMPLE_RATE`` and a per-statement cool-down (an LRU of the last
+``EXPLAIN_COOLDOWN_ENTRIES`` statements) bound the extra load, so this can stay
+on in production.
+"""
+
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+
+from api.db import ENGINE, build_engine, get_database_url, install_listeners, is_memory_database
+
+MAX_LOGGED_PARAMS = 20
+PLAN_TIMEOUT_MS = 30000
+SLOW_QUERY_QUEUE_SIZE = 100
+EXPLAIN_COOLDOWN_ENTRIES = 1000
+
+
+def _slow_query_ms() -> float:
+    return float(os.getenv("SLOW_QUERY_MS", "500"))
+
+
+def _sample_rate() -> float:
+    return float(os.getenv("SLOW_QUERY_SAMPLE_RATE", "0.1"))
+
+
+def _explain_interval() -> float:
+    return float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS", "300"))
+
+
+@dataclass
+class RequestQueries:
+    endpoint: str
+    statements: int = 0
+    db_seconds: float = 0.0
+    slow: List[Dict[str, Any]] = field(default_factory=list)
+
+
+current_queries: ContextVar[Optional[RequestQueries]] = ContextVar("current_queries", default=None)
+_last_explained: "OrderedDict[str, float]" = OrderedDict()
+_explain_lock = threading.Lock()
+_slow_queue: "queue.Queue[tuple[str, List[Dict[str, Any]]]]" = queue.Queue(maxsize=SLOW_QUERY_QUEUE_SIZE)
+_plan_engine = None
+_logger_started = False
+
+
+def _loggable(parameters: Any) -> Any:
+    if isinstance(parameters, dict):
+        items = list(parameters.items())
+        logged = {key: repr(value) for key, value in items[:MAX_LOGGED_PARAMS]}
+        if len(items) > MAX_LOGGED_PARAMS:
+            logged["..."] = f"{len(items) - MAX_LOGGED_PARAMS} more"
+        return logged
+    if isinstance(parameters, (list, tuple)):
+        logged = [repr(value) for value in parameters[:MAX_LOGGED_PARAMS]]
+        if len(parameters) > MAX_LOGGED_PARAMS:
+            logged.append(f"... {len(parameters) - MAX_LOGGED_PARAMS} more")
+        return logged
+    return repr(parameters)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("accounting_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["accounting_started"].pop()
+    record_statement(statement, parameters, executemany, elapsed)
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("accounting_started"):
+        connection.info["accounting_started"].pop()
+
+
+def record_statement(statement: str, parameters: Any, executemany: bool, elapsed: float):
+    """Account a finished statement to the current request."""
+    queries = current_queries.get()
+    if queries is None:
+        return
+    queries.statements += 1
+    queries.db_seconds += elapsed
+    threshold = _slow_query_ms()
+    if threshold and elapsed * 1000 >= threshold and random.random() < _sample_rate():
+        queries.slow.append(
+            {
+                "statement": statement,
+                "parameters": None if executemany else parameters,
+                "duration_ms": round(elapsed * 1000, 2),
+            }
+        )
+
+
+def _should_explain(statement: str) -> bool:
+    # EXPLAIN ANALYZE executes the statement, so anything but a plain read is
+    # only logged, never re-run.
+    if not statement.lstrip().upper().startswith("SELECT"):
+        return False
+    key = " ".join(statement.split())
+    now = time.monotonic()
+    with _explain_lock:
+        if now - _last_explained.get(key, float("-inf")) < _explain_interval():
+            return False
+        _last_explained[key] = now
+        _last_explained.move_to_end(key)
+        while len(_last_explained) > EXPLAIN_COOLDOWN_ENTRIES:
+            _last_explained.popitem(last=False)
+    return True
+
+
+def _get_plan_engine():
+    # Separate from ENGINE: one connection, and not seen by query accounting.
+    global _plan_engine
+    if _plan_engine is None:
+        _plan_engine = build_engine(pool_size=1, max_overflow=0)
+    return _plan_engine
+
+
+def explain(statement: str, parameters: Any) -> Optional[str]:
+    # A second engine on an in-memory SQLite database would open a new, empty
+    # database, so there is nothing to plan against.
+    if is_memory_database(get_database_url()):
+        return None
+    with _get_plan_engine().connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {PLAN_TIMEOUT_MS}")
+            rows = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters or ()).all()
+            return "\n".join(row[0] for row in rows)
+        if conn.dialect.name == "sqlite":
+            rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).all()
+            return "\n".join(" | ".join(str(value) for value in row) for row in rows)
+        return ""
+
+
+def write_slow_query(entry: Dict[str, Any]):
+    line = json.dumps(entry, default=str)
+    path = os.getenv("SLOW_QUERY_LOG")
+    if path:
+        with open(path, "a", encoding="utf-8") as handle:
+            handle.write(line + "\n")
+    else:
+        print(f"[slow-query] {line}")
+
+
+def _log_slow_queries(endpoint: str, slow: List[Dict[str, Any]]):
+    for item in slow:
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "endpoint": endpoint,
+            "duration_ms": item["duration_ms"],
+            "statement": item["statement"],
+            "parameters": _loggable(item["parameters"]),
+            "plan": None,
+        }
+        if item["parameters"] is not None and _should_explain(item["statement"]):
+            try:
+                entry["plan"] = explain(item["statement"], item["parameters"])
+            except Exception as exc:
+                entry["plan"] = f"EXPLAIN failed: {exc}"
+        write_slow_query(entry)
+
+
+def _slow_query_logger():
+    while True:
+        endpoint, slow = _slow_queue.get()
+        try:
+            _log_slow_queries(endpoint, slow)
+        except Exception as exc:
+            print(f"[slow-query] logging failed: {exc}")
+
+
+def enqueue_slow_queries(endpoint: str, slow: List[Dict[str, Any]]):
+    global _logger_started
+    with _explain_lock:
+        if not _logger_started:
+            threading.Thread(target=_slow_query_logger, name="slow-query", daemon=True).start()
+            _logger_started = True
+    try:
+        _slow_queue.put_nowait((endpoint, slow))
+    except queue.Full:
+        print(f"[slow-query] queue full, dropped {len(slow)} entries for {endpoint}")
+
+
+def server_timing(queries: RequestQueries, total_seconds: float) -> str:
+    return (
+        f'db;dur={queries.db_seconds * 1000:.1f};desc="{queries.statements} queries", '
+        f"app;dur={total_seconds * 1000:.1f}"
+    )
+
+
+def install_query_accounting(app: FastAPI):
+    install_listeners(
+        ENGINE,
+        (
+            ("before_cursor_execute", _before_cursor_execute),
+            ("after_cursor_execute", _after_cursor_execute),
+            ("handle_error", _handle_error),
+        ),
+    )
+
+    @app.middleware("http")
+    async def query_accounting(request: Request, call_next):
+        queries = RequestQueries(f"{request.method} {request.url.path}")
+        token = current_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            current_queries.reset(token)
+        response.headers["Server-Timing"] = server_timing(queries, time.perf_counter() - started)
+        if queries.slow:
+            # Plans are captured off the request path, on the plan engine and
+            # outside this request's accounting context.
+            enqueue_slow_queries(queries.endpoint, queries.slow)
+        return response
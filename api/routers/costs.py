@@ -1,27 +1,32 @@
-from datetime import date, datetime
+from datetime import date, datetime, timezone
 import os
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
-from api import crud
-from api.deps import get_session, parse_date_range
+from api import crud, duckdb_backend
+from api.deps import get_display_currency, get_session, parse_date_range
 from api.models import CostEntry
 from api.schemas import (
     AnomalyResponse,
     DataFreshnessResponse,
     DeltaGroupResponse,
     GroupedCostResponse,
+    IngestionRunResponse,
+    PivotResponse,
     ProviderBreakdownResponse,
     ProviderTotalResponse,
     SignalResponse,
+    TimeseriesResponse,
     TotalCostResponse,
 )
 from api.services.deltas import grouped_delta
+from api.services.pivot import build_pivot, parse_dimensions, parse_tag_filters
 from api.services.snapshot import build_snapshot
 from api.services.signals import build_signals
+from api.services.timeseries import build_timeseries, validate_timeseries
 from core.anomaly import compute_day_over_day
 
 router = APIRouter()
@@ -36,21 +41,23 @@ async def health_check():
 def total_cost(
     from_date: Optional[date] = Query(default=None, alias="from"),
     to_date: Optional[date] = Query(default=None, alias="to"),
+    currency: str = Depends(get_display_currency),
     session: Session = Depends(get_session),
 ):
     start, end = parse_date_range(from_date, to_date)
-    total = crud.get_total_cost(session, start, end)
-    return TotalCostResponse(total_cost=total, currency="USD")
+    total = crud.get_total_cost(session, start, end, currency)
+    return TotalCostResponse(total_cost=total, currency=currency)
 
 
 @router.get("/costs/by-provider", response_model=List[GroupedCostResponse])
 def by_provider(
     from_date: Optional[date] = Query(default=None, alias="from"),
     to_date: Optional[date] = Query(default=None, alias="to"),
+    currency: str = Depends(get_display_currency),
     session: Session = Depends(get_session),
 ):
     start, end = parse_date_range(from_date, to_date)
-    rows = crud.get_grouped_cost(session, start, end, CostEntry.provider)
+    rows = crud.get_grouped_cost(session, start, end, CostEntry.provider, currency=currency)
     return [GroupedCostResponse(key=row[0], total_cost=row[1]) for row in rows]
 
 
@@ -58,10 +65,11 @@ def by_provider(
 def provider_totals(
     from_date: Optional[date] = Query(default=None, alias="from"),
     to_date: Optional[date] = Query(default=None, alias="to"),
+    currency: str = Depends(get_display_currency),
     session: Session = Depends(get_session),
 ):
     start, end = parse_date_range(from_date, to_date)
-    rows = crud.get_provider_totals_with_currency(session, start, end)
+    rows = crud.get_provider_totals_with_currency(session, start, end, currency)
     totals: list[ProviderTotalResponse] = []
     seen = set()
     for provider, total in rows:
@@ -71,7 +79,7 @@ def provider_totals(
             ProviderTotalResponse(
                 provider=provider,
                 total_cost=total or 0.0,
-                currency="USD",
+                currency=currency,
             )
         )
         seen.add(provider)
@@ -82,23 +90,41 @@ def provider_totals(
 def snapshot(
     from_date: Optional[date] = Query(default=None, alias="from"),
     to_date: Optional[date] = Query(default=None, alias="to"),
+    currency: str = Depends(get_display_currency),
     session: Session = Depends(get_session),
 ):
     start, end = parse_date_range(from_date, to_date)
-    return build_snapshot(session, start, end)
+    return build_snapshot(session, start, end, currency)
+
+
+def with_other_row(top: crud.TopGroups, response: Response) -> List[GroupedCostResponse]:
+    """Rows plus an ``(other)`` remainder; the grand total goes in ``X-Total-Cost``."""
+    rows = [GroupedCostResponse(key=key, total_cost=total) for key, total in top.rows]
+    if top.other_groups > 0:
+        rows.append(GroupedCostResponse(key=crud.OTHER_KEY, total_cost=top.other))
+    response.headers["X-Total-Cost"] = repr(top.grand_total)
+    return rows
 
 
 @router.get("/costs/by-service", response_model=List[GroupedCostResponse])
 def by_service(
+    response: Response,
     from_date: Optional[date] = Query(default=None, alias="from"),
     to_date: Optional[date] = Query(default=None, alias="to"),
     provider: Optional[str] = None,
     search: Optional[str] = None,
     limit: int = 10,
     offset: int = 0,
+    other: bool = False,
+    currency: str = Depends(get_display_currency),
     session: Session = Depends(get_session),
 ):
     start, end = parse_date_range(from_date, to_date)
+    if other:
+        top = crud.get_top_grouped_cost(
+            session, start, end, CostEntry.service, provider, search, limit, offset, currency
+        )
+        return with_other_row(top, response)
     rows = crud.get_grouped_cost(
         session,
         start,
@@ -108,21 +134,30 @@ def by_service(
         search_term=search,
         limit=limit,
         offset=offset,
+        currency=currency,
     )
     return [GroupedCostResponse(key=row[0], total_cost=row[1]) for row in rows]
 
 
 @router.get("/costs/by-account", response_model=List[GroupedCostResponse])
 def by_account(
+    response: Response,
     from_date: Optional[date] = Query(default=None, alias="from"),
     to_date: Optional[date] = Query(default=None, alias="to"),
     provider: Optional[str] = None,
     search: Optional[str] = None,
     limit: int = 10,
     offset: int = 0,
+    other: bool = False,
+    currency: str = Depends(get_display_currency),
     session: Session = Depends(get_session),
 ):
     start, end = parse_date_range(from_date, to_date)
+    if other:
+        top = crud.get_top_grouped_cost(
+            session, start, end, CostEntry.account_id, provider, search, limit, offset, currency
+        )
+        return with_other_row(top, response)
     rows = crud.get_grouped_cost(
         session,
         start,
@@ -132,45 +167,82 @@ def by_account(
         search_term=search,
         limit=limit,
         offset=offset,
+        currency=currency,
     )
     return [GroupedCostResponse(key=row[0], total_cost=row[1]) for row in rows]
 
 
-def build_tag_expr(session: Session, tag: str):
-    dialect = session.bind.dialect.name
-    if dialect == "sqlite":
-        return func.json_extract(CostEntry.tags, f"$.{tag}")
-    return CostEntry.tags[tag].as_string()
-
-
 @router.get("/costs/by-tag", response_model=List[GroupedCostResponse])
 def by_tag(
     tag: str,
     from_date: Optional[date] = Query(default=None, alias="from"),
     to_date: Optional[date] = Query(default=None, alias="to"),
+    currency: str = Depends(get_display_currency),
     session: Session = Depends(get_session),
 ):
     start, end = parse_date_range(from_date, to_date)
-    tag_expr = build_tag_expr(session, tag)
-    stmt = (
-        select(tag_expr, func.sum(crud.usd_cost_expr()))
-        .where(CostEntry.date.between(start, end))
-        .group_by(tag_expr)
-        .order_by(func.sum(crud.usd_cost_expr()).desc())
-    )
-    rows = session.execute(stmt).all()
+    if duckdb_backend.active(start, end):
+        rows = duckdb_backend.tag_cost(start, end, tag, currency)
+    else:
+        source = crud.cost_source(session, start, end)
+        tag_expr = crud.build_tag_expr(session, tag, source.c.tags)
+        stmt = (
+            select(tag_expr, func.sum(crud.cost_expr(currency, source)))
+            .where(source.c.date.between(start, end))
+            .group_by(tag_expr)
+            .order_by(func.sum(crud.cost_expr(currency, source)).desc())
+        )
+        rows = session.execute(stmt).all()
     return [GroupedCostResponse(key=row[0] or "(missing)", total_cost=row[1]) for row in rows]
 
 
+@router.get("/costs/pivot", response_model=PivotResponse)
+def pivot(
+    dims: str = Query(description="comma-separated: provider, account, service, region, day, week, month, tag:<key>"),
+    from_date: Optional[date] = Query(default=None, alias="from"),
+    to_date: Optional[date] = Query(default=None, alias="to"),
+    subtotals: bool = False,
+    top: Optional[int] = Query(default=None, ge=1),
+    provider: List[str] = Query(default=[]),
+    account: List[str] = Query(default=[]),
+    service: List[str] = Query(default=[]),
+    region: List[str] = Query(default=[]),
+    tag: List[str] = Query(default=[], description="key=value"),
+    currency: str = Depends(get_display_currency),
+    session: Session = Depends(get_session),
+):
+    start, end = parse_date_range(from_date, to_date)
+    try:
+        return build_pivot(
+            session,
+            start,
+            end,
+            parse_dimensions(dims),
+            subtotals=subtotals,
+            top=top,
+            filters={"provider": provider, "account": account, "service": service, "region": region},
+            tag_filters=parse_tag_filters(tag),
+            currency=currency,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
 @router.get("/costs/top-services", response_model=List[GroupedCostResponse])
 def top_services(
+    response: Response,
     n: int = 5,
     from_date: Optional[date] = Query(default=None, alias="from"),
     to_date: Optional[date] = Query(default=None, alias="to"),
+    other: bool = False,
+    currency: str = Depends(get_display_currency),
     session: Session = Depends(get_session),
 ):
     start, end = parse_date_range(from_date, to_date)
-    rows = crud.get_top_services(session, start, end, n)
+    if other:
+        top = crud.get_top_grouped_cost(session, start, end, CostEntry.service, limit=n, currency=currency)
+        return with_other_row(top, response)
+    rows = crud.get_top_services(session, start, end, n, currency)
     return [GroupedCostResponse(key=row[0], total_cost=row[1]) for row in rows]
 
 
@@ -178,10 +250,11 @@ def top_services(
 def day_over_day_deltas(
     from_date: Optional[date] = Query(default=None, alias="from"),
     to_date: Optional[date] = Query(default=None, alias="to"),
+    currency: str = Depends(get_display_currency),
     session: Session = Depends(get_session),
 ):
     start, end = parse_date_range(from_date, to_date)
-    rows = crud.get_daily_totals_by_provider(session, start, end)
+    rows = crud.get_daily_totals_by_provider(session, start, end, currency)
     grouped: dict[str, list[tuple[date, float]]] = {}
     for provider, usage_date, total in rows:
         grouped.setdefault(provider, []).append((usage_date, total))
@@ -203,15 +276,45 @@ def day_over_day_deltas(
     return response
 
 
+@router.get("/costs/timeseries", response_model=TimeseriesResponse)
+def timeseries(
+    bucket: str = "day",
+    group_by: Optional[str] = Query(default=None, description="provider, account, service, region or tag:<key>"),
+    from_date: Optional[date] = Query(default=None, alias="from"),
+    to_date: Optional[date] = Query(default=None, alias="to"),
+    provider: List[str] = Query(default=[]),
+    account: List[str] = Query(default=[]),
+    service: List[str] = Query(default=[]),
+    region: List[str] = Query(default=[]),
+    currency: str = Depends(get_display_currency),
+    session: Session = Depends(get_session),
+):
+    start, end = parse_date_range(from_date, to_date)
+    try:
+        validate_timeseries(bucket, group_by)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return build_timeseries(
+        session,
+        start,
+        end,
+        bucket,
+        group_by=group_by,
+        filters={"provider": provider, "account": account, "service": service, "region": region},
+        currency=currency,
+    )
+
+
 @router.get("/costs/anomalies", response_model=List[AnomalyResponse])
 def anomalies(
     threshold: float = 0.3,
     from_date: Optional[date] = Query(default=None, alias="from"),
     to_date: Optional[date] = Query(default=None, alias="to"),
     provider: Optional[str] = None,
+    currency: str = Depends(get_display_currency),
     session: Session = Depends(get_session),
 ):
-    deltas = day_over_day_deltas(from_date, to_date, session)
+    deltas = day_over_day_deltas(from_date, to_date, currency, session)
     if provider:
         deltas = [item for item in deltas if item.provider == provider]
     flagged = [item for item in deltas if item.delta_ratio is not None and item.delta_ratio >= threshold]
@@ -225,10 +328,11 @@ def signals(
     threshold: float = 0.3,
     limit: int = 5,
     provider: Optional[str] = None,
+    currency: str = Depends(get_display_currency),
     session: Session = Depends(get_session),
 ):
     start, end = parse_date_range(from_date, to_date)
-    return build_signals(session, start, end, threshold, limit, provider=provider)
+    return build_signals(session, start, end, threshold, limit, provider=provider, currency=currency)
 
 
 @router.get("/costs/breakdowns", response_model=List[ProviderBreakdownResponse])
@@ -240,11 +344,14 @@ def breakdowns(
     limit: int = 10,
     offset: int = 0,
     account_offset: int = 0,
+    currency: str = Depends(get_display_currency),
     session: Session = Depends(get_session),
 ):
     start, end = parse_date_range(from_date, to_date)
     providers = [provider] if provider else ["aws", "azure"]
-    totals = {row[0]: row[1] for row in crud.get_grouped_cost(session, start, end, CostEntry.provider)}
+    totals = {
+        row[0]: row[1] for row in crud.get_grouped_cost(session, start, end, CostEntry.provider, currency=currency)
+    }
 
     response: list[ProviderBreakdownResponse] = []
     for item in providers:
@@ -257,6 +364,7 @@ def breakdowns(
             search_term=search,
             limit=limit,
             offset=offset,
+            currency=currency,
         )
         accounts = crud.get_grouped_cost(
             session,
@@ -267,6 +375,7 @@ def breakdowns(
             search_term=search,
             limit=limit,
             offset=account_offset,
+            currency=currency,
         )
         response.append(
             ProviderBreakdownResponse(
@@ -288,6 +397,7 @@ def deltas_by_service(
     provider: Optional[str] = None,
     search: Optional[str] = None,
     limit: int = 5,
+    currency: str = Depends(get_display_currency),
     session: Session = Depends(get_session),
 ):
     return grouped_delta(
@@ -300,6 +410,7 @@ def deltas_by_service(
         provider,
         limit,
         search_term=search,
+        currency=currency,
     )
 
 
@@ -312,6 +423,7 @@ def deltas_by_account(
     provider: Optional[str] = None,
     search: Optional[str] = None,
     limit: int = 5,
+    currency: str = Depends(get_display_currency),
     session: Session = Depends(get_session),
 ):
     return grouped_delta(
@@ -324,6 +436,27 @@ def deltas_by_account(
         provider,
         limit,
         search_term=search,
+        currency=currency,
+    )
+
+
+def _ingestion_run_response(run) -> IngestionRunResponse:
+    duration = (run.finished_at - run.started_at).total_seconds() if run.finished_at else None
+    return IngestionRunResponse(
+        id=run.id,
+        provider=run.provider,
+        trigger=run.trigger,
+        status=run.status,
+        started_at=run.started_at.isoformat(),
+        finished_at=run.finished_at.isoformat() if run.finished_at else None,
+        duration_seconds=round(duration, 3) if duration is not None else None,
+        phases=run.phases or {},
+        api_calls=run.api_calls,
+        pages=run.pages,
+        rows_fetched=run.rows_fetched,
+        rows_written=run.rows_written,
+        rows_unchanged=run.rows_unchanged,
+        error=run.error,
     )
 
 
@@ -331,9 +464,11 @@ def deltas_by_account(
 def freshness(session: Session = Depends(get_session)):
     rows = crud.get_freshness(session)
     fx_last_updated = crud.get_fx_last_updated(session)
+    latest_runs = crud.get_latest_ingestion_runs(session)
     lookback_days = int(os.getenv("LOOKBACK_DAYS", "7"))
     response: list[DataFreshnessResponse] = []
     for provider, last_date, last_ingested in rows:
+        run = latest_runs.pop(provider, None)
         response.append(
             DataFreshnessResponse(
                 provider=provider,
@@ -341,6 +476,30 @@ def freshness(session: Session = Depends(get_session)):
                 last_ingested_at=last_ingested.isoformat() if last_ingested else None,
                 lookback_days=lookback_days,
                 fx_last_updated=fx_last_updated,
+                latest_run=_ingestion_run_response(run) if run else None,
+            )
+        )
+    # Providers that have only ever failed still show up, with their last run.
+    for provider, run in sorted(latest_runs.items()):
+        response.append(
+            DataFreshnessResponse(
+                provider=provider,
+                lookback_days=lookback_days,
+                fx_last_updated=fx_last_updated,
+                latest_run=_ingestion_run_response(run),
             )
         )
     return response
+
+
+@router.get("/costs/ingestion-runs", response_model=List[IngestionRunResponse])
+def ingestion_runs(
+    provider: Optional[str] = None,
+    since: Optional[date] = Query(default=None, alias="from"),
+    limit: int = Query(default=100, ge=1, le=1000),
+    session: Session = Depends(get_session),
+):
+    """Run history, newest first, for charting ingest duration, phases and throughput."""
+    since_at = datetime.combine(since, datetime.min.time(), tzinfo=timezone.utc) if since else None
+    runs = crud.get_ingestion_runs(session, provider=provider, since=since_at, limit=limit)
+    return [_ingestion_run_response(run) for run in runs]
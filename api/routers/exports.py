@@ -8,7 +8,7 @@ from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from api import crud
-from api.deps import get_session, parse_date_range
+from api.deps import get_display_currency, get_session, parse_date_range
 from api.models import CostEntry
 
 router = APIRouter()
@@ -20,6 +20,9 @@ def export_costs(
     from_date: Optional[date] = Query(default=None, alias="from"),
     to_date: Optional[date] = Query(default=None, alias="to"),
     provider: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, ge=1),
+    other: bool = False,
+    currency: str = Depends(get_display_currency),
     session: Session = Depends(get_session),
 ):
     start, end = parse_date_range(from_date, to_date)
@@ -29,12 +32,20 @@ def export_costs(
         "account": CostEntry.account_id,
     }
     group_by = group_map.get(group, CostEntry.provider)
-    rows = crud.get_grouped_cost(session, start, end, group_by, provider=provider)
+    headers = {}
+    if other and limit:
+        top = crud.get_top_grouped_cost(session, start, end, group_by, provider=provider, limit=limit, currency=currency)
+        rows = list(top.rows)
+        if top.other_groups > 0:
+            rows.append((crud.OTHER_KEY, top.other))
+        headers["X-Total-Cost"] = repr(top.grand_total)
+    else:
+        rows = crud.get_grouped_cost(session, start, end, group_by, provider=provider, limit=limit, currency=currency)
 
     buffer = io.StringIO()
     writer = csv.writer(buffer)
-    writer.writerow([group, "total_cost"])
+    writer.writerow([group, "total_cost", "currency"])
     for key, total in rows:
-        writer.writerow([key, f"{total:.2f}"])
+        writer.writerow([key, f"{total:.2f}", currency])
     buffer.seek(0)
-    return StreamingResponse(buffer, media_type="text/csv")
+    return StreamingResponse(buffer, media_type="text/csv", headers=headers)
@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 from api import crud
 from api.deps import get_session, parse_date_range
 from api.schemas import GroupedCostResponse, TagCoverageByProviderResponse, TagHygieneResponse
+from api.services.fx import get_fx_converter
 from api.services.tag_hygiene import (
     build_tag_hygiene,
     build_tag_hygiene_by_provider,
@@ -30,7 +31,7 @@ def tag_hygiene(
     entries = crud.get_entries_in_range(session, start, end)
     if provider:
         entries = [entry for entry in entries if entry.provider == provider]
-    return build_tag_hygiene(entries, required_tags)
+    return build_tag_hygiene(entries, required_tags, get_fx_converter(session))
 
 
 @router.get("/costs/tag-hygiene/by-provider", response_model=List[TagCoverageByProviderResponse])
@@ -42,7 +43,7 @@ def tag_hygiene_by_provider(
 ):
     start, end = parse_date_range(from_date, to_date)
     entries = crud.get_entries_in_range(session, start, end)
-    return build_tag_hygiene_by_provider(entries, required)
+    return build_tag_hygiene_by_provider(entries, required, get_fx_converter(session))
 
 
 @router.get("/costs/tag-hygiene/untagged", response_model=List[GroupedCostResponse])
@@ -59,4 +60,4 @@ def untagged_breakdown(
     entries = crud.get_entries_in_range(session, start, end)
     if provider:
         entries = [entry for entry in entries if entry.provider == provider]
-    return build_untagged_breakdown(entries, required_tags, group)
+    return build_untagged_breakdown(entries, required_tags, group, get_fx_converter(session))
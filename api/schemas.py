@@ -35,6 +35,31 @@ class GroupedCostResponse(BaseModel):
     total_cost: float
 
 
+class PivotResponse(BaseModel):
+    dimensions: List[str]
+    currency: str
+    # One array per dimension, aligned with total_cost and level. level is the
+    # number of leading dimensions a row is grouped by (0 = grand total), so a
+    # null key in a subtotal row is distinguishable from a missing value.
+    columns: Dict[str, List[Optional[str]]]
+    total_cost: List[float]
+    level: List[int]
+
+
+class TimeseriesSeries(BaseModel):
+    key: str
+    values: List[float]
+
+
+class TimeseriesResponse(BaseModel):
+    bucket: str
+    group_by: Optional[str] = None
+    currency: str
+    # Each series has one value per entry in dates (zero where nothing was spent).
+    dates: List[date]
+    series: List[TimeseriesSeries]
+
+
 class AnomalyResponse(BaseModel):
     provider: str
     date: date
@@ -113,9 +138,27 @@ class TagHygieneResponse(BaseModel):
     untagged_entries: List[UntaggedCostEntry]
 
 
+class IngestionRunResponse(BaseModel):
+    id: str
+    provider: str
+    trigger: str
+    status: str
+    started_at: str
+    finished_at: Optional[str] = None
+    duration_seconds: Optional[float] = None
+    phases: Dict[str, float] = Field(default_factory=dict)
+    api_calls: int = 0
+    pages: int = 0
+    rows_fetched: int = 0
+    rows_written: int = 0
+    rows_unchanged: int = 0
+    error: Optional[str] = None
+
+
 class DataFreshnessResponse(BaseModel):
     provider: str
     last_entry_date: Optional[date] = None
     last_ingested_at: Optional[str] = None
     lookback_days: Optional[int] = None
     fx_last_updated: Optional[date] = None
+    latest_run: Optional[IngestionRunResponse] = None
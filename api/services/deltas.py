@@ -18,9 +18,14 @@ def grouped_delta(
     provider: Optional[str],
     limit: int,
     search_term: Optional[str] = None,
+    currency: str = "USD",
 ) -> List[DeltaGroupResponse]:
-    current = crud.get_grouped_cost(session, start, end, group_by, provider=provider, search_term=search_term)
-    previous = crud.get_grouped_cost(session, prev_start, prev_end, group_by, provider=provider, search_term=search_term)
+    current = crud.get_grouped_cost(
+        session, start, end, group_by, provider=provider, search_term=search_term, currency=currency
+    )
+    previous = crud.get_grouped_cost(
+        session, prev_start, prev_end, group_by, provider=provider, search_term=search_term, currency=currency
+    )
     current_map = {row[0]: row[1] for row in current}
     previous_map = {row[0]: row[1] for row in previous}
     keys = set(current_map) | set(previous_map)
@@ -0,0 +1,23 @@
+import threading
+from datetime import date
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from api import crud
+from core.fx_converter import FxConverter
+
+_lock = threading.Lock()
+_converter: Optional[FxConverter] = None
+_loaded_through: Optional[date] = None
+
+
+def get_fx_converter(session: Session) -> FxConverter:
+    """Return the process-wide converter, reloading it when new FX dates land."""
+    global _converter, _loaded_through
+    last_updated = crud.get_fx_last_updated(session)
+    with _lock:
+        if _converter is None or last_updated != _loaded_through:
+            _converter = FxConverter(crud.get_fx_rate_rows(session))
+            _loaded_through = last_updated
+        return _converter
@@ -0,0 +1,176 @@
+"""Multi-dimensional cost pivot compiled into a single SQL statement.
+
+Dimensions are grouped in the order given. With subtotals (or a per-level
+top-N, which ranks children within their parent subtotal) the grouping is a
+ROLLUP: native ``GROUP BY ROLLUP`` on PostgreSQL, one ``UNION ALL`` branch per
+grouping set on SQLite. Ranking uses ``row_number()`` partitioned by level and
+parent keys; rows whose parent was cut are dropped afterwards.
+"""
+
+import os
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, case, func, literal, null, select, union_all
+from sqlalchemy.orm import Session
+
+from api import crud
+from api.schemas import PivotResponse
+
+COLUMN_DIMENSIONS = {"provider": "provider", "account": "account_id", "service": "service", "region": "region"}
+MAX_DIMENSIONS = 5
+
+
+def pivot_max_rows() -> int:
+    return int(os.getenv("PIVOT_MAX_ROWS", "50000"))
+
+
+def parse_dimensions(value: str) -> List[str]:
+    dimensions = [item.strip() for item in value.split(",") if item.strip()]
+    if not dimensions:
+        raise ValueError("at least one dimension is required")
+    if len(dimensions) > MAX_DIMENSIONS:
+        raise ValueError(f"at most {MAX_DIMENSIONS} dimensions are supported")
+    if len(set(dimensions)) != len(dimensions):
+        raise ValueError("dimensions must be unique")
+    for dimension in dimensions:
+        if dimension in COLUMN_DIMENSIONS or dimension in crud.DATE_BUCKETS:
+            continue
+        if not (dimension.startswith("tag:") and dimension[4:]):
+            raise ValueError(f"unknown dimension: {dimension}")
+    return dimensions
+
+
+def parse_tag_filters(values: Sequence[str]) -> List[Tuple[str, str]]:
+    filters = []
+    for value in values:
+        key, sep, tag_value = value.partition("=")
+        if not sep or not key:
+            raise ValueError(f"tag filter must be key=value: {value}")
+        filters.append((key, tag_value))
+    return filters
+
+
+def dimension_expr(session: Session, source, dimension: str):
+    if dimension in COLUMN_DIMENSIONS:
+        return source.c[COLUMN_DIMENSIONS[dimension]]
+    if dimension in crud.DATE_BUCKETS:
+        return crud.date_bucket(session, source.c.date, dimension)
+    return crud.build_tag_expr(session, dimension[4:], source.c.tags)
+
+
+def _key(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return value if value is None or isinstance(value, str) else str(value)
+
+
+def build_pivot(
+    session: Session,
+    start: date,
+    end: date,
+    dimensions: List[str],
+    subtotals: bool = False,
+    top: Optional[int] = None,
+    filters: Optional[Dict[str, Sequence[str]]] = None,
+    tag_filters: Sequence[Tuple[str, str]] = (),
+    currency: str = "USD",
+) -> PivotResponse:
+    source = crud.cost_source(session, start, end, by_day=bool({"day", "week"} & set(dimensions)))
+    names = [f"d{idx}" for idx in range(len(dimensions))]
+    conditions = [source.c.date.between(start, end)]
+    for dimension, values in (filters or {}).items():
+        if values:
+            conditions.append(source.c[COLUMN_DIMENSIONS[dimension]].in_(values))
+    for key, value in tag_filters:
+        conditions.append(crud.build_tag_expr(session, key, source.c.tags) == value)
+    rows = (
+        select(
+            *(dimension_expr(session, source, dimension).label(name) for dimension, name in zip(dimensions, names)),
+            crud.cost_expr(currency, source).label("amount"),
+        )
+        .where(and_(*conditions))
+        .cte("pivot_rows")
+    )
+    keys = [rows.c[name] for name in names]
+    total = func.sum(rows.c.amount).label("total_cost")
+    count = len(dimensions)
+
+    if not subtotals and not top:
+        stmt = select(*keys, total, literal(0).label("grouping_mask")).group_by(*keys).order_by(total.desc())
+    else:
+        # ``grouping_mask`` is the GROUPING() bitmask: a row at level k (k leading
+        # dimensions kept) has the low ``count - k`` bits set.
+        if session.bind.dialect.name == "postgresql":
+            grouped = select(*keys, total, func.grouping(*keys).label("grouping_mask")).group_by(func.rollup(*keys))
+        else:
+            grouped = union_all(
+                *(
+                    select(
+                        *(keys[idx] if idx < level else null().label(names[idx]) for idx in range(count)),
+                        total,
+                        literal((1 << (count - level)) - 1).label("grouping_mask"),
+                    ).group_by(*keys[:level])
+                    for level in range(count + 1)
+                )
+            )
+        grouped = grouped.subquery("pivot_grouped")
+        stmt = select(grouped)
+        if top:
+            # Dimension idx is part of a row's parent key when the row keeps
+            # at least idx + 2 leading dimensions.
+            parents = [
+                case((grouped.c.grouping_mask < (1 << (count - idx - 2)), grouped.c[names[idx]]))
+                for idx in range(count - 1)
+            ]
+            rank = (
+                func.row_number()
+                .over(
+                    partition_by=[grouped.c.grouping_mask, *parents],
+                    order_by=[grouped.c.total_cost.desc(), *(grouped.c[name] for name in names)],
+                )
+                .label("sibling_rank")
+            )
+            ranked = select(grouped, rank).subquery("pivot_ranked")
+            stmt = select(*(ranked.c[name] for name in names), ranked.c.total_cost, ranked.c.grouping_mask).where(
+                ranked.c.sibling_rank <= top
+            )
+
+    max_rows = pivot_max_rows()
+    result = session.execute(stmt.limit(max_rows + 1)).all()
+    if len(result) > max_rows:
+        raise ValueError(f"pivot exceeds {max_rows} rows; add filters or top")
+
+    levelled = [
+        (count - int(row[-1]).bit_length(), [_key(value) for value in row[:count]], row[count] or 0.0) for row in result
+    ]
+    if subtotals or top:
+        levelled = _hierarchical(levelled)
+        if not subtotals:
+            levelled = [row for row in levelled if row[0] == count]
+
+    return PivotResponse(
+        dimensions=dimensions,
+        currency=currency,
+        columns={dimension: [row[1][idx] for row in levelled] for idx, dimension in enumerate(dimensions)},
+        total_cost=[row[2] for row in levelled],
+        level=[row[0] for row in levelled],
+    )
+
+
+def _hierarchical(rows):
+    """Drop rows under cut parents and order parents first, siblings by cost."""
+    totals = {}
+    kept = []
+    for level, keys, total in sorted(rows, key=lambda row: row[0]):
+        path = tuple(keys[:level])
+        if level and path[:-1] not in totals:
+            continue
+        totals[path] = total
+        kept.append((level, keys, total))
+
+    def order(row):
+        level, keys, _ = row
+        return tuple((-totals[tuple(keys[: idx + 1])], keys[idx] is None, str(keys[idx] or "")) for idx in range(level))
+
+    return sorted(kept, key=order)
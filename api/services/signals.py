@@ -7,6 +7,7 @@ from typing import Iterable, Optional
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from api import crud
 from api.models import CostEntry
 from api.schemas import SignalResponse, SignalTimeframe
 from api.services.deltas import grouped_delta
@@ -33,11 +34,12 @@ def build_timeframe(start: date, end: date) -> SignalTimeframe:
 
 
 def get_providers(session: Session, start: date, end: date) -> Iterable[str]:
+    source = crud.cost_source(session, start, end)
     stmt = (
-        select(CostEntry.provider)
-        .where(CostEntry.date.between(start, end))
+        select(source.c.provider)
+        .where(source.c.date.between(start, end))
         .distinct()
-        .order_by(CostEntry.provider)
+        .order_by(source.c.provider)
     )
     return [row[0] for row in session.execute(stmt).all() if row[0]]
 
@@ -57,6 +59,7 @@ def build_signals(
     threshold: float,
     limit: int,
     provider: Optional[str] = None,
+    currency: str = "USD",
 ) -> list[SignalResponse]:
     timeframe = build_timeframe(start, end)
     providers = [provider] if provider else list(get_providers(session, start, end))
@@ -75,6 +78,7 @@ def build_signals(
                 timeframe.compare_end,
                 provider_name,
                 sample_limit,
+                currency=currency,
             )
             for item in deltas:
                 if not item.key:
@@ -4,21 +4,25 @@ from sqlalchemy.orm import Session
 
 from api import crud
 from api.schemas import DataFreshnessResponse, ProviderTotalResponse
+from api.services.fx import get_fx_converter
 from api.services.tag_hygiene import build_tag_hygiene_by_provider
 
 
-def build_snapshot(session: Session, start: date, end: date):
-    total = crud.get_total_cost(session, start, end)
+def build_snapshot(session: Session, start: date, end: date, currency: str = "USD"):
+    total = crud.get_total_cost(session, start, end, currency)
     provider_totals = [
-        ProviderTotalResponse(provider=row[0], total_cost=row[1], currency="USD")
-        for row in crud.get_provider_totals_with_currency(session, start, end)
+        ProviderTotalResponse(provider=row[0], total_cost=row[1], currency=currency)
+        for row in crud.get_provider_totals_with_currency(session, start, end, currency)
     ]
-    tag_coverage = build_tag_hygiene_by_provider(crud.get_entries_in_range(session, start, end), None)
+    tag_coverage = build_tag_hygiene_by_provider(
+        crud.get_entries_in_range(session, start, end), None, get_fx_converter(session), currency
+    )
     freshness_rows = crud.get_freshness(session)
     return {
         "from": start.isoformat(),
         "to": end.isoformat(),
         "total": total,
+        "currency": currency,
         "provider_totals": provider_totals,
         "tag_coverage": tag_coverage,
         "freshness": [
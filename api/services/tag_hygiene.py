@@ -8,6 +8,7 @@ from api.schemas import (
     TagHygieneResponse,
     UntaggedCostEntry,
 )
+from core.fx_converter import FxConverter
 from core.tag_hygiene import DEFAULT_REQUIRED_TAGS, evaluate_tags
 
 
@@ -21,23 +22,32 @@ def required_tags_for_provider(provider: Optional[str], required: Optional[str])
     return DEFAULT_REQUIRED_TAGS
 
 
-def build_tag_hygiene(entries, required_tags: list[str]) -> TagHygieneResponse:
+def _converted_costs(entries, converter: Optional[FxConverter], currency: str) -> list[float]:
+    if converter is None:
+        return [entry.cost for entry in entries]
+    return converter.convert_entries(entries, currency).tolist()
+
+
+def build_tag_hygiene(
+    entries, required_tags: list[str], converter: Optional[FxConverter] = None, currency: str = "USD"
+) -> TagHygieneResponse:
+    costs = _converted_costs(entries, converter, currency)
     total_cost = 0.0
     fully_tagged = 0.0
     partially_tagged = 0.0
     untagged = 0.0
     untagged_entries = []
 
-    for entry in entries:
+    for entry, cost in zip(entries, costs):
         tags = entry.tags or {}
-        total_cost += entry.cost
+        total_cost += cost
         has_all, missing = evaluate_tags(tags, required_tags)
         if has_all:
-            fully_tagged += entry.cost
+            fully_tagged += cost
         elif len(tags) == 0:
-            untagged += entry.cost
+            untagged += cost
         else:
-            partially_tagged += entry.cost
+            partially_tagged += cost
         if missing:
             untagged_entries.append(
                 UntaggedCostEntry(
@@ -64,9 +74,12 @@ def build_tag_hygiene(entries, required_tags: list[str]) -> TagHygieneResponse:
     return TagHygieneResponse(coverage=coverage, untagged_entries=untagged_entries)
 
 
-def build_tag_hygiene_by_provider(entries, required: Optional[str]) -> List[TagCoverageByProviderResponse]:
+def build_tag_hygiene_by_provider(
+    entries, required: Optional[str], converter: Optional[FxConverter] = None, currency: str = "USD"
+) -> List[TagCoverageByProviderResponse]:
+    costs = _converted_costs(entries, converter, currency)
     coverage_by_provider: dict[str, TagCoverageResponse] = {}
-    for entry in entries:
+    for entry, cost in zip(entries, costs):
         provider = entry.provider
         tags = entry.tags or {}
         required_tags = required_tags_for_provider(provider, required)
@@ -81,14 +94,14 @@ def build_tag_hygiene_by_provider(entries, required: Optional[str]) -> List[TagC
             ),
         )
 
-        coverage.total_cost += entry.cost
+        coverage.total_cost += cost
         has_all, missing = evaluate_tags(tags, required_tags)
         if has_all:
-            coverage.fully_tagged_cost += entry.cost
+            coverage.fully_tagged_cost += cost
         elif len(tags) == 0:
-            coverage.untagged_cost += entry.cost
+            coverage.untagged_cost += cost
         else:
-            coverage.partially_tagged_cost += entry.cost
+            coverage.partially_tagged_cost += cost
         coverage_by_provider[provider] = coverage
 
     return [
@@ -97,15 +110,18 @@ def build_tag_hygiene_by_provider(entries, required: Optional[str]) -> List[TagC
     ]
 
 
-def build_untagged_breakdown(entries, required_tags: list[str], group: str) -> List[GroupedCostResponse]:
+def build_untagged_breakdown(
+    entries, required_tags: list[str], group: str, converter: Optional[FxConverter] = None, currency: str = "USD"
+) -> List[GroupedCostResponse]:
+    costs = _converted_costs(entries, converter, currency)
     totals: dict[str, float] = {}
-    for entry in entries:
+    for entry, cost in zip(entries, costs):
         tags = entry.tags or {}
         has_all, _ = evaluate_tags(tags, required_tags)
         if has_all:
             continue
         key = entry.service if group == "service" else entry.account_id
-        totals[key] = totals.get(key, 0.0) + entry.cost
+        totals[key] = totals.get(key, 0.0) + cost
 
     rows = [GroupedCostResponse(key=key, total_cost=total) for key, total in totals.items()]
     rows.sort(key=lambda item: item.total_cost, reverse=True)
@@ -0,0 +1,79 @@
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from api import crud
+from api.schemas import TimeseriesResponse, TimeseriesSeries
+from api.services.pivot import COLUMN_DIMENSIONS, dimension_expr
+
+
+def bucket_start(day: date, bucket: str) -> date:
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return crud.month_start(day)
+    return day
+
+
+def bucket_axis(start: date, end: date, bucket: str) -> List[date]:
+    """Every bucket overlapping ``[start, end]``, labelled by its first day."""
+    axis = []
+    current = bucket_start(start, bucket)
+    while current <= end:
+        axis.append(current)
+        if bucket == "month":
+            current = crud.next_month(current)
+        else:
+            current += timedelta(days=7 if bucket == "week" else 1)
+    return axis
+
+
+def validate_timeseries(bucket: str, group_by: Optional[str]):
+    if bucket not in crud.DATE_BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(crud.DATE_BUCKETS)}")
+    if group_by and group_by not in COLUMN_DIMENSIONS and not (group_by.startswith("tag:") and group_by[4:]):
+        raise ValueError(f"unknown group_by: {group_by}")
+
+
+def build_timeseries(
+    session: Session,
+    start: date,
+    end: date,
+    bucket: str,
+    group_by: Optional[str] = None,
+    filters: Optional[Dict[str, Sequence[str]]] = None,
+    currency: str = "USD",
+) -> TimeseriesResponse:
+    source = crud.cost_source(session, start, end, by_day=bucket != "month")
+    bucket_expr = crud.date_bucket(session, source.c.date, bucket).label("bucket")
+    columns = [bucket_expr]
+    if group_by:
+        columns.insert(0, dimension_expr(session, source, group_by).label("series"))
+    conditions = [source.c.date.between(start, end)]
+    for dimension, values in (filters or {}).items():
+        if values:
+            conditions.append(source.c[COLUMN_DIMENSIONS[dimension]].in_(values))
+    stmt = (
+        select(*columns, func.sum(crud.cost_expr(currency, source)))
+        .where(and_(*conditions))
+        .group_by(*columns)
+    )
+
+    axis = bucket_axis(start, end, bucket)
+    index = {day: idx for idx, day in enumerate(axis)}
+    series: Dict[str, List[float]] = {}
+    for row in session.execute(stmt).all():
+        key = (row[0] if row[0] is not None else "(missing)") if group_by else "total"
+        values = series.setdefault(str(key), [0.0] * len(axis))
+        values[index[row[-2]]] += row[-1] or 0.0
+
+    ordered = sorted(series.items(), key=lambda item: sum(item[1]), reverse=True)
+    return TimeseriesResponse(
+        bucket=bucket,
+        group_by=group_by,
+        currency=currency,
+        dates=axis,
+        series=[TimeseriesSeries(key=key, values=values) for key, values in ordered],
+    )
@@ -0,0 +1,175 @@
+"""Time every GET route in the costs, tags and exports routers.
+
+Runs the app in process against ``DATABASE_URL`` (SQLite or PostgreSQL) and
+records p50/p95 latency and peak Python memory per route. Results are appended
+as one JSON line per run to ``--output`` and compared with the previous run
+for the same database dialect and row count::
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m bench.api --days 30 --repeat 20
+"""
+
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from api.db import ENGINE, SessionLocal
+from api.main import app
+from api.models import CostEntry
+from api.routers import costs, exports, tags
+
+ROUTERS = (costs.router, tags.router, exports.router)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[idx]
+
+
+def route_params(route: APIRoute, base: Dict[str, str]) -> Optional[Dict[str, str]]:
+    """Return query params for ``route``, or None if a required one is unknown."""
+    params = {}
+    for param in route.dependant.query_params:
+        name = param.alias
+        if name in base:
+            params[name] = base[name]
+        elif param.required:
+            return None
+    for dependency in route.dependant.dependencies:
+        for param in dependency.query_params:
+            if param.alias in base:
+                params[param.alias] = base[param.alias]
+    return params
+
+
+def collect_cases(base: Dict[str, str]) -> List[Dict]:
+    cases = []
+    for router in ROUTERS:
+        for route in router.routes:
+            if not isinstance(route, APIRoute) or "GET" not in route.methods or "{" in route.path:
+                continue
+            params = route_params(route, base)
+            if params is None:
+                print(f"[bench:api] skipping {route.path}: no value for a required parameter")
+                continue
+            cases.append({"path": route.path, "params": params})
+    return cases
+
+
+def measure(client: TestClient, case: Dict, repeat: int, warmup: int) -> Dict:
+    for _ in range(warmup):
+        client.get(case["path"], params=case["params"])
+    timings = []
+    status = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(case["path"], params=case["params"])
+        timings.append((time.perf_counter() - started) * 1000)
+        status = response.status_code
+    # Memory is traced in a separate request so tracing overhead does not
+    # distort the timings above.
+    tracemalloc.start()
+    response = client.get(case["path"], params=case["params"])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "path": case["path"],
+        "status": status,
+        "p50_ms": round(percentile(timings, 50), 2),
+        "p95_ms": round(percentile(timings, 95), 2),
+        "peak_kb": round(peak / 1024, 1),
+        "bytes": len(response.content),
+    }
+
+
+def previous_run(output: Path, dialect: str, rows: int) -> Optional[Dict]:
+    if not output.exists():
+        return None
+    last = None
+    for line in output.read_text().splitlines():
+        run = json.loads(line)
+        if run["dialect"] == dialect and run["rows"] == rows:
+            last = run
+    return last
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API routes (p50/p95 latency, peak memory).")
+    parser.add_argument("--days", type=int, default=30, help="query window ending at the newest cost date")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--currency", default="USD")
+    parser.add_argument("--tag", default="owner")
+    parser.add_argument("--route", action="append", help="only run routes containing this substring")
+    parser.add_argument("--label", default="")
+    parser.add_argument("--output", default="bench-results.jsonl")
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        rows = session.scalar(select(func.count()).select_from(CostEntry))
+        newest = session.scalar(select(func.max(CostEntry.date)))
+    finally:
+        session.close()
+    if not newest:
+        raise SystemExit("no cost entries; run python -m bench.generate first")
+
+    start = newest - timedelta(days=args.days - 1)
+    compare_end = start - timedelta(days=1)
+    base = {
+        "from": start.isoformat(),
+        "to": newest.isoformat(),
+        "compare_from": (compare_end - timedelta(days=args.days - 1)).isoformat(),
+        "compare_to": compare_end.isoformat(),
+        "tag": args.tag,
+        "currency": args.currency,
+    }
+    cases = collect_cases(base)
+    if args.route:
+        cases = [case for case in cases if any(item in case["path"] for item in args.route)]
+
+    dialect = ENGINE.dialect.name
+    output = Path(args.output)
+    previous = previous_run(output, dialect, rows)
+    previous_routes = {item["path"]: item for item in previous["routes"]} if previous else {}
+
+    client = TestClient(app)
+    results = []
+    print(f"[bench:api] {dialect}, {rows} rows, {args.days}-day window, {args.repeat} requests per route")
+    print(f"{'route':40} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} {'peak KB':>9} {'vs prev p50':>12}")
+    for case in cases:
+        result = measure(client, case, args.repeat, args.warmup)
+        results.append(result)
+        before = previous_routes.get(case["path"])
+        change = f"{(result['p50_ms'] / before['p50_ms'] - 1) * 100:+.0f}%" if before and before["p50_ms"] else ""
+        print(
+            f"{case['path']:40} {result['status']:>6} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+            f"{result['peak_kb']:>9.1f} {change:>12}"
+        )
+
+    run = {
+        "at": datetime.now(timezone.utc).isoformat(),
+        "label": args.label,
+        "dialect": dialect,
+        "rows": rows,
+        "days": args.days,
+        "repeat": args.repeat,
+        "total_p50_ms": round(statistics.fsum(item["p50_ms"] for item in results), 2),
+        "routes": results,
+    }
+    with output.open("a", encoding="utf-8") as handle:
+        handle.write(json.dumps(run) + "\n")
+    print(f"[bench:api] sum of p50 {run['total_p50_ms']} ms; appended to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""Replay dashboard page loads against a running API.
+
+Each virtual user repeatedly performs the request fan-out of ``refreshData()``
+in ``ui/app.js`` (19 parallel fetches, capped at six connections per user like
+a browser), with date ranges and provider filters drawn per page load::
+
+    python -m bench.dashboard --base-url http://localhost:8000 --users 50 --loads 5
+    DATABASE_URL=sqlite:////tmp/bench.db python -m bench.dashboard --serve --users 20
+
+With ``--serve`` the API runs in this process under uvicorn so the SQLAlchemy
+connection pool can be sampled; pool saturation is reported as peak and mean
+checked-out connections and the share of samples at full capacity.
+"""
+
+import argparse
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import requests
+
+SERVICE_PAGE_SIZE = 10
+TIMELINE_DAYS = 14
+BROWSER_CONNECTIONS = 6
+
+
+def build_query(params: Dict[str, object]) -> str:
+    # Mirrors buildQuery() in ui/app.js: drop None and blank values.
+    kept = {key: value for key, value in params.items() if value is not None and str(value).strip() != ""}
+    return f"?{urlencode(kept)}" if kept else ""
+
+
+def compare_range(start: date, end: date) -> Tuple[date, date]:
+    compare_end = start - timedelta(days=1)
+    return compare_end - timedelta(days=(end - start).days), compare_end
+
+
+def dashboard_requests(
+    today: date, start: date, end: date, provider: str, search: str = ""
+) -> List[Tuple[str, str]]:
+    """Return ``(endpoint, path)`` for every fetch of one dashboard load, in app.js order."""
+    range_query = build_query({"from": start, "to": end})
+    today_query = build_query({"from": today, "to": today})
+    week_query = build_query({"from": today - timedelta(days=6), "to": today})
+    month_query = build_query({"from": today.replace(day=1), "to": today})
+    timeline_query = build_query({"from": today - timedelta(days=TIMELINE_DAYS - 1), "to": today})
+    prev_month_end = today.replace(day=1) - timedelta(days=1)
+    compare_from, compare_to = compare_range(start, end)
+    filters = {"from": start, "to": end, "provider": provider, "search": search}
+    return [
+        ("/costs/total", f"/costs/total{today_query}"),
+        ("/costs/total", f"/costs/total{week_query}"),
+        ("/costs/total", f"/costs/total{month_query}"),
+        ("/costs/provider-totals", f"/costs/provider-totals{today_query}"),
+        ("/costs/provider-totals", f"/costs/provider-totals{week_query}"),
+        ("/costs/provider-totals", f"/costs/provider-totals{month_query}"),
+        ("/costs/provider-totals", f"/costs/provider-totals{range_query}"),
+        ("/costs/by-service", f"/costs/by-service{build_query({**filters, 'limit': 5, 'offset': 0})}"),
+        ("/costs/by-account", f"/costs/by-account{build_query({**filters, 'limit': 5, 'offset': 0})}"),
+        ("/costs/deltas", f"/costs/deltas{range_query}"),
+        ("/signals", f"/signals{build_query({'from': start, 'to': end, 'provider': provider})}"),
+        (
+            "/costs/breakdowns",
+            "/costs/breakdowns"
+            + build_query({**filters, "limit": SERVICE_PAGE_SIZE, "offset": 0, "account_offset": 0}),
+        ),
+        (
+            "/costs/provider-totals",
+            "/costs/provider-totals"
+            + build_query({"from": today - timedelta(days=13), "to": today - timedelta(days=7)}),
+        ),
+        (
+            "/costs/provider-totals",
+            f"/costs/provider-totals{build_query({'from': prev_month_end.replace(day=1), 'to': prev_month_end})}",
+        ),
+        (
+            "/costs/deltas/by-service",
+            "/costs/deltas/by-service"
+            + build_query({**filters, "compare_from": compare_from, "compare_to": compare_to, "limit": 5}),
+        ),
+        (
+            "/costs/deltas/by-account",
+            "/costs/deltas/by-account"
+            + build_query({**filters, "compare_from": compare_from, "compare_to": compare_to, "limit": 5}),
+        ),
+        ("/costs/anomalies", f"/costs/anomalies{build_query({'from': start, 'to': end, 'provider': provider})}"),
+        ("/costs/deltas", f"/costs/deltas{timeline_query}"),
+        ("/costs/freshness", "/costs/freshness"),
+    ]
+
+
+@dataclass
+class Results:
+    latencies: Dict[str, List[float]] = field(default_factory=dict)
+    errors: Dict[str, int] = field(default_factory=dict)
+    page_loads: List[float] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, endpoint: str, elapsed_ms: float, ok: bool):
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(elapsed_ms)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def record_page(self, elapsed_ms: float):
+        with self._lock:
+            self.page_loads.append(elapsed_ms)
+
+
+class PoolSampler:
+    """Samples checked-out connections of the in-process engine."""
+
+    def __init__(self, engine, interval: float = 0.05):
+        self.engine = engine
+        self.interval = interval
+        self.samples: List[int] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def capacity(self) -> Optional[int]:
+        pool = self.engine.pool
+        if hasattr(pool, "size") and hasattr(pool, "_max_overflow"):
+            return pool.size() + max(pool._max_overflow, 0)
+        return None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            checkedout = getattr(self.engine.pool, "checkedout", None)
+            if checkedout:
+                self.samples.append(checkedout())
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def run_user(
+    base_url: str,
+    loads: int,
+    range_days: List[int],
+    providers: List[str],
+    today: date,
+    headers: Dict[str, str],
+    results: Results,
+    seed: int,
+):
+    rng = random.Random(seed)
+    session = requests.Session()
+    session.headers.update(headers)
+
+    def fetch(endpoint: str, path: str):
+        started = time.perf_counter()
+        try:
+            ok = session.get(f"{base_url}{path}", timeout=120).ok
+        except requests.RequestException:
+            ok = False
+        results.record(endpoint, (time.perf_counter() - started) * 1000, ok)
+
+    with ThreadPoolExecutor(max_workers=BROWSER_CONNECTIONS) as browser:
+        for _ in range(loads):
+            days = rng.choice(range_days)
+            start = today - timedelta(days=days - 1)
+            started = time.perf_counter()
+            futures = [
+                browser.submit(fetch, endpoint, path)
+                for endpoint, path in dashboard_requests(today, start, today, rng.choice(providers))
+            ]
+            for future in futures:
+                future.result()
+            results.record_page((time.perf_counter() - started) * 1000)
+
+
+def serve_in_process() -> Tuple[str, object, object]:
+    import socket
+
+    import uvicorn
+
+    from api.db import ENGINE
+    from api.main import app
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}", server, ENGINE
+
+
+def report(results: Results, elapsed: float, sampler: Optional[PoolSampler]):
+    total = sum(len(values) for values in results.latencies.values())
+    errors = sum(results.errors.values())
+    print(
+        f"[bench:dashboard] {len(results.page_loads)} page loads, {total} requests in {elapsed:.1f}s: "
+        f"{total / elapsed:.1f} req/s, {len(results.page_loads) / elapsed:.2f} loads/s, "
+        f"{errors / total * 100 if total else 0:.2f}% errors"
+    )
+    if results.page_loads:
+        print(
+            f"[bench:dashboard] page load p50 {percentile(results.page_loads, 50):.0f} ms, "
+            f"p95 {percentile(results.page_loads, 95):.0f} ms"
+        )
+    print(f"{'endpoint':28} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    ranked = sorted(results.latencies.items(), key=lambda item: percentile(item[1], 95), reverse=True)
+    for endpoint, values in ranked:
+        print(
+            f"{endpoint:28} {len(values):>6} {results.errors.get(endpoint, 0):>6} {percentile(values, 50):>9.1f} "
+            f"{percentile(values, 95):>9.1f} {percentile(values, 99):>9.1f}"
+        )
+    if sampler and sampler.samples:
+        capacity = sampler.capacity
+        line = (
+            f"[bench:dashboard] DB pool: peak {max(sampler.samples)} checked out, "
+            f"mean {statistics.fmean(sampler.samples):.1f}"
+        )
+        if capacity:
+            saturated = sum(1 for value in sampler.samples if value >= capacity) / len(sampler.samples)
+            line += f", capacity {capacity}, saturated {saturated * 100:.0f}% of samples"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the dashboard request mix with concurrent users.")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--serve", action="store_true", help="run the API in process and sample the DB pool")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--loads", type=int, default=3, help="page loads per user")
+    parser.add_argument("--ramp-seconds", type=float, default=0.0, help="spread user start times")
+    parser.add_argument("--range-days", default="30", help="comma-separated range lengths drawn per load")
+    parser.add_argument("--providers", default="aws,azure,gcp")
+    parser.add_argument("--today", default=None, help="dashboard 'today' (default: actual today)")
+    parser.add_argument("--api-key", default=None)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    range_days = [int(item) for item in args.range_days.split(",") if item.strip()]
+    providers = [item.strip() for item in args.providers.split(",") if item.strip()]
+    today = date.fromisoformat(args.today) if args.today else date.today()
+    headers = {"X-API-Key": args.api_key} if args.api_key else {}
+
+    base_url = args.base_url.rstrip("/")
+    sampler = None
+    server = None
+    if args.serve:
+        base_url, server, engine = serve_in_process()
+        sampler = PoolSampler(engine)
+        sampler.start()
+
+    results = Results()
+    started = time.perf_counter()
+    threads = []
+    for idx in range(args.users):
+        thread = threading.Thread(
+            target=run_user,
+            args=(base_url, args.loads, range_days, providers, today, headers, results, args.seed + idx),
+            daemon=True,
+        )
+        thread.start()
+        threads.append(thread)
+        if args.ramp_seconds and args.users > 1:
+            time.sleep(args.ramp_seconds / (args.users - 1))
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    if sampler:
+        sampler.stop()
+    if server:
+        server.should_exit = True
+    report(results, elapsed, sampler)
+
+
+if __name__ == "__main__":
+    main()
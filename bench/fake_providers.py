@@ -0,0 +1,249 @@
+"""Local stand-ins for AWS Cost Explorer and Azure Cost Management.
+
+Serves deterministic synthetic daily costs through the same wire protocols the
+collectors use, including ``NextPageToken`` / ``nextLink`` paging, throttling
+(Cost Explorer ``LimitExceededException``, Azure 429 + Retry-After) and
+injected latency. Point the collectors at it with::
+
+    AWS_CE_ENDPOINT_URL=http://127.0.0.1:8900
+    AZURE_MANAGEMENT_URL=http://127.0.0.1:8900
+    AZURE_LOGIN_URL=http://127.0.0.1:8900
+
+Run standalone with ``python -m bench.fake_providers --port 8900``.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+AWS_TARGET = "AWSInsightsIndexService.GetCostAndUsage"
+AZURE_COLUMNS = ["Cost", "UsageDate", "ServiceName", "ResourceLocation", "Currency"]
+REGIONS = ["eastus", "westeurope", "northeurope", "westus2", "southeastasia"]
+
+
+@dataclass
+class FakeConfig:
+    accounts: int = 20
+    services: int = 40
+    page_size: int = 1000
+    throttle_rate: float = 0.0
+    latency_ms: float = 0.0
+    azure_currency: str = "EUR"
+    seed: int = 1
+
+
+@dataclass
+class FakeStats:
+    requests: int = 0
+    throttled: int = 0
+    rows: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, throttled: bool = False, rows: int = 0):
+        with self._lock:
+            self.requests += 1
+            self.throttled += int(throttled)
+            self.rows += rows
+
+
+def _cost(seed: int, *parts: Any) -> float:
+    # Stable per (day, account, service) so repeated fetches return the same data.
+    key = zlib.crc32("|".join(str(part) for part in (seed, *parts)).encode("utf-8"))
+    return round(random.Random(key).lognormvariate(1.0, 1.5), 6)
+
+
+def _days(start: date, end_exclusive: date) -> Iterator[date]:
+    day = start
+    while day < end_exclusive:
+        yield day
+        day += timedelta(days=1)
+
+
+def aws_groups(config: FakeConfig, start: date, end_exclusive: date) -> List[Tuple[date, str, str]]:
+    return [
+        (day, f"Service {service:03d}", f"{100000000000 + account}")
+        for day in _days(start, end_exclusive)
+        for account in range(config.accounts)
+        for service in range(config.services)
+    ]
+
+
+def aws_page(config: FakeConfig, body: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    period = body["TimePeriod"]
+    metric = body.get("Metrics", ["UnblendedCost"])[0]
+    groups = aws_groups(config, date.fromisoformat(period["Start"]), date.fromisoformat(period["End"]))
+    offset = int(body.get("NextPageToken") or 0)
+    chunk = groups[offset : offset + config.page_size]
+    by_day: Dict[date, List[Dict[str, Any]]] = {}
+    for day, service, account in chunk:
+        by_day.setdefault(day, []).append(
+            {
+                "Keys": [service, account],
+                "Metrics": {metric: {"Amount": str(_cost(config.seed, day, account, service)), "Unit": "USD"}},
+            }
+        )
+    payload: Dict[str, Any] = {
+        "ResultsByTime": [
+            {
+                "TimePeriod": {"Start": day.isoformat(), "End": (day + timedelta(days=1)).isoformat()},
+                "Groups": items,
+                "Estimated": False,
+            }
+            for day, items in by_day.items()
+        ]
+    }
+    if offset + config.page_size < len(groups):
+        payload["NextPageToken"] = str(offset + config.page_size)
+    return payload, len(chunk)
+
+
+def azure_page(config: FakeConfig, subscription_id: str, body: Dict[str, Any], offset: int) -> Tuple[List[list], bool]:
+    period = body["timePeriod"]
+    start = date.fromisoformat(period["from"][:10])
+    end_exclusive = date.fromisoformat(period["to"][:10]) + timedelta(days=1)
+    rows = [
+        (day, f"Service {service:03d}", REGIONS[service % len(REGIONS)])
+        for day in _days(start, end_exclusive)
+        for service in range(config.services)
+    ]
+    chunk = rows[offset : offset + config.page_size]
+    payload = [
+        [
+            _cost(config.seed, day, subscription_id, service),
+            int(day.strftime("%Y%m%d")),
+            service,
+            region,
+            config.azure_currency,
+        ]
+        for day, service, region in chunk
+    ]
+    return payload, offset + config.page_size < len(rows)
+
+
+def make_handler(config: FakeConfig, stats: FakeStats):
+    rng = random.Random(config.seed)
+    rng_lock = threading.Lock()
+
+    def throttle() -> bool:
+        if not config.throttle_rate:
+            return False
+        with rng_lock:
+            return rng.random() < config.throttle_rate
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, payload: Dict[str, Any], content_type: str = "application/json", headers=None):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            body_bytes = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if config.latency_ms:
+                time.sleep(config.latency_ms / 1000)
+            url = urlsplit(self.path)
+
+            if url.path.endswith("/oauth2/token"):
+                stats.record()
+                self._send(200, {"access_token": "fake-token", "token_type": "Bearer", "expires_in": "3599"})
+                return
+
+            if self.headers.get("X-Amz-Target") == AWS_TARGET:
+                if throttle():
+                    stats.record(throttled=True)
+                    self._send(
+                        400,
+                        {"__type": "LimitExceededException", "message": "Rate exceeded"},
+                        "application/x-amz-json-1.1",
+                    )
+                    return
+                payload, rows = aws_page(config, json.loads(body_bytes))
+                stats.record(rows=rows)
+                self._send(200, payload, "application/x-amz-json-1.1")
+                return
+
+            if "/providers/Microsoft.CostManagement/query" in url.path:
+                if throttle():
+                    stats.record(throttled=True)
+                    error = {"error": {"code": "429", "message": "Too many requests"}}
+                    self._send(429, error, headers={"Retry-After": "1"})
+                    return
+                subscription_id = url.path.split("/")[2]
+                offset = int(parse_qs(url.query).get("$skiptoken", ["0"])[0])
+                rows, more = azure_page(config, subscription_id, json.loads(body_bytes), offset)
+                properties: Dict[str, Any] = {
+                    "columns": [{"name": name} for name in AZURE_COLUMNS],
+                    "rows": rows,
+                    "nextLink": None,
+                }
+                if more:
+                    base = f"http://{self.headers.get('Host')}{url.path}"
+                    properties["nextLink"] = f"{base}?api-version=2023-03-01&$skiptoken={offset + config.page_size}"
+                stats.record(rows=len(rows))
+                self._send(200, {"properties": properties})
+                return
+
+            stats.record()
+            self._send(404, {"error": f"unknown endpoint {url.path}"})
+
+    return Handler
+
+
+def start_server(
+    config: Optional[FakeConfig] = None, host: str = "127.0.0.1", port: int = 0
+) -> Tuple[ThreadingHTTPServer, FakeStats]:
+    """Start the fake providers on a background thread; ``port=0`` picks a free port."""
+    config = config or FakeConfig()
+    stats = FakeStats()
+    server = ThreadingHTTPServer((host, port), make_handler(config, stats))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-providers", daemon=True).start()
+    return server, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve fake AWS Cost Explorer / Azure Cost Management endpoints.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--accounts", type=int, default=20, help="AWS linked accounts")
+    parser.add_argument("--services", type=int, default=40)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of requests throttled")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    config = FakeConfig(
+        accounts=args.accounts,
+        services=args.services,
+        page_size=args.page_size,
+        throttle_rate=args.throttle_rate,
+        latency_ms=args.latency_ms,
+    )
+    server, stats = start_server(config, args.host, args.port)
+    print(f"[fake-providers] listening on http://{args.host}:{server.server_port}")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"[fake-providers] {stats.requests} requests, {stats.throttled} throttled, {stats.rows} rows")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Fill ``cost_entries`` and ``fx_rates`` with synthetic data at realistic cardinality.
+
+Each account uses a skewed subset of a shared service catalogue; every
+(account, service) pair produces one row per day with a heavy-tailed base cost,
+weekly seasonality, a slow trend and noise. Tag coverage is skewed per account
+(most accounts are poorly tagged, a few are fully tagged). FX rates follow a
+random walk per currency on ECB publishing days::
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m bench.generate --accounts 2000 --days 730 --truncate
+"""
+
+import argparse
+import os
+import random
+import time
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+from sqlalchemy import delete, exists, insert, select
+
+from api.crud import DEFAULT_WRITE_BATCH_SIZE, upsert_fx_rates
+from api.db import ENGINE, SessionLocal
+from api.models import Base, CostEntry, CostMonthly, FxRate, IngestionRun
+from core.batch import CostBatch
+from core.parallel import iter_keyed_batches, normalization_pool
+
+PROVIDER_CURRENCIES = {
+    "aws": ["USD"],
+    "azure": ["USD", "EUR", "GBP"],
+    "gcp": ["USD", "EUR"],
+}
+PROVIDER_REGIONS = {
+    "aws": ["global"],
+    "azure": ["westeurope", "northeurope", "eastus", "westus2", "uksouth"],
+    "gcp": ["europe-west1", "us-central1", "asia-east1"],
+}
+ENVIRONMENTS = ("prod", "staging", "dev")
+
+
+def _fx_rate(day: date, currency: str, rate: float) -> Dict:
+    return {
+        "id": f"{day.isoformat()}_{currency}",
+        "date": day,
+        "base_currency": "EUR",
+        "currency": currency,
+        "rate": rate,
+    }
+
+
+def generate_fx_rates(currencies: List[str], start: date, end: date, seed: int) -> List[Dict]:
+    rng = random.Random(seed)
+    levels = {currency: rng.uniform(0.7, 1.5) for currency in currencies if currency != "EUR"}
+    entries = []
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            for currency in levels:
+                levels[currency] *= 1 + rng.gauss(0, 0.004)
+                entries.append(_fx_rate(day, currency, levels[currency]))
+            entries.append(_fx_rate(day, "EUR", 1.0))
+        day += timedelta(days=1)
+    return entries
+
+
+def plan_pairs(
+    providers: List[str], accounts: int, services: int, services_per_account: int, seed: int
+) -> Iterator[Tuple[str, str, str, str, str, str, float, Dict[str, str]]]:
+    """Yield ``(provider, account_id, account_name, service, region, currency, base_cost, tags)`` per pair."""
+    rng = random.Random(seed)
+    # Zipf-like popularity so a few services appear in most accounts.
+    weights = [1 / (rank + 1) for rank in range(services)]
+    for idx in range(accounts):
+        provider = providers[idx % len(providers)]
+        account_id = f"{provider}-{idx:05d}"
+        currency = rng.choice(PROVIDER_CURRENCIES[provider])
+        coverage = rng.betavariate(0.6, 0.9)
+        team = f"team-{rng.randrange(max(accounts // 20, 1)):03d}"
+        count = max(1, min(services, int(rng.expovariate(1 / services_per_account)) + 1))
+        chosen = set()
+        while len(chosen) < count:
+            chosen.add(rng.choices(range(services), weights)[0])
+        for service_idx in sorted(chosen):
+            roll = rng.random()
+            if roll < coverage:
+                tags = {"owner": team, "cost_center": f"cc-{idx % 97:02d}", "environment": rng.choice(ENVIRONMENTS)}
+            elif roll < coverage + (1 - coverage) / 3:
+                tags = {"owner": team}
+            else:
+                tags = {}
+            yield (
+                provider,
+                account_id,
+                f"Account {idx:05d}",
+                f"{provider.upper()} Service {service_idx:03d}",
+                rng.choice(PROVIDER_REGIONS[provider]),
+                currency,
+                rng.lognormvariate(1.0, 1.8),
+                tags,
+            )
+
+
+def iter_batches(pairs, start: date, days: int, batch_size: int, seed: int) -> Iterator[CostBatch]:
+    rng = np.random.default_rng(seed)
+    day_idx = np.arange(days)
+    weekly = 1 + 0.15 * np.cos(2 * np.pi * ((day_idx + start.weekday()) % 7) / 7)
+    dates = [start + timedelta(days=int(offset)) for offset in day_idx]
+    batch = CostBatch()
+    for provider, account_id, account_name, service, region, currency, base, tags in pairs:
+        trend = 1 + rng.normal(0, 0.3) * day_idx / max(days, 1)
+        costs = np.maximum(base * weekly * trend * rng.lognormal(0, 0.2, days), 0)
+        for entry_date, cost in zip(dates, costs.tolist()):
+            batch.append(entry_date, provider, account_id, account_name, service, region, cost, currency, tags)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = CostBatch()
+    if len(batch):
+        yield batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic cost entries and FX rates.")
+    parser.add_argument("--providers", default="aws,azure,gcp")
+    parser.add_argument("--accounts", type=int, default=500)
+    parser.add_argument("--services", type=int, default=300, help="size of the service catalogue")
+    parser.add_argument("--services-per-account", type=int, default=8, help="mean services used per account")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--end", default=None, help="last day (default: yesterday)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--truncate",
+        action="store_true",
+        help="delete existing costs (both tiers), FX rates and ingestion runs first",
+    )
+    args = parser.parse_args()
+
+    providers = [item.strip() for item in args.providers.split(",") if item.strip()]
+    end = date.fromisoformat(args.end) if args.end else date.today() - timedelta(days=1)
+    start = end - timedelta(days=args.days - 1)
+    batch_size = int(os.getenv("WRITE_BATCH_SIZE", str(DEFAULT_WRITE_BATCH_SIZE * 10)))
+
+    Base.metadata.create_all(ENGINE)
+    session = SessionLocal()
+    pool = normalization_pool()
+    try:
+        if args.truncate:
+            # Leftover compacted months would be unioned into the new data.
+            session.execute(delete(CostEntry))
+            session.execute(delete(CostMonthly))
+            session.execute(delete(FxRate))
+            session.execute(delete(IngestionRun))
+            session.commit()
+        elif session.scalar(select(exists().select_from(CostEntry))):
+            # Generated ids are deterministic, so a second run would collide with the first.
+            parser.error("cost_entries is not empty; pass --truncate to replace the existing data")
+
+        currencies = sorted({currency for provider in providers for currency in PROVIDER_CURRENCIES[provider]})
+        # Start FX a few days early so the first cost day always has a rate.
+        fx_count = upsert_fx_rates(session, generate_fx_rates(currencies, start - timedelta(days=7), end, args.seed))
+
+        started = time.monotonic()
+        rows = 0
+        pairs = plan_pairs(providers, args.accounts, args.services, args.services_per_account, args.seed)
+        for batch, keys in iter_keyed_batches(iter_batches(pairs, start, args.days, batch_size, args.seed), pool):
+            session.execute(insert(CostEntry), list(batch.iter_records(keys)))
+            session.commit()
+            rows += len(batch)
+        elapsed = time.monotonic() - started
+        print(
+            f"[bench:generate] {rows} cost entries ({start}..{end}) and {fx_count} FX rates "
+            f"in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s)"
+        )
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
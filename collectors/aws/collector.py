@@ -1,14 +1,20 @@
 import os
 from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 import boto3
 from botocore.config import Config
 
-from collectors.common import load_sample_data, resolve_date_range
+from collectors.common import IngestionPlan, load_sample_data, resolve_windows
+from collectors.spool import open_spool
+from core.ingestion import phase, record_api_call, record_page
 
 SAMPLE_PATH = Path(__file__).with_name("sample.json")
+# Cost Explorer is queried once for all linked accounts, so ingestion state is
+# tracked against a single payer-wide scope.
+ACCOUNT_SCOPE = "*"
+BACKFILL_WINDOW_DAYS = 31
 
 
 def _get_env(name: str, default: Optional[str] = None) -> Optional[str]:
@@ -44,21 +50,11 @@ def _build_session() -> boto3.Session:
     return session
 
 
-def _collect_from_api() -> List[Dict[str, Any]]:
-    region = _get_env("AWS_REGION", "us-east-1")
-    lookback_days = int(_get_env("LOOKBACK_DAYS", "7"))
-    metric = _get_env("AWS_COST_METRIC", "UnblendedCost")
-
-    start_date, end_date = resolve_date_range(lookback_days)
+def _iter_pages(client, metric: str, start_date: date, end_date: date) -> Iterator[Dict[str, Any]]:
     end_exclusive = end_date + timedelta(days=1)
-
-    session = _build_session()
-    retry_config = Config(retries={"max_attempts": 5, "mode": "standard"})
-    client = session.client("ce", region_name=region, config=retry_config)
-
-    entries: List[Dict[str, Any]] = []
     token = None
     while True:
+        record_api_call("aws", "get_cost_and_usage")
         response = client.get_cost_and_usage(
             TimePeriod={"Start": start_date.isoformat(), "End": end_exclusive.isoformat()},
             Granularity="DAILY",
@@ -69,43 +65,86 @@ def _collect_from_api() -> List[Dict[str, Any]]:
             ],
             **({"NextPageToken": token} if token else {}),
         )
+        record_page()
+        yield {"ResultsByTime": response.get("ResultsByTime", [])}
+
+        token = response.get("NextPageToken")
+        if not token:
+            break
 
-        for day in response.get("ResultsByTime", []):
+
+def _parse_results(pages: Iterable[Dict[str, Any]], metric: str) -> Iterator[Dict[str, Any]]:
+    for page in pages:
+        for day in page.get("ResultsByTime", []):
             usage_date = datetime.fromisoformat(day["TimePeriod"]["Start"]).date()
             for group in day.get("Groups", []):
                 service, account_id = group.get("Keys", ["Unknown", ""])
                 amount = group.get("Metrics", {}).get(metric, {}).get("Amount", "0")
                 unit = group.get("Metrics", {}).get(metric, {}).get("Unit", "USD")
-                entries.append(
-                    {
-                        "date": usage_date,
-                        "provider": "aws",
-                        "account_id": account_id or "unknown",
-                        "account_name": None,
-                        "service": service or "Unknown",
-                        "region": "global",
-                        "cost": float(amount or 0),
-                        "currency": unit or "USD",
-                        "tags": {},
-                    }
-                )
+                yield {
+                    "date": usage_date,
+                    "provider": "aws",
+                    "account_id": account_id or "unknown",
+                    "account_name": None,
+                    "service": service or "Unknown",
+                    "region": "global",
+                    "cost": float(amount or 0),
+                    "currency": unit or "USD",
+                    "tags": {},
+                }
+
+
+def _fetch_window(client, metric: str, start_date: date, end_date: date) -> Iterator[Dict[str, Any]]:
+    with open_spool("aws", ACCOUNT_SCOPE, start_date, end_date, metric=metric) as spool:
+        for page in _iter_pages(client, metric, start_date, end_date):
+            spool.write(page)
+            yield from _parse_results([page], metric)
 
-        token = response.get("NextPageToken")
-        if not token:
-            break
-    return entries
 
+def replay_spool(header: Dict[str, Any], pages: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Re-parse spooled Cost Explorer pages without calling the API."""
+    return _parse_results(pages, header.get("metric") or _get_env("AWS_COST_METRIC", "UnblendedCost"))
 
-def collect() -> List[Dict[str, Any]]:
-    """Return AWS cost entries in unified schema."""
+
+def _collect_from_api(plan: Optional[IngestionPlan] = None) -> Iterator[Dict[str, Any]]:
+    region = _get_env("AWS_REGION", "us-east-1")
+    lookback_days = int(_get_env("LOOKBACK_DAYS", "7"))
+    metric = _get_env("AWS_COST_METRIC", "UnblendedCost")
+
+    windows = resolve_windows(plan, ACCOUNT_SCOPE, lookback_days)
+    if not windows:
+        return
+
+    with phase("auth"):
+        session = _build_session()
+        retry_config = Config(retries={"max_attempts": 5, "mode": "standard"})
+        # AWS_CE_ENDPOINT_URL points the client at a stand-in such as bench.fake_providers.
+        client = session.client(
+            "ce", region_name=region, config=retry_config, endpoint_url=_get_env("AWS_CE_ENDPOINT_URL")
+        )
+
+    for start_date, end_date in windows:
+        yield from _fetch_window(client, metric, start_date, end_date)
+        if plan:
+            plan.mark_fetched(ACCOUNT_SCOPE, start_date, end_date)
+
+
+def account_scopes() -> List[str]:
+    if not _get_env("AWS_ROLE_ARN") and not _get_env("AWS_ACCESS_KEY_ID"):
+        return []
+    return [ACCOUNT_SCOPE]
+
+
+def collect(plan: Optional[IngestionPlan] = None) -> Iterator[Dict[str, Any]]:
+    """Yield AWS cost entries in unified schema as Cost Explorer pages arrive."""
     if _get_env("AWS_USE_SAMPLE", "0") == "1":
         entries = load_sample_data(SAMPLE_PATH)
         for entry in entries:
             entry.setdefault("provider", "aws")
             entry["date"] = datetime.fromisoformat(entry["date"]).date()
-        return entries
+        return iter(entries)
 
     if not _get_env("AWS_ROLE_ARN") and not _get_env("AWS_ACCESS_KEY_ID"):
-        return []
+        return iter(())
 
-    return _collect_from_api()
+    return _collect_from_api(plan)
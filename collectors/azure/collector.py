@@ -1,15 +1,22 @@
 import os
 from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
-from collectors.common import load_sample_data, resolve_date_range
+from collectors.common import IngestionPlan, load_sample_data, resolve_windows
+from collectors.spool import open_spool
+from core.ingestion import phase, record_api_call, record_page
 
 SAMPLE_PATH = Path(__file__).with_name("sample.json")
+# Cost Management caps the span of a single custom query; monthly windows stay
+# well inside it and keep nextLink chains short.
+BACKFILL_WINDOW_DAYS = 31
+MANAGEMENT_URL = "https://management.azure.com"
+LOGIN_URL = "https://login.microsoftonline.com"
 
 
 def _get_env(name: str, default: Optional[str] = None) -> Optional[str]:
@@ -19,49 +26,69 @@ def _get_env(name: str, default: Optional[str] = None) -> Optional[str]:
 
 def _build_http_session() -> requests.Session:
     session = requests.Session()
-    retry = Retry(total=3, backoff_factor=0.6, status_forcelist=[429, 500, 502, 503, 504])
+    # Cost Management queries are POSTs but read-only, so they are safe to retry;
+    # urllib3 skips POST by default. Retry-After on 429 is honoured.
+    retry = Retry(
+        total=3,
+        backoff_factor=0.6,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset({"GET", "POST"}),
+    )
     adapter = HTTPAdapter(max_retries=retry)
     session.mount("https://", adapter)
+    session.mount("http://", adapter)
     return session
 
 
+def _subscription_ids() -> List[str]:
+    subscription_ids = _get_env("AZURE_SUBSCRIPTION_IDS") or ""
+    return [item.strip() for item in subscription_ids.split(",") if item.strip()]
+
+
 def _get_token(session: requests.Session, tenant_id: str, client_id: str, client_secret: str) -> str:
-    url = f"https://login.microsoftonline.com/{tenant_id}/oauth2/token"
+    url = f"{_get_env('AZURE_LOGIN_URL', LOGIN_URL).rstrip('/')}/{tenant_id}/oauth2/token"
     data = {
         "grant_type": "client_credentials",
         "client_id": client_id,
         "client_secret": client_secret,
         "resource": "https://management.azure.com/",
     }
+    record_api_call("azure", "token")
     response = session.post(url, data=data, timeout=20)
     response.raise_for_status()
     payload = response.json()
     return payload["access_token"]
 
 
-def _iter_rows(
+def _iter_pages(
     session: requests.Session,
     payload: Dict[str, Any],
     headers: Dict[str, str],
     body: Dict[str, Any],
-) -> Iterable[tuple[list[str], List[Any]]]:
+) -> Iterator[Dict[str, Any]]:
     properties = payload.get("properties", {})
     columns = [col["name"] for col in properties.get("columns", [])]
-    rows = properties.get("rows", [])
-    for row in rows:
-        yield columns, row
+    record_page()
+    yield {"columns": columns, "rows": properties.get("rows", [])}
     next_link = properties.get("nextLink")
     while next_link:
+        record_api_call("azure", "query_next_page")
         response = session.post(next_link, headers=headers, json=body, timeout=20)
         response.raise_for_status()
         payload = response.json()
         properties = payload.get("properties", {})
-        rows = properties.get("rows", [])
-        for row in rows:
-            yield columns, row
+        record_page()
+        yield {"columns": columns, "rows": properties.get("rows", [])}
         next_link = properties.get("nextLink")
 
 
+def _iter_rows(pages: Iterable[Dict[str, Any]]) -> Iterable[tuple[list[str], List[Any]]]:
+    for page in pages:
+        columns = page["columns"]
+        for row in page["rows"]:
+            yield columns, row
+
+
 def _build_query(start_date: date, end_date: date) -> Dict[str, Any]:
     return {
         "type": "ActualCost",
@@ -85,8 +112,7 @@ def _parse_rows(
     rows: Iterable[tuple[list[str], List[Any]]],
     subscription_id: str,
     account_name: Optional[str],
-) -> List[Dict[str, Any]]:
-    entries: List[Dict[str, Any]] = []
+) -> Iterator[Dict[str, Any]]:
     for columns, row in rows:
         row_map = dict(zip(columns, row))
         cost_value = row_map.get("Cost", row_map.get("PreTaxCost", 0))
@@ -100,60 +126,71 @@ def _parse_rows(
         currency = row_map.get("Currency") or row_map.get("BillingCurrency") or _get_env(
             "AZURE_DEFAULT_CURRENCY", "USD"
         )
-        entries.append(
-            {
-                "date": usage_date,
-                "provider": "azure",
-                "account_id": subscription_id,
-                "account_name": account_name,
-                "service": service,
-                "region": region,
-                "cost": cost,
-                "currency": currency,
-                "tags": {},
-            }
-        )
-    return entries
-
-
-def _collect_from_api() -> List[Dict[str, Any]]:
+        yield {
+            "date": usage_date,
+            "provider": "azure",
+            "account_id": subscription_id,
+            "account_name": account_name,
+            "service": service,
+            "region": region,
+            "cost": cost,
+            "currency": currency,
+            "tags": {},
+        }
+
+
+def _collect_from_api(plan: Optional[IngestionPlan] = None) -> Iterator[Dict[str, Any]]:
     tenant_id = _get_env("AZURE_TENANT_ID")
     client_id = _get_env("AZURE_CLIENT_ID")
     client_secret = _get_env("AZURE_CLIENT_SECRET")
-    subscription_ids = _get_env("AZURE_SUBSCRIPTION_IDS")
+    subscription_ids = _subscription_ids()
     if not (tenant_id and client_id and client_secret and subscription_ids):
         raise ValueError("Azure credentials are not configured")
 
     account_name = _get_env("AZURE_ACCOUNT_NAME")
     lookback_days = int(_get_env("LOOKBACK_DAYS", "7"))
-    start_date, end_date = resolve_date_range(lookback_days)
 
     session = _build_http_session()
-    token = _get_token(session, tenant_id, client_id, client_secret)
+    with phase("auth"):
+        token = _get_token(session, tenant_id, client_id, client_secret)
     headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
-    all_entries: List[Dict[str, Any]] = []
-    for subscription_id in [item.strip() for item in subscription_ids.split(",") if item.strip()]:
+    management_url = _get_env("AZURE_MANAGEMENT_URL", MANAGEMENT_URL).rstrip("/")
+    for subscription_id in subscription_ids:
         url = (
-            f"https://management.azure.com/subscriptions/{subscription_id}"
+            f"{management_url}/subscriptions/{subscription_id}"
             "/providers/Microsoft.CostManagement/query?api-version=2023-03-01"
         )
-        body = _build_query(start_date, end_date)
-        response = session.post(url, headers=headers, json=body, timeout=30)
-        response.raise_for_status()
-        payload = response.json()
-        rows = _iter_rows(session, payload, headers, body)
-        all_entries.extend(_parse_rows(rows, subscription_id, account_name))
-    return all_entries
+        for start_date, end_date in resolve_windows(plan, subscription_id, lookback_days):
+            body = _build_query(start_date, end_date)
+            record_api_call("azure", "query")
+            response = session.post(url, headers=headers, json=body, timeout=30)
+            response.raise_for_status()
+            payload = response.json()
+            with open_spool("azure", subscription_id, start_date, end_date) as spool:
+                for page in _iter_pages(session, payload, headers, body):
+                    spool.write(page)
+                    yield from _parse_rows(_iter_rows([page]), subscription_id, account_name)
+            if plan:
+                plan.mark_fetched(subscription_id, start_date, end_date)
+
+
+def replay_spool(header: Dict[str, Any], pages: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Re-parse spooled Cost Management pages without calling the API."""
+    return _parse_rows(_iter_rows(pages), header["account_id"], _get_env("AZURE_ACCOUNT_NAME"))
+
+
+def account_scopes() -> List[str]:
+    return _subscription_ids()
 
 
-def collect() -> List[Dict[str, Any]]:
-    """Return Azure cost entries in unified schema."""
+def collect(plan: Optional[IngestionPlan] = None) -> Iterator[Dict[str, Any]]:
+    """Yield Azure cost entries in unified schema as query pages arrive."""
     if _get_env("AZURE_USE_SAMPLE", "0") == "1":
         entries = load_sample_data(SAMPLE_PATH)
         for entry in entries:
             entry.setdefault("provider", "azure")
             entry["date"] = datetime.fromisoformat(entry["date"]).date()
-        return entries
+        return iter(entries)
 
-    return _collect_from_api()
+    return _collect_from_api(plan)
@@ -0,0 +1,173 @@
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed
+from datetime import date, datetime
+from typing import Callable, List, Optional, Tuple
+
+from api.crud import (
+    DEFAULT_WRITE_BATCH_SIZE,
+    WriteStats,
+    get_completed_backfill_windows,
+    record_backfill_window,
+    record_ingestion_state,
+    reset_backfill_progress,
+    write_cost_entries,
+)
+from api.db import SessionLocal
+from collectors.aws import collector as aws_collector
+from collectors.azure import collector as azure_collector
+from collectors.common import WindowPlan, finalize_after_days, split_range
+from core.metrics import record_write_stats
+from core.parallel import normalization_pool
+from worker.parquet_export import export_after_ingestion
+
+PROVIDERS = {
+    "aws": aws_collector,
+    "azure": azure_collector,
+}
+DEFAULT_CONCURRENCY = 2
+DEFAULT_MIN_INTERVAL_SECONDS = 1.0
+
+
+class RateLimiter:
+    """Spaces out window starts so parallel workers stay under API rate limits."""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = max(0.0, self._next_at - now)
+            self._next_at = max(now, self._next_at) + self.min_interval
+        if delay:
+            time.sleep(delay)
+
+
+def _provider_setting(provider: str, name: str, default: str) -> str:
+    value = os.getenv(f"{name}_{provider.upper()}") or os.getenv(name) or default
+    return value.strip()
+
+
+def plan_windows(provider: str, start: date, end: date) -> List[Tuple[str, date, date]]:
+    module = PROVIDERS[provider]
+    window_days = int(_provider_setting(provider, "BACKFILL_WINDOW_DAYS", str(module.BACKFILL_WINDOW_DAYS)))
+    return [
+        (account_id, window_start, window_end)
+        for account_id in module.account_scopes()
+        for window_start, window_end in split_range(start, end, window_days)
+    ]
+
+
+def run_window(
+    provider: str,
+    collect: Callable,
+    account_id: str,
+    start: date,
+    end: date,
+    limiter: RateLimiter,
+    normalize_pool: Optional[Executor] = None,
+) -> WriteStats:
+    limiter.wait()
+    session = SessionLocal()
+    try:
+        record_backfill_window(session, provider, account_id, start, end, "running")
+        try:
+            entries = collect(WindowPlan(provider, account_id, start, end))
+            batch_size = int(os.getenv("WRITE_BATCH_SIZE", str(DEFAULT_WRITE_BATCH_SIZE)))
+            stats = write_cost_entries(session, entries, batch_size, normalize_pool)
+            record_write_stats(provider, stats)
+            record_ingestion_state(session, provider, [(account_id, start, end)], finalize_after_days(provider))
+        except Exception as exc:
+            session.rollback()
+            record_backfill_window(session, provider, account_id, start, end, "failed", error=str(exc))
+            raise
+        record_backfill_window(session, provider, account_id, start, end, "completed", rows=stats.total)
+        return stats
+    finally:
+        session.close()
+
+
+def run_backfill(start: date, end: date, providers: Optional[List[str]] = None, restart: bool = False) -> int:
+    failures = 0
+    for provider in providers or list(PROVIDERS):
+        session = SessionLocal()
+        try:
+            if restart:
+                reset_backfill_progress(session, provider, start, end)
+            completed = get_completed_backfill_windows(session, provider)
+        finally:
+            session.close()
+
+        windows = plan_windows(provider, start, end)
+        pending = [window for window in windows if window not in completed]
+        skipped = len(windows) - len(pending)
+        print(f"[backfill:{provider}] {len(pending)} windows pending, {skipped} already completed")
+        if not pending:
+            continue
+
+        concurrency = int(_provider_setting(provider, "BACKFILL_CONCURRENCY", str(DEFAULT_CONCURRENCY)))
+        limiter = RateLimiter(
+            float(_provider_setting(provider, "BACKFILL_MIN_INTERVAL_SECONDS", str(DEFAULT_MIN_INTERVAL_SECONDS)))
+        )
+        collect = PROVIDERS[provider].collect
+        # One process pool is shared by all windows of the provider so that
+        # hashing for concurrent windows does not spawn a pool per window.
+        normalize_pool = normalization_pool()
+        written = WriteStats()
+        try:
+            with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+                futures = {
+                    pool.submit(
+                        run_window, provider, collect, account_id, window_start, window_end, limiter, normalize_pool
+                    ): (
+                        account_id,
+                        window_start,
+                        window_end,
+                    )
+                    for account_id, window_start, window_end in pending
+                }
+                for future in as_completed(futures):
+                    account_id, window_start, window_end = futures[future]
+                    label = f"{account_id} {window_start.isoformat()}..{window_end.isoformat()}"
+                    try:
+                        stats = future.result()
+                        written.add(stats)
+                        print(f"[backfill:{provider}] {label} completed ({stats.total} rows)")
+                    except Exception as exc:
+                        failures += 1
+                        print(f"[backfill:{provider}] {label} failed: {exc}")
+        finally:
+            if normalize_pool is not None:
+                normalize_pool.shutdown()
+        # One export per provider once its windows are in: per-window exports
+        # would rewrite the same months once for every account and window.
+        export_after_ingestion(provider, start, end, written)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill cost entries in resumable, provider-sized windows.")
+    parser.add_argument("--from", dest="start", default=os.getenv("BACKFILL_FROM"))
+    parser.add_argument("--to", dest="end", default=os.getenv("BACKFILL_TO"))
+    parser.add_argument("--provider", action="append", choices=sorted(PROVIDERS))
+    parser.add_argument("--restart", action="store_true", help="ignore recorded progress for the range")
+    args = parser.parse_args()
+    if not args.start:
+        parser.error("--from (or BACKFILL_FROM) is required")
+
+    start = datetime.fromisoformat(args.start).date()
+    end = datetime.fromisoformat(args.end).date() if args.end else date.today()
+    if start > end:
+        parser.error("--from must be <= --to")
+    failures = run_backfill(start, end, args.provider, args.restart)
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
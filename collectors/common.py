@@ -2,7 +2,9 @@ import json
 import os
 from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+DEFAULT_FINALIZE_AFTER_DAYS = 3
 
 
 def load_sample_data(path: Path) -> List[Dict[str, Any]]:
@@ -24,6 +26,86 @@ def resolve_date_range(lookback_days: int) -> Tuple[date, date]:
     return start, end
 
 
+def finalize_after_days(provider: str) -> int:
+    override = _get_env(f"FINALIZE_AFTER_DAYS_{provider.upper()}")
+    if override:
+        return int(override)
+    return int(_get_env("FINALIZE_AFTER_DAYS", str(DEFAULT_FINALIZE_AFTER_DAYS)))
+
+
+def split_pending_windows(start: date, end: date, final_days: Set[date]) -> List[Tuple[date, date]]:
+    windows: List[Tuple[date, date]] = []
+    window_start: Optional[date] = None
+    day = start
+    while day <= end:
+        if day in final_days:
+            if window_start:
+                windows.append((window_start, day - timedelta(days=1)))
+                window_start = None
+        elif not window_start:
+            window_start = day
+        day += timedelta(days=1)
+    if window_start:
+        windows.append((window_start, end))
+    return windows
+
+
+def split_range(start: date, end: date, window_days: int) -> List[Tuple[date, date]]:
+    windows: List[Tuple[date, date]] = []
+    window_start = start
+    while window_start <= end:
+        window_end = min(window_start + timedelta(days=window_days - 1), end)
+        windows.append((window_start, window_end))
+        window_start = window_end + timedelta(days=1)
+    return windows
+
+
+class IngestionPlan:
+    """Tracks which days a collector still has to fetch, per account scope.
+
+    Days already marked final are skipped unless an explicit backfill is
+    requested; every window a collector fetches is recorded in ``fetched`` so
+    the caller can persist the new ingestion state once the rows are written.
+    """
+
+    def __init__(self, provider: str, final_days: Optional[Dict[str, Set[date]]] = None):
+        self.provider = provider
+        self.final_days = final_days or {}
+        self.fetched: List[Tuple[str, date, date]] = []
+
+    def windows(self, account_id: str, lookback_days: int) -> List[Tuple[date, date]]:
+        start, end = resolve_date_range(lookback_days)
+        if _get_env("BACKFILL_FROM"):
+            return [(start, end)]
+        return split_pending_windows(start, end, self.final_days.get(account_id, set()))
+
+    def mark_fetched(self, account_id: str, start: date, end: date):
+        self.fetched.append((account_id, start, end))
+
+
+class WindowPlan(IngestionPlan):
+    """Restricts a collector run to one explicit window of one account scope."""
+
+    def __init__(self, provider: str, account_id: str, start: date, end: date):
+        super().__init__(provider)
+        self.account_id = account_id
+        self.start = start
+        self.end = end
+
+    def windows(self, account_id: str, lookback_days: int) -> List[Tuple[date, date]]:
+        if account_id != self.account_id:
+            return []
+        return [(self.start, self.end)]
+
+
+def resolve_windows(
+    plan: Optional[IngestionPlan], account_id: str, lookback_days: int
+) -> List[Tuple[date, date]]:
+    if plan is None:
+        return [resolve_date_range(lookback_days)]
+    return plan.windows(account_id, lookback_days)
+
+
 def _get_env(name: str, default: Optional[str] = None) -> Optional[str]:
     value = os.getenv(name, default)
     return value.strip() if value else value
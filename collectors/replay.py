@@ -0,0 +1,82 @@
+import argparse
+import os
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import List, Optional
+
+from api.crud import DEFAULT_WRITE_BATCH_SIZE, write_cost_entries
+from api.db import SessionLocal
+from collectors.aws import collector as aws_collector
+from collectors.azure import collector as azure_collector
+from collectors.spool import list_spooled_windows, read_spool, spool_dir
+from core.batch import iter_cost_batches
+from core.parallel import iter_keyed_batches, normalization_pool
+
+PROVIDERS = {
+    "aws": aws_collector,
+    "azure": azure_collector,
+}
+
+
+def replay(
+    root: Path,
+    providers: Optional[List[str]] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    dry_run: bool = False,
+) -> int:
+    """Re-parse and normalize spooled API pages, writing them unless ``dry_run``.
+
+    Whole spooled windows overlapping ``start``..``end`` are replayed.
+    """
+    batch_size = int(os.getenv("WRITE_BATCH_SIZE", str(DEFAULT_WRITE_BATCH_SIZE)))
+    pool = normalization_pool()
+    total = 0
+    try:
+        for provider in providers or list(PROVIDERS):
+            module = PROVIDERS[provider]
+            windows = list_spooled_windows(root, provider, start, end)
+            rows = 0
+            started = time.monotonic()
+            for account_id, window_start, window_end, path in windows:
+                header, pages = read_spool(path)
+                entries = module.replay_spool(header, pages)
+                if dry_run:
+                    for batch, _ in iter_keyed_batches(iter_cost_batches(entries, batch_size), pool):
+                        rows += len(batch)
+                    continue
+                session = SessionLocal()
+                try:
+                    rows += write_cost_entries(session, entries, batch_size, pool).total
+                finally:
+                    session.close()
+            elapsed = time.monotonic() - started
+            rate = rows / elapsed if elapsed else 0.0
+            print(f"[replay:{provider}] {len(windows)} windows, {rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+            total += rows
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild cost entries from spooled raw API pages.")
+    parser.add_argument("--dir", default=os.getenv("COLLECTOR_SPOOL_DIR"), help="spool directory")
+    parser.add_argument("--from", dest="start")
+    parser.add_argument("--to", dest="end")
+    parser.add_argument("--provider", action="append", choices=sorted(PROVIDERS))
+    parser.add_argument("--dry-run", action="store_true", help="parse and normalize only, do not write")
+    args = parser.parse_args()
+    root = Path(args.dir) if args.dir else spool_dir()
+    if root is None:
+        parser.error("--dir (or COLLECTOR_SPOOL_DIR) is required")
+
+    start = datetime.fromisoformat(args.start).date() if args.start else None
+    end = datetime.fromisoformat(args.end).date() if args.end else None
+    replay(root, args.provider, start, end, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
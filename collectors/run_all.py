@@ -1,29 +1,80 @@
-from api.crud import upsert_cost_entries
+import os
+from datetime import date
+from typing import Optional, Tuple
+
+from api.crud import (
+    DEFAULT_WRITE_BATCH_SIZE,
+    WriteStats,
+    finish_ingestion_run,
+    get_final_days,
+    record_ingestion_state,
+    start_ingestion_run,
+    write_cost_entries,
+)
 from api.db import SessionLocal
 from collectors.aws.collector import collect as collect_aws
 from collectors.azure.collector import collect as collect_azure
+from collectors.common import IngestionPlan, finalize_after_days, resolve_date_range
 from collectors.gcp.collector import collect as collect_gcp
-from core.normalization import normalize_entries
+from core.ingestion import RunStats, current_run, fetched
+from core.metrics import record_write_stats
+from core.parallel import normalization_pool
+from worker.parquet_export import export_after_ingestion
+
+COLLECTORS = {
+    "aws": collect_aws,
+    "gcp": collect_gcp,
+    "azure": collect_azure,
+}
+
 
+def run_collector(name: str, trigger: str = "manual") -> Optional[Tuple[date, date, WriteStats]]:
+    """Collect ``name`` and record the run in ``ingestion_runs``.
 
-def run_collectors():
+    ``trigger`` says what started the run (``scheduled``, ``run_once``,
+    ``manual``) so run history can tell regular ingests from ad-hoc ones.
+    Returns the collected date range and write stats, or None if it failed.
+    """
+    collector = COLLECTORS[name]
     session = SessionLocal()
+    pool = normalization_pool()
+    run = RunStats()
+    token = current_run.set(run)
     try:
-        entries = []
-        for name, collector in (
-            ("aws", collect_aws),
-            ("gcp", collect_gcp),
-            ("azure", collect_azure),
-        ):
-            try:
-                entries.extend(collector())
-            except Exception as exc:
-                print(f"[collector:{name}] failed: {exc}")
-        normalized = normalize_entries(entries)
-        upsert_cost_entries(session, normalized)
+        run_id = start_ingestion_run(session, name, trigger)
+        start, end = resolve_date_range(int(os.getenv("LOOKBACK_DAYS", "7")))
+        batch_size = int(os.getenv("WRITE_BATCH_SIZE", str(DEFAULT_WRITE_BATCH_SIZE)))
+        plan = IngestionPlan(name, get_final_days(session, name, start, end))
+        try:
+            stats = write_cost_entries(session, fetched(collector(plan)), batch_size, pool)
+            record_write_stats(name, stats)
+            if plan.fetched:
+                record_ingestion_state(session, plan.provider, plan.fetched, finalize_after_days(plan.provider))
+        except Exception as exc:
+            session.rollback()
+            finish_ingestion_run(session, run_id, run, error=str(exc))
+            print(f"[collector:{name}] failed: {exc}")
+            return None
+        finish_ingestion_run(session, run_id, run, stats)
+        if stats.total:
+            print(
+                f"[collector:{name}] {stats.changed} changed "
+                f"({stats.inserted} new, {stats.updated} updated), {stats.unchanged} unchanged"
+            )
+        return start, end, stats
     finally:
+        current_run.reset(token)
+        if pool is not None:
+            pool.shutdown()
         session.close()
 
 
+def run_collectors(trigger: str = "manual"):
+    for name in COLLECTORS:
+        result = run_collector(name, trigger)
+        if result:
+            export_after_ingestion(name, *result)
+
+
 if __name__ == "__main__":
     run_collectors()
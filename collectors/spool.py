@@ -0,0 +1,105 @@
+import gzip
+import json
+import os
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+SPOOL_SUFFIX = ".jsonl.gz"
+
+
+def spool_dir() -> Optional[Path]:
+    value = os.getenv("COLLECTOR_SPOOL_DIR", "").strip()
+    return Path(value) if value else None
+
+
+def spool_path(root: Path, provider: str, account_id: str, start: date, end: date) -> Path:
+    return root / provider / quote(account_id, safe="") / f"{start.isoformat()}_{end.isoformat()}{SPOOL_SUFFIX}"
+
+
+class SpoolWriter:
+    """Writes the raw API pages of one (provider, account, window) fetch.
+
+    Pages go to a temporary file that is only renamed into place once the
+    window was fetched completely, so replay never sees a truncated window.
+    A re-fetch of the same window replaces the previous spool file.
+    """
+
+    def __init__(self, path: Path, header: Dict[str, Any]):
+        self.path = path
+        self.header = header
+        self._tmp = path.with_name(path.name + ".tmp")
+        self._handle = None
+
+    def __enter__(self) -> "SpoolWriter":
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._handle = gzip.open(self._tmp, "wt", encoding="utf-8")
+        self._handle.write(json.dumps(self.header) + "\n")
+        return self
+
+    def write(self, page: Dict[str, Any]):
+        self._handle.write(json.dumps(page, separators=(",", ":")) + "\n")
+
+    def __exit__(self, exc_type, exc, tb):
+        self._handle.close()
+        if exc_type is None:
+            os.replace(self._tmp, self.path)
+        else:
+            self._tmp.unlink(missing_ok=True)
+        return False
+
+
+class _NullSpool:
+    def __enter__(self) -> "_NullSpool":
+        return self
+
+    def write(self, page: Dict[str, Any]):
+        pass
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+def open_spool(provider: str, account_id: str, start: date, end: date, **meta: Any):
+    """Return a spool writer for the window, or a no-op one when spooling is off."""
+    root = spool_dir()
+    if root is None:
+        return _NullSpool()
+    header = {
+        "provider": provider,
+        "account_id": account_id,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "written_at": datetime.now(timezone.utc).isoformat(),
+        **meta,
+    }
+    return SpoolWriter(spool_path(root, provider, account_id, start, end), header)
+
+
+def list_spooled_windows(
+    root: Path, provider: str, start: Optional[date] = None, end: Optional[date] = None
+) -> List[Tuple[str, date, date, Path]]:
+    """Return ``(account_id, start, end, path)`` for spooled windows overlapping the range."""
+    windows = []
+    for path in sorted((root / provider).glob(f"*/*{SPOOL_SUFFIX}")):
+        window_start, window_end = (
+            date.fromisoformat(part) for part in path.name[: -len(SPOOL_SUFFIX)].split("_", 1)
+        )
+        if start and window_end < start or end and window_start > end:
+            continue
+        windows.append((unquote(path.parent.name), window_start, window_end, path))
+    return windows
+
+
+def read_spool(path: Path) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+    """Return the spool header and an iterator over its raw pages."""
+    handle = gzip.open(path, "rt", encoding="utf-8")
+    header = json.loads(handle.readline())
+
+    def pages() -> Iterator[Dict[str, Any]]:
+        with handle:
+            for line in handle:
+                yield json.loads(line)
+
+    return header, pages()
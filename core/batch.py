@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from array import array
+from datetime import date
+from typing import Any, Dict, Generic, Hashable, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from core.normalization import build_content_digest, serialize_tags
+
+T = TypeVar("T", bound=Hashable)
+DIGEST_SIZE = 32
+# (dates, costs, ((codes, values) per dictionary column)), see CostBatch.key_columns.
+KeyColumns = Tuple[array, array, Tuple[Tuple[array, List[Any]], ...]]
+
+
+def _narrow_codes(codes: array, distinct: int) -> array:
+    """Return ``codes`` in the smallest unsigned array type that holds ``distinct`` codes."""
+    for typecode in ("B", "H"):
+        if distinct <= 1 << (8 * array(typecode).itemsize):
+            return array(typecode, codes)
+    return codes
+
+
+def split_digests(digests: bytes) -> List[str]:
+    return [digests[idx : idx + DIGEST_SIZE].hex() for idx in range(0, len(digests), DIGEST_SIZE)]
+
+
+class DictionaryColumn(Generic[T]):
+    """Column stored as an array of integer codes into a list of distinct values."""
+
+    def __init__(self):
+        self.values: List[T] = []
+        self.codes = array("I")
+        self._index: Dict[T, int] = {}
+
+    def append(self, value: T) -> int:
+        code = self._index.get(value)
+        if code is None:
+            code = len(self.values)
+            self._index[value] = code
+            self.values.append(value)
+        self.codes.append(code)
+        return code
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, idx: int) -> T:
+        return self.values[self.codes[idx]]
+
+
+class CostBatch:
+    """Columnar buffer of normalized cost entries.
+
+    Repeated strings (provider, account, service, region, currency) and tag sets
+    are dictionary-encoded, costs are float64 and dates are stored as ordinals,
+    so a batch costs a few bytes per row instead of a dict per row.
+    """
+
+    def __init__(self):
+        self.dates = array("i")
+        self.costs = array("d")
+        self.providers: DictionaryColumn[str] = DictionaryColumn()
+        self.account_ids: DictionaryColumn[str] = DictionaryColumn()
+        self.account_names: DictionaryColumn[Optional[str]] = DictionaryColumn()
+        self.services: DictionaryColumn[str] = DictionaryColumn()
+        self.regions: DictionaryColumn[Optional[str]] = DictionaryColumn()
+        self.currencies: DictionaryColumn[str] = DictionaryColumn()
+        self.tags: DictionaryColumn[str] = DictionaryColumn()
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def _dictionary_columns(self) -> Tuple[DictionaryColumn, ...]:
+        return (
+            self.providers,
+            self.account_ids,
+            self.account_names,
+            self.services,
+            self.regions,
+            self.currencies,
+            self.tags,
+        )
+
+    def key_columns(self) -> KeyColumns:
+        """Return the packed arrays and distinct values the key digests are computed from.
+
+        This is what goes to a worker process: codes are narrowed to one or two
+        bytes where the column's cardinality allows, and the dictionary lookup
+        indexes, which are only needed while appending, stay behind.
+        """
+        dictionaries = tuple(
+            (_narrow_codes(column.codes, len(column.values)), column.values) for column in self._dictionary_columns()
+        )
+        return self.dates, self.costs, dictionaries
+
+    @classmethod
+    def from_key_columns(cls, columns: KeyColumns) -> CostBatch:
+        """Rebuild a read-only batch from ``key_columns`` output."""
+        batch = cls()
+        batch.dates, batch.costs, dictionaries = columns
+        for column, (codes, values) in zip(batch._dictionary_columns(), dictionaries):
+            column.codes, column.values = codes, values
+        return batch
+
+    def append(
+        self,
+        entry_date: date,
+        provider: str,
+        account_id: str,
+        account_name: Optional[str],
+        service: str,
+        region: Optional[str],
+        cost: float,
+        currency: str,
+        tags: Optional[Dict[str, Any]],
+    ):
+        self.dates.append(entry_date.toordinal())
+        self.costs.append(float(cost))
+        self.providers.append(provider)
+        self.account_ids.append(account_id)
+        self.account_names.append(account_name)
+        self.services.append(service)
+        self.regions.append(region)
+        self.currencies.append(currency)
+        self.tags.append(serialize_tags(tags))
+
+    def append_entry(self, entry: Dict[str, Any]):
+        self.append(
+            entry["date"],
+            entry["provider"],
+            entry["account_id"],
+            entry.get("account_name"),
+            entry["service"],
+            entry.get("region"),
+            entry["cost"],
+            entry["currency"],
+            entry.get("tags"),
+        )
+
+    def extend(self, entries: Iterable[Dict[str, Any]]):
+        for entry in entries:
+            self.append_entry(entry)
+
+    def build_id_digests(self) -> bytes:
+        """Return the packed SHA-256 cost id digests, matching ``build_cost_id``.
+
+        The date prefix is hashed once per distinct day and the identity suffix
+        is encoded once per distinct dimension combination; each row then only
+        pays for a hasher copy and one update.
+        """
+        prefixes: Dict[int, Any] = {}
+        suffixes: Dict[tuple, bytes] = {}
+        digests = bytearray()
+        columns = (self.providers, self.account_ids, self.services, self.regions, self.currencies)
+        for idx, ordinal in enumerate(self.dates):
+            prefix = prefixes.get(ordinal)
+            if prefix is None:
+                prefix = hashlib.sha256(f"{date.fromordinal(ordinal)}|".encode("utf-8"))
+                prefixes[ordinal] = prefix
+            key = tuple(column.codes[idx] for column in columns)
+            suffix = suffixes.get(key)
+            if suffix is None:
+                provider, account_id, service, region, currency = (column[idx] for column in columns)
+                suffix = f"{provider}|{account_id}|{service}|{region or ''}|{currency}".encode("utf-8")
+                suffixes[key] = suffix
+            hasher = prefix.copy()
+            hasher.update(suffix)
+            digests += hasher.digest()
+        return bytes(digests)
+
+    def build_ids(self) -> List[str]:
+        return split_digests(self.build_id_digests())
+
+    def build_content_digests(self) -> bytes:
+        return b"".join(
+            build_content_digest(cost, self.currencies[idx], self.account_names[idx], self.tags[idx])
+            for idx, cost in enumerate(self.costs)
+        )
+
+    def build_content_hashes(self) -> List[str]:
+        return split_digests(self.build_content_digests())
+
+    def iter_records(self, keys: Optional[Tuple[bytes, bytes]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield row dicts; ``keys`` are precomputed ``(id_digests, content_digests)``."""
+        if keys is None:
+            keys = compute_batch_keys(self)
+        ids, hashes = split_digests(keys[0]), split_digests(keys[1])
+        tags = [json.loads(value) for value in self.tags.values]
+        dates: Dict[int, date] = {}
+        for idx, cost_id in enumerate(ids):
+            ordinal = self.dates[idx]
+            if ordinal not in dates:
+                dates[ordinal] = date.fromordinal(ordinal)
+            yield {
+                "id": cost_id,
+                "date": dates[ordinal],
+                "provider": self.providers[idx],
+                "account_id": self.account_ids[idx],
+                "account_name": self.account_names[idx],
+                "service": self.services[idx],
+                "region": self.regions[idx],
+                "cost": self.costs[idx],
+                "currency": self.currencies[idx],
+                "tags": tags[self.tags.codes[idx]],
+                "content_hash": hashes[idx],
+            }
+
+
+def compute_batch_keys(batch: CostBatch) -> Tuple[bytes, bytes]:
+    """Return packed id and content-hash digests for ``batch``.
+
+    The result is two flat byte strings rather than per-row objects, which
+    keeps the IPC payload small when it comes back from a process pool.
+    """
+    return batch.build_id_digests(), batch.build_content_digests()
+
+
+def compute_packed_keys(columns: KeyColumns) -> Tuple[bytes, bytes]:
+    """``compute_batch_keys`` for ``CostBatch.key_columns`` output.
+
+    Module-level so it can run in a process pool.
+    """
+    return compute_batch_keys(CostBatch.from_key_columns(columns))
+
+
+def iter_cost_batches(entries: Iterable[Dict[str, Any]], batch_size: int) -> Iterator[CostBatch]:
+    batch = CostBatch()
+    for entry in entries:
+        batch.append_entry(entry)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = CostBatch()
+    if len(batch):
+        yield batch
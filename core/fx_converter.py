@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Iterable, Sequence
+
+import numpy as np
+
+
+class FxConverter:
+    """Vectorized EUR-based FX conversion, consistent with ``usd_cost_expr``.
+
+    Rates are held per currency as date-sorted arrays; each conversion looks up
+    the latest rate on or before the entry date with ``searchsorted``. Amounts
+    already in the target currency, or without a known rate, pass through
+    unchanged, exactly like the SQL path.
+    """
+
+    def __init__(self, rates: Iterable[tuple[date, str, float]]):
+        grouped: dict[str, list[tuple[int, float]]] = {}
+        for day, currency, rate in rates:
+            grouped.setdefault(currency, []).append((day.toordinal(), rate))
+        self._dates: dict[str, np.ndarray] = {}
+        self._rates: dict[str, np.ndarray] = {}
+        for currency, items in grouped.items():
+            items.sort()
+            self._dates[currency] = np.fromiter((item[0] for item in items), dtype=np.int64, count=len(items))
+            self._rates[currency] = np.fromiter((item[1] for item in items), dtype=np.float64, count=len(items))
+
+    @property
+    def currencies(self) -> list[str]:
+        return sorted(self._dates)
+
+    def rates_on(self, currency: str, ordinals: np.ndarray) -> np.ndarray:
+        """Return the EUR-based rate for ``currency`` on each ordinal (NaN if unknown)."""
+        dates = self._dates.get(currency)
+        result = np.full(len(ordinals), np.nan)
+        if dates is None:
+            return result
+        idx = np.searchsorted(dates, ordinals, side="right") - 1
+        known = idx >= 0
+        result[known] = self._rates[currency][idx[known]]
+        return result
+
+    def convert(
+        self,
+        costs: Sequence[float],
+        currencies: Sequence[str],
+        dates: Sequence[date],
+        target: str = "USD",
+    ) -> np.ndarray:
+        amounts = np.asarray(costs, dtype=np.float64)
+        if not len(amounts):
+            return amounts
+        ordinals = np.fromiter((day.toordinal() for day in dates), dtype=np.int64, count=len(amounts))
+        labels, codes = np.unique(np.asarray(currencies, dtype=object), return_inverse=True)
+        target_rates = self.rates_on(target, ordinals)
+        converted = amounts.copy()
+        for code, currency in enumerate(labels):
+            if currency == target:
+                continue
+            mask = codes == code
+            source_rates = self.rates_on(currency, ordinals[mask])
+            factor = target_rates[mask] / source_rates
+            converted[mask] = np.where(np.isnan(factor), amounts[mask], amounts[mask] * factor)
+        return converted
+
+    def to_usd(self, costs: Sequence[float], currencies: Sequence[str], dates: Sequence[date]) -> np.ndarray:
+        return self.convert(costs, currencies, dates, "USD")
+
+    def convert_entries(self, entries: Sequence, target: str = "USD") -> np.ndarray:
+        return self.convert(
+            [entry.cost for entry in entries],
+            [entry.currency for entry in entries],
+            [entry.date for entry in entries],
+            target,
+        )
@@ -1,51 +1,147 @@
 from __future__ import annotations
 
+import os
 from datetime import date, timedelta
-from typing import Iterable
+from typing import IO, Iterator
 import xml.etree.ElementTree as ET
 
 import requests
 
+from core.ingestion import record_api_call
+
 ECB_HIST_URL = "https://www.ecb.europa.eu/stats/eurofxref/eurofxref-hist.xml"
+ECB_90D_URL = "https://www.ecb.europa.eu/stats/eurofxref/eurofxref-hist-90d.xml"
+ECB_DAILY_URL = "https://www.ecb.europa.eu/stats/eurofxref/eurofxref-daily.xml"
 ECB_NS = {
     "gesmes": "http://www.gesmes.org/xml/2002-08-01",
     "def": "http://www.ecb.int/vocabulary/2002-08-01/eurofxref",
 }
+ECB_CUBE_TAG = f"{{{ECB_NS['def']}}}Cube"
 
+# ETag / Last-Modified per feed URL from the last download whose rates were
+# stored. The worker is long-lived, so keeping them in process is enough to
+# turn repeated polls of an unchanged feed into 304s. A download's validators
+# stay pending until ``confirm_ecb_rates`` is called after the upsert, so a
+# failed write is retried with a full download instead of a 304.
+_VALIDATORS: dict[str, dict[str, str]] = {}
+_PENDING_VALIDATORS: dict[str, dict[str, str]] = {}
 
-def fetch_ecb_rates(lookback_days: int | None = None) -> list[dict]:
-    response = requests.get(ECB_HIST_URL, timeout=20)
-    response.raise_for_status()
-    root = ET.fromstring(response.text)
-    cutoff = None
-    if lookback_days:
-        cutoff = date.today() - timedelta(days=lookback_days)
-    entries: list[dict] = []
-    for cube_time in root.findall(".//def:Cube[@time]", ECB_NS):
-        day = date.fromisoformat(cube_time.attrib["time"])
-        if cutoff and day < cutoff:
+
+def select_ecb_source(since: date | None, lookback_days: int | None) -> str:
+    override = os.getenv("ECB_RATES_SOURCE")
+    if override:
+        return override.strip()
+    if since:
+        gap = (date.today() - since).days
+    elif lookback_days:
+        gap = lookback_days
+    else:
+        return ECB_HIST_URL
+    if gap <= 1:
+        return ECB_DAILY_URL
+    if gap <= 90:
+        return ECB_90D_URL
+    return ECB_HIST_URL
+
+
+def iter_ecb_days(stream: IO[bytes], stop_before: date | None = None) -> Iterator[tuple[date, list[tuple[str, float]]]]:
+    """Yield ``(day, [(currency, rate), ...])`` from an ECB feed, newest first.
+
+    Parsing stops as soon as a day older than ``stop_before`` starts, so only the
+    head of the full history file is ever read.
+    """
+    day: date | None = None
+    rates: list[tuple[str, float]] = []
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if elem.tag != ECB_CUBE_TAG:
             continue
-        day_entries = []
-        for cube in cube_time.findall("def:Cube", ECB_NS):
-            currency = cube.attrib["currency"]
-            rate = float(cube.attrib["rate"])
-            day_entries.append(
-                {
-                    "id": f"{day.isoformat()}_{currency}",
-                    "date": day,
-                    "base_currency": "EUR",
-                    "currency": currency,
-                    "rate": rate,
-                }
-            )
-        day_entries.append(
-            {
-                "id": f"{day.isoformat()}_EUR",
-                "date": day,
-                "base_currency": "EUR",
-                "currency": "EUR",
-                "rate": 1.0,
-            }
-        )
-        entries.extend(day_entries)
+        if "time" in elem.attrib:
+            if event == "start":
+                day = date.fromisoformat(elem.attrib["time"])
+                if stop_before and day < stop_before:
+                    return
+                rates = []
+            else:
+                yield day, rates
+                elem.clear()
+        elif event == "end" and "currency" in elem.attrib:
+            rates.append((elem.attrib["currency"], float(elem.attrib["rate"])))
+
+
+def _build_entries(day: date, rates: list[tuple[str, float]]) -> list[dict]:
+    entries = [
+        {
+            "id": f"{day.isoformat()}_{currency}",
+            "date": day,
+            "base_currency": "EUR",
+            "currency": currency,
+            "rate": rate,
+        }
+        for currency, rate in rates
+    ]
+    entries.append(
+        {
+            "id": f"{day.isoformat()}_EUR",
+            "date": day,
+            "base_currency": "EUR",
+            "currency": "EUR",
+            "rate": 1.0,
+        }
+    )
+    return entries
+
+
+def _parse_entries(stream: IO[bytes], stop_before: date | None) -> list[dict]:
+    entries: list[dict] = []
+    for day, rates in iter_ecb_days(stream, stop_before):
+        entries.extend(_build_entries(day, rates))
     return entries
+
+
+def fetch_ecb_rates(
+    lookback_days: int | None = None,
+    since: date | None = None,
+    source: str | None = None,
+) -> list[dict]:
+    """Return ECB rates newer than ``since`` and within ``lookback_days``.
+
+    ``source`` may be an ECB feed URL or a local XML file; by default the
+    smallest feed covering the gap is used. Returns an empty list when the
+    remote feed is unchanged since the last confirmed download; call
+    ``confirm_ecb_rates`` once the returned rates are stored.
+    """
+    stop_before = None
+    if lookback_days:
+        stop_before = date.today() - timedelta(days=lookback_days)
+    if since and (not stop_before or since >= stop_before):
+        stop_before = since + timedelta(days=1)
+    source = source or select_ecb_source(since, lookback_days)
+
+    if not source.startswith(("http://", "https://")):
+        with open(source, "rb") as handle:
+            return _parse_entries(handle, stop_before)
+
+    validators = _VALIDATORS.get(source, {})
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    record_api_call("ecb", "fetch")
+    with requests.get(source, headers=headers, timeout=20, stream=True) as response:
+        if response.status_code == 304:
+            return []
+        response.raise_for_status()
+        response.raw.decode_content = True
+        entries = _parse_entries(response.raw, stop_before)
+        _PENDING_VALIDATORS[source] = {
+            "etag": response.headers.get("ETag", ""),
+            "last_modified": response.headers.get("Last-Modified", ""),
+        }
+    return entries
+
+
+def confirm_ecb_rates():
+    """Remember the validators of downloads whose rates were stored."""
+    _VALIDATORS.update(_PENDING_VALIDATORS)
+    _PENDING_VALIDATORS.clear()
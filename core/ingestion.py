@@ -0,0 +1,94 @@
+"""Per-run ingestion accounting (phases, API calls, pages, rows).
+
+``run_collector`` and the queue consumer bind a ``RunStats`` to the current
+context; collectors and the write path report into it through the module-level
+helpers, which do nothing when no run is bound (e.g. bench or replay).
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from core.metrics import API_CALLS
+
+PHASES = ("auth", "fetch", "normalize", "write")
+
+
+@dataclass
+class RunStats:
+    phases: Dict[str, float] = field(default_factory=dict)
+    api_calls: int = 0
+    pages: int = 0
+    rows_fetched: int = 0
+    _stack: List[List] = field(default_factory=list, repr=False)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a phase exclusively: a nested phase pauses the enclosing one.
+
+        Collectors are generators consumed by the write path, so fetching runs
+        inside ``normalize`` and authentication inside ``fetch``; exclusive
+        timing keeps the phases additive.
+        """
+        now = time.perf_counter()
+        if self._stack:
+            outer = self._stack[-1]
+            self.phases[outer[0]] = self.phases.get(outer[0], 0.0) + now - outer[1]
+        self._stack.append([name, now])
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            current = self._stack.pop()
+            self.phases[name] = self.phases.get(name, 0.0) + now - current[1]
+            if self._stack:
+                self._stack[-1][1] = now
+
+
+current_run: ContextVar[Optional[RunStats]] = ContextVar("current_run", default=None)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    run = current_run.get()
+    if run is None:
+        yield
+        return
+    with run.phase(name):
+        yield
+
+
+def record_api_call(provider: str, operation: str):
+    API_CALLS.labels(provider, operation).inc()
+    run = current_run.get()
+    if run is not None:
+        run.api_calls += 1
+
+
+def record_page():
+    run = current_run.get()
+    if run is not None:
+        run.pages += 1
+
+
+def timed(items: Iterable, name: str) -> Iterator:
+    """Yield from ``items``, counting the time spent producing each item as phase ``name``."""
+    iterator = iter(items)
+    while True:
+        with phase(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def fetched(entries: Iterable) -> Iterator:
+    """Yield collector entries, timing them as ``fetch`` and counting them into the current run."""
+    run = current_run.get()
+    for entry in timed(entries, "fetch"):
+        if run is not None:
+            run.rows_fetched += 1
+        yield entry
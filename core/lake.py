@@ -0,0 +1,60 @@
+"""Layout of the Parquet export read by the DuckDB query backend.
+
+Under ``PARQUET_DIR``::
+
+    cost_entries/month=YYYY-MM/data.parquet
+    fx_rates.parquet
+    coverage.json
+
+``coverage.json`` records the date range the export mirrors, ``{"from":
+"YYYY-MM-DD", "to": "YYYY-MM-DD"}``. It is written by a full export and
+extended by later exports that touch or overlap it; months outside it may be
+missing or stale.
+"""
+
+import json
+import os
+from datetime import date
+from pathlib import Path
+from typing import Optional, Tuple
+
+
+def lake_dir() -> Optional[Path]:
+    path = os.getenv("PARQUET_DIR")
+    return Path(path) if path else None
+
+
+def cost_entries_dir(root: Path) -> Path:
+    return root / "cost_entries"
+
+
+def cost_month_path(root: Path, month: date) -> Path:
+    return cost_entries_dir(root) / f"month={month:%Y-%m}" / "data.parquet"
+
+
+def cost_entries_glob(root: Path) -> str:
+    return str(cost_entries_dir(root) / "month=*" / "*.parquet")
+
+
+def fx_rates_path(root: Path) -> Path:
+    return root / "fx_rates.parquet"
+
+
+def coverage_path(root: Path) -> Path:
+    return root / "coverage.json"
+
+
+def read_coverage(root: Path) -> Optional[Tuple[date, date]]:
+    try:
+        coverage = json.loads(coverage_path(root).read_text())
+        return date.fromisoformat(coverage["from"]), date.fromisoformat(coverage["to"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def covers(root: Optional[Path], start: date, end: date) -> bool:
+    """Whether the export under ``root`` mirrors every day of ``[start, end]``."""
+    if not root or not fx_rates_path(root).exists():
+        return False
+    coverage = read_coverage(root)
+    return coverage is not None and coverage[0] <= start and end <= coverage[1]
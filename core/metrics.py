@@ -0,0 +1,29 @@
+"""Prometheus metrics shared by the collectors and the worker.
+
+Metrics live in the default registry of whichever process records them: the
+worker serves them on ``WORKER_METRICS_PORT``; a manual ``collectors.run_all``
+run simply discards them.
+"""
+
+from prometheus_client import Counter, Histogram
+
+JOB_DURATION = Histogram(
+    "uccc_job_duration_seconds",
+    "Duration of scheduled worker jobs.",
+    ["job"],
+    buckets=(0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600),
+)
+JOB_RUNS = Counter("uccc_job_runs_total", "Scheduled worker job runs by outcome.", ["job", "outcome"])
+ROWS_COLLECTED = Counter("uccc_rows_collected_total", "Cost entries received from providers.", ["provider"])
+ROWS_WRITTEN = Counter(
+    "uccc_rows_written_total", "Cost entries by write result (inserted, updated, unchanged).", ["provider", "result"]
+)
+API_CALLS = Counter("uccc_provider_api_calls_total", "Calls made to provider APIs.", ["provider", "operation"])
+
+
+def record_write_stats(provider: str, stats):
+    """Record a ``WriteStats`` from ``api.crud.write_cost_entries``."""
+    ROWS_COLLECTED.labels(provider).inc(stats.total)
+    ROWS_WRITTEN.labels(provider, "inserted").inc(stats.inserted)
+    ROWS_WRITTEN.labels(provider, "updated").inc(stats.updated)
+    ROWS_WRITTEN.labels(provider, "unchanged").inc(stats.unchanged)
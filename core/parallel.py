@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Deque, Iterable, Iterator, Optional, Tuple
+
+from core.batch import CostBatch, compute_batch_keys, compute_packed_keys
+
+
+def normalize_workers() -> int:
+    return int(os.getenv("NORMALIZE_WORKERS", "1"))
+
+
+def normalization_pool(workers: Optional[int] = None) -> Optional[ProcessPoolExecutor]:
+    """Return a process pool for batch key computation, or None when disabled.
+
+    Workers are spawned rather than forked: the API and worker processes run
+    threads (scheduler, queue consumers, backfill windows) that must not be
+    duplicated mid-operation into a child.
+    """
+    workers = normalize_workers() if workers is None else workers
+    if workers <= 1:
+        return None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def iter_keyed_batches(
+    batches: Iterable[CostBatch],
+    pool: Optional[Executor] = None,
+    max_in_flight: Optional[int] = None,
+) -> Iterator[Tuple[CostBatch, Tuple[bytes, bytes]]]:
+    """Yield each batch with its ``compute_batch_keys`` result, in input order.
+
+    Without a pool keys are computed inline. With one, up to ``max_in_flight``
+    (default ``2 * NORMALIZE_WORKERS``) batches are hashed concurrently while
+    the caller keeps pulling from the collector stream; only each batch's
+    packed key columns are sent to the workers. Results are still consumed in
+    submission order, so the output is identical to the inline path.
+    """
+    if pool is None:
+        for batch in batches:
+            yield batch, compute_batch_keys(batch)
+        return
+
+    max_in_flight = max_in_flight or 2 * max(normalize_workers(), 1)
+    pending: Deque[Tuple[CostBatch, Future]] = deque()
+    for batch in batches:
+        pending.append((batch, pool.submit(compute_packed_keys, batch.key_columns())))
+        if len(pending) >= max_in_flight:
+            done, future = pending.popleft()
+            yield done, future.result()
+    while pending:
+        done, future = pending.popleft()
+        yield done, future.result()
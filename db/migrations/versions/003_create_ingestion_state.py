@@ -0,0 +1,34 @@
+"""create ingestion state
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "003"
+down_revision = "002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ingestion_state",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("provider", sa.String(), nullable=False),
+        sa.Column("account_id", sa.String(), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("is_final", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("collected_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.UniqueConstraint("provider", "account_id", "date", name="uq_ingestion_state_scope_date"),
+    )
+    op.create_index("ix_ingestion_state_provider", "ingestion_state", ["provider"])
+    op.create_index("idx_ingestion_state_provider_date", "ingestion_state", ["provider", "date"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_ingestion_state_provider_date", table_name="ingestion_state")
+    op.drop_index("ix_ingestion_state_provider", table_name="ingestion_state")
+    op.drop_table("ingestion_state")
@@ -0,0 +1,35 @@
+"""create backfill progress
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "backfill_progress",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("provider", sa.String(), nullable=False),
+        sa.Column("account_id", sa.String(), nullable=False),
+        sa.Column("start_date", sa.Date(), nullable=False),
+        sa.Column("end_date", sa.Date(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("rows", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.UniqueConstraint("provider", "account_id", "start_date", "end_date", name="uq_backfill_progress_window"),
+    )
+    op.create_index("ix_backfill_progress_provider", "backfill_progress", ["provider"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_backfill_progress_provider", table_name="backfill_progress")
+    op.drop_table("backfill_progress")
@@ -0,0 +1,38 @@
+"""create ingestion runs
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "007"
+down_revision = "006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ingestion_runs",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("provider", sa.String(), nullable=False),
+        sa.Column("trigger", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False, server_default="running"),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("phases", sa.JSON(), nullable=True),
+        sa.Column("api_calls", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("pages", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("rows_fetched", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("rows_written", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("rows_unchanged", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("error", sa.String(), nullable=True),
+    )
+    op.create_index("idx_ingestion_runs_provider_started", "ingestion_runs", ["provider", "started_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_ingestion_runs_provider_started", table_name="ingestion_runs")
+    op.drop_table("ingestion_runs")
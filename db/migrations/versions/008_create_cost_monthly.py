@@ -0,0 +1,39 @@
+"""create cost monthly
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "008"
+down_revision = "007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "cost_monthly",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("provider", sa.String(), nullable=False),
+        sa.Column("account_id", sa.String(), nullable=False),
+        sa.Column("account_name", sa.String(), nullable=True),
+        sa.Column("service", sa.String(), nullable=False),
+        sa.Column("region", sa.String(), nullable=True),
+        sa.Column("cost", sa.Float(), nullable=False),
+        sa.Column("currency", sa.String(), nullable=False),
+        sa.Column("tags", sa.JSON(), nullable=True),
+        sa.Column("source_rows", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_cost_monthly_date", "cost_monthly", ["date"])
+    op.create_index("ix_cost_monthly_provider", "cost_monthly", ["provider"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_cost_monthly_provider", table_name="cost_monthly")
+    op.drop_index("ix_cost_monthly_date", table_name="cost_monthly")
+    op.drop_table("cost_monthly")
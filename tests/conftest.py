@@ -0,0 +1,49 @@
+import os
+import tempfile
+from datetime import date
+
+import pytest
+
+_DB_DIR = tempfile.mkdtemp(prefix="uccc-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/costs.db"
+os.environ["COST_CUBE_ENABLED"] = "0"
+
+from api import crud  # noqa: E402
+from api.db import ENGINE, SessionLocal  # noqa: E402
+from api.models import Base  # noqa: E402
+
+
+@pytest.fixture
+def session():
+    Base.metadata.create_all(ENGINE)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(ENGINE)
+
+
+
+@pytest.fixture
+def add_costs(session):
+    """Write one cost row per day in ``days`` (a date or an iterable of dates)."""
+
+    def add(days, cost=1.0, provider="aws", account_id="a1", service="ec2", region=None, currency="USD"):
+        if isinstance(days, date):
+            days = [days]
+        rows = [
+            {
+                "date": day,
+                "provider": provider,
+                "account_id": account_id,
+                "service": service,
+                "region": region,
+                "cost": cost,
+                "currency": currency,
+            }
+            for day in days
+        ]
+        return crud.write_cost_entries(session, rows)
+
+    return add
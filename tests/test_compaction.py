@@ -0,0 +1,73 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from api import crud
+from api.models import CostEntry, CostMonthly
+from api.services.timeseries import build_timeseries
+
+JANUARY = date(2026, 1, 1)
+JANUARY_END = date(2026, 1, 31)
+
+
+def days(start, count):
+    return [start + timedelta(days=offset) for offset in range(count)]
+
+
+@pytest.fixture
+def compacted(session, add_costs):
+    """January compacted with a1 at 1.0/day and a2 at 2.0/day."""
+    add_costs(days(JANUARY, 31), 1.0, account_id="a1")
+    add_costs(days(JANUARY, 31), 2.0, account_id="a2")
+    assert crud.compact_cost_month(session, JANUARY) == (62, 2)
+    return session
+
+
+def monthly_costs(session):
+    stmt = select(CostMonthly.account_id, CostMonthly.cost).where(CostMonthly.date == JANUARY)
+    return {account_id: cost for account_id, cost in session.execute(stmt)}
+
+
+def test_compacted_month_keeps_total(compacted):
+    assert monthly_costs(compacted) == {"a1": pytest.approx(31.0), "a2": pytest.approx(62.0)}
+    assert compacted.scalar(select(func.count()).select_from(CostEntry)) == 0
+    assert crud.get_total_cost(compacted, JANUARY, JANUARY_END) == pytest.approx(93.0)
+    assert crud.get_total_cost(compacted, JANUARY, date(2026, 1, 10)) == pytest.approx(30.0)
+
+
+def test_compacted_month_is_spread_over_days(compacted):
+    totals = crud.get_daily_totals(compacted, date(2025, 12, 30), date(2026, 1, 5))
+    assert [day for day, _ in totals] == days(JANUARY, 5)
+    assert [total for _, total in totals] == [pytest.approx(3.0)] * 5
+
+    series = build_timeseries(compacted, JANUARY, JANUARY_END, "week")
+    assert sum(series.series[0].values) == pytest.approx(93.0)
+    # 2026-01-01 is a Thursday: the first week holds four days.
+    assert series.series[0].values[0] == pytest.approx(12.0)
+
+
+def test_partial_backfill_is_not_double_counted(compacted, add_costs):
+    add_costs(days(JANUARY, 10), 3.0, account_id="a1")
+
+    # a1: ten backfilled days at 3.0 plus the 21 uncovered days of its monthly row.
+    assert crud.get_total_cost(compacted, JANUARY, JANUARY_END) == pytest.approx(30.0 + 21.0 + 62.0)
+    totals = dict(crud.get_daily_totals(compacted, JANUARY, JANUARY_END))
+    assert totals[JANUARY] == pytest.approx(5.0)
+    assert totals[date(2026, 1, 20)] == pytest.approx(3.0)
+    assert sum(totals.values()) == pytest.approx(113.0)
+
+
+def test_recompaction_after_partial_backfill_keeps_uncovered_days(compacted, add_costs):
+    add_costs(days(JANUARY, 10), 3.0, account_id="a1")
+
+    assert crud.compact_cost_month(compacted, JANUARY) == (10, 1)
+    assert monthly_costs(compacted) == {"a1": pytest.approx(51.0), "a2": pytest.approx(62.0)}
+    assert crud.get_total_cost(compacted, JANUARY, JANUARY_END) == pytest.approx(113.0)
+
+
+def test_recompaction_after_full_backfill_replaces_month(compacted, add_costs):
+    add_costs(days(JANUARY, 31), 3.0, account_id="a1")
+
+    crud.compact_cost_month(compacted, JANUARY)
+    assert monthly_costs(compacted) == {"a1": pytest.approx(93.0), "a2": pytest.approx(62.0)}
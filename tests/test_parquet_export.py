@@ -0,0 +1,48 @@
+from datetime import date, timedelta
+
+import pytest
+
+from api import crud, duckdb_backend
+from core.lake import covers, read_coverage
+from worker.parquet_export import export_range
+
+
+@pytest.fixture
+def lake(session, add_costs, tmp_path, monkeypatch):
+    monkeypatch.setenv("PARQUET_DIR", str(tmp_path))
+    add_costs(date(2026, 1, 1) + timedelta(days=offset) for offset in range(90))
+    rate = {"id": "2026-01-01_EUR", "date": date(2026, 1, 1), "currency": "EUR", "rate": 1.1}
+    crud.upsert_fx_rates(session, [rate])
+    return tmp_path
+
+
+def test_only_a_claimed_export_creates_coverage(lake):
+    export_range(date(2026, 2, 1), date(2026, 2, 10))
+    assert read_coverage(lake) is None
+    assert not covers(lake, date(2026, 2, 1), date(2026, 2, 10))
+
+    export_range(date(2026, 2, 1), date(2026, 2, 10), claim=True)
+    assert read_coverage(lake) == (date(2026, 2, 1), date(2026, 2, 28))
+
+
+def test_exports_extend_connected_coverage_only(lake):
+    export_range(date(2026, 2, 1), date(2026, 2, 28), claim=True)
+
+    export_range(date(2026, 3, 5), date(2026, 3, 6))
+    assert read_coverage(lake) == (date(2026, 2, 1), date(2026, 3, 31))
+    export_range(date(2025, 6, 1), date(2025, 6, 30))
+    assert read_coverage(lake) == (date(2026, 2, 1), date(2026, 3, 31))
+    assert not list(lake.rglob("*.tmp"))
+
+
+def test_duckdb_serves_covered_ranges_only(session, lake):
+    export_range(date(2026, 2, 1), date(2026, 3, 31), claim=True)
+    token = duckdb_backend.current_backend.set(True)
+    try:
+        assert duckdb_backend.active(date(2026, 2, 1), date(2026, 3, 15))
+        assert not duckdb_backend.active(date(2026, 1, 15), date(2026, 2, 15))
+        assert crud.get_total_cost(session, date(2026, 2, 1), date(2026, 3, 15)) == pytest.approx(43.0)
+        # January was never exported; the SQL path still sees it.
+        assert crud.get_total_cost(session, date(2026, 1, 1), date(2026, 3, 31)) == pytest.approx(90.0)
+    finally:
+        duckdb_backend.current_backend.reset(token)
@@ -0,0 +1,91 @@
+from datetime import date
+
+import pytest
+
+from api.services.pivot import build_pivot, parse_dimensions
+
+DAY = date(2026, 3, 2)
+COSTS = [
+    ("aws", "ec2", "eu-west-1", 10.0),
+    ("aws", "s3", "eu-west-1", 5.0),
+    ("aws", "rds", None, 1.0),
+    ("azure", "vm", "westeurope", 8.0),
+    ("azure", "sql", None, 3.0),
+]
+
+
+@pytest.fixture
+def costs(session, add_costs):
+    for provider, service, region, cost in COSTS:
+        add_costs(DAY, cost, provider=provider, service=service, region=region)
+    return session
+
+
+def rows(pivot):
+    keys = list(zip(*(pivot.columns[dimension] for dimension in pivot.dimensions)))
+    return [(level, *key, total) for level, key, total in zip(pivot.level, keys, pivot.total_cost)]
+
+
+def test_subtotals_put_parents_before_their_children(costs):
+    pivot = build_pivot(costs, DAY, DAY, ["provider", "service"], subtotals=True)
+    assert rows(pivot) == [
+        (0, None, None, 27.0),
+        (1, "aws", None, 16.0),
+        (2, "aws", "ec2", 10.0),
+        (2, "aws", "s3", 5.0),
+        (2, "aws", "rds", 1.0),
+        (1, "azure", None, 11.0),
+        (2, "azure", "vm", 8.0),
+        (2, "azure", "sql", 3.0),
+    ]
+
+
+def test_top_ranks_children_within_their_parent(costs):
+    pivot = build_pivot(costs, DAY, DAY, ["provider", "service"], top=2)
+    assert rows(pivot) == [
+        (2, "aws", "ec2", 10.0),
+        (2, "aws", "s3", 5.0),
+        (2, "azure", "vm", 8.0),
+        (2, "azure", "sql", 3.0),
+    ]
+
+
+def test_top_cuts_children_of_cut_parents(costs):
+    pivot = build_pivot(costs, DAY, DAY, ["provider", "service"], subtotals=True, top=1)
+    assert rows(pivot) == [
+        (0, None, None, 27.0),
+        (1, "aws", None, 16.0),
+        (2, "aws", "ec2", 10.0),
+    ]
+
+
+def test_subtotal_rows_are_told_apart_from_null_keys_by_level(costs):
+    pivot = build_pivot(costs, DAY, DAY, ["provider", "region"], subtotals=True)
+    assert rows(pivot) == [
+        (0, None, None, 27.0),
+        (1, "aws", None, 16.0),
+        (2, "aws", "eu-west-1", 15.0),
+        (2, "aws", None, 1.0),
+        (1, "azure", None, 11.0),
+        (2, "azure", "westeurope", 8.0),
+        (2, "azure", None, 3.0),
+    ]
+
+
+def test_pivot_without_subtotals_is_flat(costs):
+    pivot = build_pivot(costs, DAY, DAY, ["service"], filters={"provider": ["azure"]})
+    assert rows(pivot) == [(1, "vm", 8.0), (1, "sql", 3.0)]
+
+
+@pytest.mark.parametrize(
+    "value, message",
+    [
+        ("", "at least one dimension"),
+        ("provider,provider", "unique"),
+        ("provider,colour", "unknown dimension"),
+        ("a,b,c,d,e,f", "at most"),
+    ],
+)
+def test_parse_dimensions_rejects_bad_input(value, message):
+    with pytest.raises(ValueError, match=message):
+        parse_dimensions(value)
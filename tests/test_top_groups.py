@@ -0,0 +1,76 @@
+from datetime import date
+
+import pytest
+
+from api import crud
+from api import cube as cost_cube
+from api.models import CostEntry
+
+DAY = date(2026, 3, 2)
+
+
+@pytest.fixture
+def costs(session, add_costs):
+    add_costs(DAY, 10.0, provider="azure", service="vm")
+    for idx in range(1, 6):
+        add_costs(DAY, float(6 - idx), service=f"s{idx}")
+    return session
+
+
+@pytest.fixture(params=["sql", "cube"])
+def backend(request, costs, monkeypatch):
+    if request.param == "cube":
+        monkeypatch.setattr(cost_cube, "_cube", cost_cube.load_cube(costs, DAY))
+    return costs
+
+
+def top(session, **options):
+    return crud.get_top_grouped_cost(session, DAY, DAY, CostEntry.service, **options)
+
+
+def test_page_with_remainder(backend):
+    result = top(backend, limit=2)
+    assert result.rows == [("vm", 10.0), ("s1", 5.0)]
+    assert result.other == pytest.approx(10.0)
+    assert result.other_groups == 4
+    assert result.grand_total == pytest.approx(25.0)
+
+
+def test_later_page_leaves_earlier_groups_out_of_the_remainder(backend):
+    result = top(backend, limit=2, offset=2)
+    assert result.rows == [("s2", 4.0), ("s3", 3.0)]
+    assert result.other == pytest.approx(18.0)
+    assert result.other_groups == 4
+
+
+def test_page_past_the_end_keeps_the_totals(backend):
+    result = top(backend, limit=2, offset=10)
+    assert result.rows == []
+    assert result.other == pytest.approx(25.0)
+    assert result.other_groups == 6
+    assert result.grand_total == pytest.approx(25.0)
+
+
+def test_filters_apply_to_the_remainder(backend):
+    result = top(backend, provider="aws", search_term="S", limit=3)
+    assert [key for key, _ in result.rows] == ["s1", "s2", "s3"]
+    assert result.other == pytest.approx(3.0)
+    assert result.other_groups == 2
+    assert result.grand_total == pytest.approx(15.0)
+
+
+def test_no_remainder_when_every_group_fits(backend):
+    result = top(backend, limit=10)
+    assert len(result.rows) == 6
+    assert result.other == pytest.approx(0.0)
+    assert result.other_groups == 0
+
+
+def test_equal_totals_are_ordered_by_key(session, add_costs, monkeypatch):
+    for service in ("zeta", "alpha", "mid"):
+        add_costs(DAY, 2.0, service=service)
+    monkeypatch.setattr(cost_cube, "_cube", None)
+    sql = crud.get_grouped_cost(session, DAY, DAY, CostEntry.service)
+    monkeypatch.setattr(cost_cube, "_cube", cost_cube.load_cube(session, DAY))
+    cube = crud.get_grouped_cost(session, DAY, DAY, CostEntry.service)
+    assert [tuple(row) for row in sql] == cube == [("alpha", 2.0), ("mid", 2.0), ("zeta", 2.0)]
@@ -0,0 +1,90 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from api import crud
+from api.db import SessionLocal
+from api.models import WorkItem
+from worker.queue import _backoff_seconds
+
+WINDOW = ("aws", "a1", date(2026, 3, 1), date(2026, 3, 7))
+
+
+@pytest.fixture
+def item_id(session):
+    assert crud.enqueue_work_items(session, [WINDOW]) == 1
+    return session.query(WorkItem.id).scalar()
+
+
+def naive_utc(value: datetime) -> datetime:
+    # SQLite hands timestamps back without a time zone.
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+def test_one_of_two_owners_wins_the_claim(item_id):
+    barrier = threading.Barrier(2)
+
+    def claim(owner):
+        session = SessionLocal()
+        try:
+            barrier.wait()
+            item = crud.claim_work_item(session, owner, lease_seconds=300)
+            return item.lease_owner if item else None
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        winners = [owner for owner in pool.map(claim, ["w1", "w2"]) if owner]
+    assert len(winners) == 1
+
+    session = SessionLocal()
+    try:
+        item = session.get(WorkItem, item_id)
+        assert (item.status, item.lease_owner, item.attempts) == ("leased", winners[0], 1)
+    finally:
+        session.close()
+
+
+def test_live_lease_is_not_claimed_again(session, item_id):
+    assert crud.claim_work_item(session, "w1", lease_seconds=300).id == item_id
+    assert crud.claim_work_item(session, "w2", lease_seconds=300) is None
+
+
+def test_expired_lease_is_claimed_again(session, item_id):
+    crud.claim_work_item(session, "w1", lease_seconds=-1)
+
+    item = crud.claim_work_item(session, "w2", lease_seconds=300)
+    assert (item.id, item.lease_owner, item.attempts) == (item_id, "w2", 2)
+    # The first owner's heartbeat notices it lost the lease.
+    assert not crud.extend_work_lease(session, item_id, "w1", 300)
+    assert crud.extend_work_lease(session, item_id, "w2", 300)
+
+
+def test_failure_delays_the_item_by_the_backoff(session, item_id):
+    crud.claim_work_item(session, "w1", lease_seconds=300)
+    before = naive_utc(datetime.now(timezone.utc))
+    crud.fail_work_item(session, item_id, "w1", "throttled", backoff_seconds=120)
+
+    item = session.get(WorkItem, item_id, populate_existing=True)
+    assert (item.status, item.lease_owner, item.last_error) == ("pending", None, "throttled")
+    delay = naive_utc(item.available_at) - before
+    assert timedelta(seconds=119) < delay < timedelta(seconds=125)
+    assert crud.claim_work_item(session, "w2", lease_seconds=300) is None
+
+
+def test_failure_after_the_last_attempt_is_final(session, item_id):
+    session.get(WorkItem, item_id).max_attempts = 1
+    session.commit()
+    crud.claim_work_item(session, "w1", lease_seconds=300)
+    crud.fail_work_item(session, item_id, "w1", "boom", backoff_seconds=0)
+
+    assert session.get(WorkItem, item_id, populate_existing=True).status == "failed"
+    assert crud.claim_work_item(session, "w2", lease_seconds=300) is None
+
+
+def test_backoff_doubles_per_attempt_up_to_the_cap(monkeypatch):
+    monkeypatch.setenv("WORK_QUEUE_BACKOFF_SECONDS", "30")
+    monkeypatch.setenv("WORK_QUEUE_BACKOFF_MAX_SECONDS", "100")
+    assert [_backoff_seconds(attempts) for attempts in (1, 2, 3, 4)] == [30, 60, 100, 100]
@@ -0,0 +1,233 @@
+"""Export cost entries as month-partitioned Parquet for the DuckDB backend.
+
+Each month is rewritten as one file and swapped in atomically, so readers never
+see a partial month. Compacted months are exported from the monthly tier, with
+``span_days`` set to the length of the month (1 for daily rows) so readers can
+prorate them like ``crud.cost_source`` does. The worker exports the months an
+ingestion or backfill touched whenever it changed rows, re-exports months it
+compacts and rewrites the FX rates after every sync. A full or ranged export
+can be run by hand; it records the range in the coverage manifest (see
+``core.lake``) that the DuckDB backend routes on::
+
+    PARQUET_DIR=/data/parquet python -m worker.parquet_export [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Optional, Set, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from api.crud import COST_COLUMNS, WriteStats, get_fx_rate_rows, month_start, next_month
+from api.db import SessionLocal
+from api.models import CostEntry, CostMonthly
+from core.lake import cost_month_path, coverage_path, fx_rates_path, lake_dir, read_coverage
+from core.normalization import serialize_tags
+
+COST_SCHEMA = pa.schema(
+    [
+        ("id", pa.string()),
+        ("date", pa.date32()),
+        ("provider", pa.string()),
+        ("account_id", pa.string()),
+        ("account_name", pa.string()),
+        ("service", pa.string()),
+        ("region", pa.string()),
+        ("cost", pa.float64()),
+        ("currency", pa.string()),
+        ("tags", pa.string()),
+        ("span_days", pa.int16()),
+    ]
+)
+FX_SCHEMA = pa.schema([("date", pa.date32()), ("currency", pa.string()), ("rate", pa.float64())])
+
+
+@contextmanager
+def _lake_lock(root: Path):
+    """Serialize exports across threads and processes sharing ``root``.
+
+    Each export reads the database and then replaces files; holding the lock
+    for both keeps an older snapshot from replacing a newer one.
+    """
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / ".export.lock", "w") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _write_atomic(path: Path, write: Callable[[Path], None]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # A unique name per writer: concurrent exports never share a temp file.
+    handle = tempfile.NamedTemporaryFile(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False)
+    handle.close()
+    tmp = Path(handle.name)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _write_table(table: pa.Table, path: Path):
+    _write_atomic(path, lambda tmp: pq.write_table(table, tmp, compression="zstd"))
+
+
+def _record_coverage(root: Path, start: date, end: date, claim: bool = False):
+    """Extend the coverage manifest with ``[start, end]``.
+
+    Ranges that touch or overlap the recorded one extend it. Otherwise only a
+    ``claim`` (a hand-run export) replaces it, and with no manifest yet nothing
+    but a claim creates one.
+    """
+    coverage = read_coverage(root)
+    if coverage and start <= coverage[1] + timedelta(days=1) and end >= coverage[0] - timedelta(days=1):
+        start, end = min(start, coverage[0]), max(end, coverage[1])
+    elif not claim:
+        return
+    content = json.dumps({"from": start.isoformat(), "to": end.isoformat()})
+    _write_atomic(coverage_path(root), lambda tmp: tmp.write_text(content))
+
+
+def export_month(session: Session, root: Path, month: date) -> int:
+    month_end = next_month(month) - timedelta(days=1)
+    tiers = (
+        (CostEntry, CostEntry.date.between(month, month_end), 1),
+        (CostMonthly, CostMonthly.date == month, month_end.day),
+    )
+    columns = {name: [] for name in (*COST_COLUMNS, "span_days")}
+    covered: Dict[Tuple[str, str], Set[date]] = {}
+    for model, condition, span_days in tiers:
+        stmt = select(*(getattr(model, name) for name in COST_COLUMNS)).where(condition)
+        for row in session.execute(stmt.execution_options(yield_per=10000)):
+            record = dict(zip(COST_COLUMNS, row))
+            scope = (record["provider"], record["account_id"])
+            if model is CostEntry:
+                covered.setdefault(scope, set()).add(record["date"])
+            elif scope in covered:
+                # Like ``crud.cost_source``: keep only the share of the month
+                # the (provider, account)'s daily rows do not cover.
+                uncovered = span_days - len(covered[scope])
+                if uncovered <= 0:
+                    continue
+                record["cost"] *= uncovered / span_days
+            for name in COST_COLUMNS:
+                columns[name].append(record[name])
+            columns["span_days"].append(span_days)
+    path = cost_month_path(root, month)
+    if not columns["id"]:
+        path.unlink(missing_ok=True)
+        return 0
+    columns["tags"] = [serialize_tags(tags) for tags in columns["tags"]]
+    _write_table(pa.table(columns, schema=COST_SCHEMA), path)
+    return len(columns["id"])
+
+
+def export_fx_rates(session: Session, root: Path) -> int:
+    rows = get_fx_rate_rows(session)
+    table = pa.table(
+        {
+            "date": [row[0] for row in rows],
+            "currency": [row[1] for row in rows],
+            "rate": [row[2] for row in rows],
+        },
+        schema=FX_SCHEMA,
+    )
+    _write_table(table, fx_rates_path(root))
+    return len(rows)
+
+
+def export_range(start: date, end: date, root: Optional[Path] = None, claim: bool = False) -> int:
+    """Rewrite every month overlapping ``[start, end]`` and the FX rates.
+
+    The whole months written are added to the coverage manifest; ``claim``
+    records them even when they do not connect to the current coverage.
+    """
+    root = root or lake_dir()
+    if root is None:
+        return 0
+    session = SessionLocal()
+    try:
+        rows = 0
+        month = month_start(start)
+        while month <= end:
+            with _lake_lock(root):
+                rows += export_month(session, root, month)
+            month = next_month(month)
+        with _lake_lock(root):
+            export_fx_rates(session, root)
+            _record_coverage(root, month_start(start), month - timedelta(days=1), claim)
+    finally:
+        session.close()
+    return rows
+
+
+def export_after_ingestion(provider: str, start: date, end: date, stats: WriteStats):
+    if lake_dir() is None or not stats.changed:
+        return
+    try:
+        rows = export_range(start, end)
+    except Exception as exc:
+        print(f"[parquet:{provider}] export failed: {exc}")
+        return
+    print(f"[parquet:{provider}] exported {rows} rows for {month_start(start):%Y-%m}..{end:%Y-%m}")
+
+
+def export_after_fx_sync():
+    root = lake_dir()
+    if root is None:
+        return
+    session = SessionLocal()
+    try:
+        with _lake_lock(root):
+            rows = export_fx_rates(session, root)
+    except Exception as exc:
+        print(f"[parquet:fx] export failed: {exc}")
+        return
+    finally:
+        session.close()
+    print(f"[parquet:fx] exported {rows} rates")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export cost entries to month-partitioned Parquet.")
+    parser.add_argument("--from", dest="start", default=None, help="first day (default: oldest cost)")
+    parser.add_argument("--to", dest="end", default=None, help="last day (default: today)")
+    args = parser.parse_args()
+
+    root = lake_dir()
+    if root is None:
+        raise SystemExit("PARQUET_DIR is not set")
+    end = date.fromisoformat(args.end) if args.end else date.today()
+    if args.start:
+        start = date.fromisoformat(args.start)
+    else:
+        session = SessionLocal()
+        try:
+            oldest = [
+                session.scalar(select(func.min(CostEntry.date))),
+                session.scalar(select(func.min(CostMonthly.date))),
+            ]
+        finally:
+            session.close()
+        oldest = [value for value in oldest if value]
+        if not oldest:
+            raise SystemExit("no cost entries to export")
+        start = min(oldest)
+    rows = export_range(start, end, root, claim=True)
+    print(f"[parquet] exported {rows} rows for {start:%Y-%m}..{end:%Y-%m} to {root}")
+
+
+if __name__ == "__main__":
+    main()
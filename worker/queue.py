@@ -0,0 +1,162 @@
+import os
+import socket
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from api.crud import (
+    DEFAULT_WRITE_BATCH_SIZE,
+    claim_work_item,
+    complete_work_item,
+    enqueue_work_items,
+    extend_work_lease,
+    fail_work_item,
+    finish_ingestion_run,
+    get_final_days,
+    purge_work_items,
+    record_ingestion_state,
+    start_ingestion_run,
+    write_cost_entries,
+)
+from api.db import SessionLocal
+from collectors.aws import collector as aws_collector
+from collectors.azure import collector as azure_collector
+from collectors.common import IngestionPlan, WindowPlan, finalize_after_days, resolve_date_range, split_range
+from core.ingestion import RunStats, current_run, fetched
+from core.metrics import record_write_stats
+from worker.parquet_export import export_after_ingestion
+
+QUEUE_PROVIDERS = {
+    "aws": aws_collector,
+    "azure": azure_collector,
+}
+
+
+def queue_enabled() -> bool:
+    return os.getenv("WORK_QUEUE_ENABLED", "0") == "1"
+
+
+def _lease_seconds() -> int:
+    return int(os.getenv("WORK_QUEUE_LEASE_SECONDS", "300"))
+
+
+def _backoff_seconds(attempts: int) -> float:
+    base = float(os.getenv("WORK_QUEUE_BACKOFF_SECONDS", "30"))
+    cap = float(os.getenv("WORK_QUEUE_BACKOFF_MAX_SECONDS", "3600"))
+    return min(base * 2 ** max(attempts - 1, 0), cap)
+
+
+def plan_work_items(provider: str) -> List[Tuple[str, str, date, date]]:
+    module = QUEUE_PROVIDERS[provider]
+    lookback_days = int(os.getenv("LOOKBACK_DAYS", "7"))
+    start, end = resolve_date_range(lookback_days)
+    session = SessionLocal()
+    try:
+        plan = IngestionPlan(provider, get_final_days(session, provider, start, end))
+    finally:
+        session.close()
+    items = []
+    for account_id in module.account_scopes():
+        for window_start, window_end in plan.windows(account_id, lookback_days):
+            for chunk_start, chunk_end in split_range(window_start, window_end, module.BACKFILL_WINDOW_DAYS):
+                items.append((provider, account_id, chunk_start, chunk_end))
+    return items
+
+
+def enqueue_collection(provider: str) -> int:
+    """Queue one work item per (account scope, pending window) for ``provider``."""
+    items = plan_work_items(provider)
+    max_attempts = int(os.getenv("WORK_QUEUE_MAX_ATTEMPTS", "5"))
+    session = SessionLocal()
+    try:
+        purge_work_items(session, datetime.now(timezone.utc) - timedelta(days=7))
+        try:
+            enqueued = enqueue_work_items(session, items, max_attempts)
+        except IntegrityError:
+            # Another replica enqueued the same window concurrently; the retry
+            # sees its rows and only adds what is still missing.
+            session.rollback()
+            enqueued = enqueue_work_items(session, items, max_attempts)
+    finally:
+        session.close()
+    print(f"[queue:{provider}] enqueued {enqueued} of {len(items)} work items")
+    return enqueued
+
+
+def _heartbeat(item_id: str, owner: str, stop: threading.Event):
+    lease_seconds = _lease_seconds()
+    while not stop.wait(lease_seconds / 3):
+        session = SessionLocal()
+        try:
+            if not extend_work_lease(session, item_id, owner, lease_seconds):
+                print(f"[queue] lost lease on {item_id}")
+                return
+        finally:
+            session.close()
+
+
+def process_next(owner: str) -> bool:
+    session = SessionLocal()
+    try:
+        item = claim_work_item(session, owner, _lease_seconds())
+        if item is None:
+            return False
+        item_id, provider, account_id = item.id, item.provider, item.account_id
+        start, end, attempts = item.start_date, item.end_date, item.attempts
+
+        run_id = start_ingestion_run(session, provider, "queue")
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=_heartbeat, args=(item_id, owner, stop), daemon=True)
+        heartbeat.start()
+        run = RunStats()
+        token = current_run.set(run)
+        try:
+            collect = QUEUE_PROVIDERS[provider].collect
+            batch_size = int(os.getenv("WRITE_BATCH_SIZE", str(DEFAULT_WRITE_BATCH_SIZE)))
+            entries = fetched(collect(WindowPlan(provider, account_id, start, end)))
+            stats = write_cost_entries(session, entries, batch_size)
+            record_write_stats(provider, stats)
+            record_ingestion_state(session, provider, [(account_id, start, end)], finalize_after_days(provider))
+        except Exception as exc:
+            session.rollback()
+            finish_ingestion_run(session, run_id, run, error=str(exc))
+            backoff = _backoff_seconds(attempts)
+            fail_work_item(session, item_id, owner, str(exc), backoff)
+            print(f"[queue:{provider}] {item_id} failed (attempt {attempts}): {exc}")
+        else:
+            finish_ingestion_run(session, run_id, run, stats)
+            complete_work_item(session, item_id, owner)
+            print(f"[queue:{provider}] {item_id} done ({stats.changed} changed, {stats.unchanged} unchanged)")
+            export_after_ingestion(provider, start, end, stats)
+        finally:
+            current_run.reset(token)
+            stop.set()
+            heartbeat.join()
+        return True
+    finally:
+        session.close()
+
+
+def consume(owner: str, stop: threading.Event):
+    idle_seconds = float(os.getenv("WORK_QUEUE_IDLE_SECONDS", "5"))
+    while not stop.is_set():
+        try:
+            busy = process_next(owner)
+        except Exception as exc:
+            print(f"[queue] consumer {owner} error: {exc}")
+            busy = False
+        if not busy:
+            stop.wait(idle_seconds)
+
+
+def start_consumers(stop: threading.Event) -> List[threading.Thread]:
+    count = int(os.getenv("WORK_QUEUE_CONSUMERS", "2"))
+    threads = []
+    for idx in range(count):
+        owner = f"{socket.gethostname()}:{os.getpid()}:{idx}"
+        thread = threading.Thread(target=consume, args=(owner, stop), name=f"queue-{idx}", daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Union
+
+from core.metrics import JOB_DURATION, JOB_RUNS
+
+CRON_FIELDS = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    ("weekday", 0, 6),
+)
+
+
+def _parse_cron_field(expr: str, low: int, high: int) -> set[int]:
+    values: set[int] = set()
+    for part in expr.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = end = int(part)
+            if step > 1:
+                end = high
+        if start < low or end > high + (1 if high == 6 else 0) or start > end or step < 1:
+            raise ValueError(f"Invalid cron field: {expr}")
+        values.update(value % 7 if high == 6 else value for value in range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """Five-field cron expression (minute hour day month weekday), local time."""
+
+    def __init__(self, expr: str):
+        parts = expr.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expr}")
+        self.expr = expr
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            _parse_cron_field(part, low, high) for part, (_, low, high) in zip(parts, CRON_FIELDS)
+        )
+        self._any_day = parts[2] == "*"
+        self._any_weekday = parts[4] == "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day:
+            return weekday_ok
+        if self._any_weekday:
+            return day_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment: datetime) -> datetime:
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year = candidate.year + (candidate.month == 12)
+                month = candidate.month % 12 + 1
+                candidate = candidate.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+                continue
+            if candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+                continue
+            return candidate
+        raise ValueError(f"Cron expression never fires: {self.expr}")
+
+
+class IntervalSchedule:
+    def __init__(self, seconds: int):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.seconds = seconds
+
+    def next_after(self, moment: datetime) -> datetime:
+        return moment + timedelta(seconds=self.seconds)
+
+
+def parse_schedule(value: str) -> Union[CronSchedule, IntervalSchedule]:
+    """Parse ``"3600"`` / ``"interval:3600"`` as seconds, anything else as cron."""
+    value = value.strip()
+    if value.startswith("interval:"):
+        value = value.split(":", 1)[1]
+    if value.isdigit():
+        return IntervalSchedule(int(value))
+    return CronSchedule(value)
+
+
+@dataclass
+class Job:
+    name: str
+    func: Callable[[], None]
+    schedule: Union[CronSchedule, IntervalSchedule]
+    jitter_seconds: float = 0.0
+    catch_up: bool = True
+    run_on_start: bool = True
+    misfire_grace_seconds: float = 300.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def next_run_after(self, moment: datetime) -> datetime:
+        jitter = random.uniform(0, self.jitter_seconds) if self.jitter_seconds else 0.0
+        return self.schedule.next_after(moment) + timedelta(seconds=jitter)
+
+    def try_run(self) -> bool:
+        """Run the job unless a previous run is still in progress."""
+        if not self._lock.acquire(blocking=False):
+            JOB_RUNS.labels(self.name, "skipped").inc()
+            print(f"[scheduler:{self.name}] previous run still in progress, skipping")
+            return False
+        try:
+            started = time.monotonic()
+            try:
+                self.func()
+            except Exception as exc:
+                JOB_RUNS.labels(self.name, "failed").inc()
+                print(f"[scheduler:{self.name}] failed: {exc}")
+            else:
+                JOB_RUNS.labels(self.name, "succeeded").inc()
+                print(f"[scheduler:{self.name}] finished in {time.monotonic() - started:.1f}s")
+            finally:
+                JOB_DURATION.labels(self.name).observe(time.monotonic() - started)
+        finally:
+            self._lock.release()
+        return True
+
+
+class Scheduler:
+    """Runs each job on its own schedule in a thread pool.
+
+    Late runs (worker busy or suspended past one or more slots) are coalesced
+    into a single catch-up run; jobs with ``catch_up=False`` skip a slot missed
+    by more than ``misfire_grace_seconds`` instead.
+    """
+
+    def __init__(self, jobs: list[Job], poll_seconds: float = 30.0):
+        self.jobs = jobs
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_forever(self, now: Optional[Callable[[], datetime]] = None):
+        now = now or datetime.now
+        started = now()
+        next_runs = {job.name: started if job.run_on_start else job.next_run_after(started) for job in self.jobs}
+        with ThreadPoolExecutor(max_workers=len(self.jobs), thread_name_prefix="job") as pool:
+            while not self._stop.is_set():
+                current = now()
+                for job in self.jobs:
+                    due = next_runs[job.name]
+                    if due > current:
+                        continue
+                    late = (current - due).total_seconds()
+                    if job.catch_up or late <= job.misfire_grace_seconds:
+                        pool.submit(job.try_run)
+                    else:
+                        print(f"[scheduler:{job.name}] missed run at {due.isoformat()}, skipping")
+                    next_runs[job.name] = job.next_run_after(current)
+                wake_at = min(next_runs.values())
+                delay = min(max((wake_at - now()).total_seconds(), 0.0), self.poll_seconds)
+                self._stop.wait(delay)
@@ -1,16 +1,31 @@
 import os
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, timedelta
-from typing import List
+from typing import Callable, List, Tuple
 
 import requests
+from prometheus_client import start_http_server
 from sqlalchemy.orm import Session
 
-from api.crud import get_daily_totals, upsert_fx_rates
+from api.crud import (
+    _utcnow,
+    compact_cost_entries,
+    compaction_cutoff,
+    fail_abandoned_ingestion_runs,
+    get_daily_totals,
+    get_fx_last_updated,
+    next_month,
+    upsert_fx_rates,
+)
 from api.db import SessionLocal
-from collectors.run_all import run_collectors
+from collectors.run_all import COLLECTORS, run_collector
 from core.anomaly import compute_day_over_day
-from core.fx_rates import fetch_ecb_rates
+from core.fx_rates import confirm_ecb_rates, fetch_ecb_rates
+from core.lake import lake_dir
+from worker.parquet_export import export_after_fx_sync, export_after_ingestion, export_range
+from worker.queue import QUEUE_PROVIDERS, enqueue_collection, queue_enabled, start_consumers
+from worker.schedule import Job, Scheduler, parse_schedule
 
 
 def send_slack_notification(webhook_url: str, anomalies: List[dict]):
@@ -46,19 +61,26 @@ def check_anomalies(session: Session, threshold: float):
     return anomalies
 
 
-def run_once():
+def sync_fx_rates():
     session = SessionLocal()
     try:
         lookback_days = int(os.getenv("LOOKBACK_DAYS", "90"))
         try:
-            rates = fetch_ecb_rates(lookback_days)
+            since = get_fx_last_updated(session)
+            rates = fetch_ecb_rates(lookback_days, since=since)
             if rates:
                 upsert_fx_rates(session, rates)
+            confirm_ecb_rates()
         except Exception as exc:
             print(f"[fx] failed to sync rates: {exc}")
+            return
     finally:
         session.close()
-    run_collectors()
+    if rates:
+        export_after_fx_sync()
+
+
+def send_alerts():
     webhook = os.getenv("SLACK_WEBHOOK_URL")
     threshold = float(os.getenv("ANOMALY_THRESHOLD", "0.3"))
     if webhook:
@@ -70,11 +92,141 @@ def run_once():
             session.close()
 
 
+def compact_after_days() -> int:
+    return int(os.getenv("COMPACT_AFTER_DAYS", "0"))
+
+
+def compact_costs():
+    # Never compact inside the collection lookback: collectors would write
+    # daily rows back into a month that is already in the monthly tier.
+    after_days = max(compact_after_days(), int(os.getenv("LOOKBACK_DAYS", "7")))
+    cutoff = compaction_cutoff(date.today(), after_days)
+    session = SessionLocal()
+    try:
+        months, removed, written = compact_cost_entries(session, cutoff)
+    finally:
+        session.close()
+    if months:
+        print(f"[compact] {len(months)} months before {cutoff}: {removed} daily rows -> {written} monthly rows")
+        if lake_dir():
+            export_range(months[0], next_month(months[-1]) - timedelta(days=1))
+
+
+def collect(name: str, trigger: str):
+    result = run_collector(name, trigger)
+    if result:
+        export_after_ingestion(name, *result)
+
+
+def run_once():
+    sync_fx_rates()
+    for name in COLLECTORS:
+        collect(name, "run_once")
+    send_alerts()
+
+
+def _job(name: str, func, default_schedule: str) -> Job:
+    key = name.upper().replace("-", "_")
+    return Job(
+        name=name,
+        func=func,
+        schedule=parse_schedule(os.getenv(f"JOB_{key}_SCHEDULE", default_schedule)),
+        jitter_seconds=float(os.getenv(f"JOB_{key}_JITTER_SECONDS", os.getenv("JOB_JITTER_SECONDS", "0"))),
+        catch_up=os.getenv(f"JOB_{key}_CATCH_UP", "1") == "1",
+    )
+
+
+def _schedule_env(name: str) -> str:
+    return f"JOB_{name.upper().replace('-', '_')}_SCHEDULE"
+
+
+def ingest(fx: bool, collectors: List[Tuple[str, Callable[[], None]]], alerts: bool):
+    """FX sync, then the collectors in parallel, then alerts once all finished."""
+    if fx:
+        sync_fx_rates()
+    if collectors:
+        with ThreadPoolExecutor(max_workers=len(collectors), thread_name_prefix="collect") as pool:
+            futures = [(name, pool.submit(func)) for name, func in collectors]
+            for name, future in futures:
+                try:
+                    future.result()
+                except Exception as exc:
+                    print(f"[scheduler:collect-{name}] failed: {exc}")
+    if alerts:
+        send_alerts()
+
+
+def build_jobs() -> List[Job]:
+    """One ``ingest`` job chains fx-sync, the collectors and alerts so collectors
+    convert with fresh rates and alerts see the new data. A step with its own
+    ``JOB_<NAME>_SCHEDULE`` leaves the chain and runs as a separate job."""
+    default_schedule = os.getenv("COLLECTOR_INTERVAL_SECONDS", "86400")
+    steps: List[Tuple[str, Callable[[], None]]] = [("fx-sync", sync_fx_rates)]
+    for name in COLLECTORS:
+        if queue_enabled() and name in QUEUE_PROVIDERS:
+            func = lambda name=name: enqueue_collection(name)
+        else:
+            func = lambda name=name: collect(name, "scheduled")
+        steps.append((f"collect-{name}", func))
+    steps.append(("alerts", send_alerts))
+
+    jobs = [_job(name, func, default_schedule) for name, func in steps if os.getenv(_schedule_env(name))]
+    chained = {name for name, _ in steps if not os.getenv(_schedule_env(name))}
+    if chained:
+        collectors = [
+            (name.removeprefix("collect-"), func)
+            for name, func in steps
+            if name in chained and name.startswith("collect-")
+        ]
+        jobs.insert(
+            0,
+            _job(
+                "ingest",
+                lambda: ingest("fx-sync" in chained, collectors, "alerts" in chained),
+                default_schedule,
+            ),
+        )
+    if compact_after_days() > 0:
+        jobs.append(_job("compact", compact_costs, "0 4 * * *"))
+    return jobs
+
+
+def fail_abandoned_runs(scheduler: bool):
+    """Close out ingestion runs left ``running`` by a worker that died.
+
+    Only one scheduler runs, so when it starts no scheduled run can still be
+    alive; runs from other triggers are failed once they exceed
+    ``INGESTION_RUN_STALE_HOURS``.
+    """
+    stale_before = _utcnow() - timedelta(hours=float(os.getenv("INGESTION_RUN_STALE_HOURS", "6")))
+    triggers = ("scheduled",) if scheduler else ()
+    session = SessionLocal()
+    try:
+        failed = fail_abandoned_ingestion_runs(session, stale_before, triggers)
+    finally:
+        session.close()
+    if failed:
+        print(f"[worker] marked {failed} abandoned ingestion runs as failed")
+
+
 def main():
-    interval = int(os.getenv("COLLECTOR_INTERVAL_SECONDS", "86400"))
-    while True:
+    run_once_only = os.getenv("WORKER_RUN_ONCE", "0") == "1"
+    scheduler = os.getenv("WORKER_SCHEDULER_ENABLED", "1") == "1"
+    fail_abandoned_runs(scheduler and not run_once_only)
+    if run_once_only:
         run_once()
-        time.sleep(interval)
+        return
+    metrics_port = int(os.getenv("WORKER_METRICS_PORT", "9101"))
+    if metrics_port:
+        start_http_server(metrics_port)
+        print(f"[worker] metrics on :{metrics_port}/metrics")
+    stop = threading.Event()
+    if queue_enabled():
+        start_consumers(stop)
+    if not scheduler:
+        stop.wait()
+        return
+    Scheduler(build_jobs()).run_forever()
 
 
 if __name__ == "__main__":